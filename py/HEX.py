@@ -1,6 +1,10 @@
 # add_hex_to_R7_small.py
 # Reads two 8-bit hex numbers from the user, computes their 8-bit sum and carry,
-# and prints a minimal 8051 assembly sequence that stores the low byte into R7.
+# and prints a minimal 8051 assembly sequence that stores the low byte into R7,
+# plus the machine code it assembles to (asm8051.py) for the HEX_B simulator.
+
+import asm8051
+import cpu8051
 
 def parse_hex(s):
     s = s.strip().lower()
@@ -30,6 +34,13 @@ result = total & 0xFF
 # Display computed result and minimal 8051 assembly
 print(f"\nResult: 0x{result:02X}  Carry: {carry}")
 print("8051 assembly (stores low byte of sum into R7):")
-print(f"    MOV A,#0x{a:02X}    ; load first operand into accumulator A")
-print(f"    ADD A,#0x{b:02X}    ; add second operand, sets CY on overflow")
-print("    MOV R7,A           ; move low 8 bits of sum into register R7")
+listing = (f"    MOV A,#0x{a:02X}    ; load first operand into accumulator A\n"
+           f"    ADD A,#0x{b:02X}    ; add second operand, sets CY on overflow\n"
+           "    MOV R7,A           ; move low 8 bits of sum into register R7")
+print(listing)
+
+# Assemble the same three instructions into a loadable image
+segments, _, _ = asm8051.assemble(listing)
+print("\nMachine code:", segments[0][1].hex(" ").upper())
+print("Intel HEX:")
+print(cpu8051.write_ihex(segments), end="")
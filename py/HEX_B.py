@@ -1,6 +1,19 @@
 #!/usr/bin/env python3
-# Compact 8051-like simulator: supports MOV A,#imm, ADD A,#imm, MOV R7,A
-# Keeps A and R7 as 8-bit; updates flags C, AC, P. Retries on invalid input.
+# Compact 8051-like simulator: MOV, ADD/ADDC/SUBB, ANL/ORL/XRL, INC/DEC, DA A,
+# CLR/SETB C on A, R7 and immediates. State (A, R7, PSW) lives in one CPU8051,
+# so it can be snapshot and restored; flags C, AC, OV come from the alu8051
+# lookup tables and P follows A. Retries on invalid input.
+# With a program argument it runs batch mode instead (see batch() below).
+
+import argparse
+import sys
+import time
+from array import array
+
+import asm8051
+import cpu8051
+import jit8051
+from alu8051 import ALU, DA, PSW_KEEP, SUBB_OP
 
 def to_byte(x): return x & 0xFF                          # mask to 8 bits
 def parse_hex(s):                                        # accept BE, BEh, 0xBE
@@ -9,71 +22,182 @@ def parse_hex(s):                                        # accept BE, BEh, 0xBE
     if t.startswith('0x'): t = t[2:]
     return int(t, 16)
 
-def parity(v): return 1 if bin(v & 0xFF).count("1") % 2 else 0
-def aux_carry(a, b): return 1 if ((a & 0x0F) + (b & 0x0F)) > 0x0F else 0
-def carry(a, b): return 1 if (a + b) > 0xFF else 0
+# all simulator state lives in one machine-code core: A, R7 (bank 0) and PSW
+machine = cpu8051.CPU8051()
+ACC, PSW, CY, AC, OV = cpu8051.ACC, cpu8051.PSW, cpu8051.CY, cpu8051.AC, cpu8051.OV
 
-A = 0x00                # accumulator
-R7 = 0x00               # register R7
-C = AC = P = 0          # flags
+def state(cpu=None):     # print current state
+    cpu = machine if cpu is None else cpu
+    print(f"A=0x{cpu.a:02X} R7=0x{cpu.r(7):02X}  C={cpu.flag(CY)} AC={cpu.flag(AC)} "
+          f"OV={cpu.flag(OV)} P={cpu.flag(cpu8051.P)}")
 
-def state():             # print current state
-    print(f"A=0x{A:02X} R7=0x{R7:02X}  C={C} AC={AC} P={P}")
+def operand(cpu, src):                                 # value of #imm or R7
+    if src.startswith('#'):
+        return to_byte(parse_hex(src[1:]))
+    if src.upper() == "R7":
+        return cpu.r(7)
+    raise ValueError(f"unsupported operand {src}")
 
-def exec_line(line):
-    global A, R7, C, AC, P
+def exec_line(line, cpu=None):
+    cpu = machine if cpu is None else cpu
+    sfr = cpu.sfr                                      # P is derived from A when PSW is read
     code = line.split(';',1)[0].strip()                # drop comments
     if not code: return
     parts = [p for p in code.replace(',', ' ').split() if p]
     op = parts[0].upper()
+    args = [x.upper() for x in parts[1:]]
     if op == "MOV" and len(parts) == 3:
-        dst, src = parts[1].upper(), parts[2]
+        dst, src = args[0], parts[2]
         if dst == "A":
-            if src.upper().startswith('R') and src[1:] == '7':
-                A = to_byte(R7)                        # MOV A,R7
-            elif src.startswith('#'):
-                A = to_byte(parse_hex(src[1:]))      # MOV A,#imm
-            else:
-                raise ValueError("unsupported MOV src")
-            P = parity(A)                             # parity depends on A
+            sfr[ACC] = operand(cpu, src)              # MOV A,R7 / MOV A,#imm
         elif dst == "R7":
-            if src.upper() == "A":
-                R7 = to_byte(A)                       # MOV R7,A
-            elif src.startswith('#'):
-                R7 = to_byte(parse_hex(src[1:]))     # MOV R7,#imm
-            else:
-                raise ValueError("unsupported MOV src")
+            cpu.set_r(7, sfr[ACC] if src.upper() == "A" else operand(cpu, src))  # MOV R7,A / #imm
         else:
             raise ValueError("unsupported MOV dst")
-    elif op == "ADD" and len(parts) == 3:
-        dst, src = parts[1].upper(), parts[2]
-        if dst != "A": raise ValueError("only ADD A,src supported")
-        if src.startswith('#'):
-            val = to_byte(parse_hex(src[1:]))         # immediate value
-        elif src.upper() == "R7":
-            val = R7                                  # register R7
+    elif op in ("ADD", "ADDC", "SUBB") and len(parts) == 3:
+        if args[0] != "A": raise ValueError(f"only {op} A,src supported")
+        c = sfr[PSW] >> 7 if op != "ADD" else 0
+        index = c << 16 | sfr[ACC] << 8 | operand(cpu, parts[2])
+        entry = ALU[index | SUBB_OP if op == "SUBB" else index]
+        sfr[PSW] = (sfr[PSW] & PSW_KEEP) | entry >> 8     # C, AC, OV from the table
+        sfr[ACC] = entry & 0xFF
+    elif op in ("ANL", "ORL", "XRL") and len(parts) == 3:
+        if args[0] != "A": raise ValueError(f"only {op} A,src supported")
+        val = operand(cpu, parts[2])
+        a = sfr[ACC]
+        sfr[ACC] = a & val if op == "ANL" else a | val if op == "ORL" else a ^ val
+    elif op in ("INC", "DEC") and len(parts) == 2:
+        delta = 1 if op == "INC" else -1              # INC/DEC leave C, AC, OV alone
+        if args[0] == "A":
+            sfr[ACC] = to_byte(sfr[ACC] + delta)
+        elif args[0] == "R7":
+            cpu.set_r(7, cpu.r(7) + delta)
         else:
-            raise ValueError("unsupported ADD src")
-        AC = aux_carry(A, val)
-        C = carry(A, val)
-        A = to_byte(A + val)                          # store low 8 bits
-        P = parity(A)
+            raise ValueError(f"unsupported {op} operand")
+    elif op == "DA" and args == ["A"]:
+        psw = sfr[PSW]
+        entry = DA[(psw >> 6) << 8 | sfr[ACC]]        # decimal adjust; only ever sets C
+        sfr[ACC] = entry & 0xFF
+        sfr[PSW] = psw | entry >> 8
+    elif op in ("CLR", "SETB") and args == ["C"]:
+        sfr[PSW] = sfr[PSW] | CY if op == "SETB" else sfr[PSW] & ~CY & 0xFF
     else:
         raise ValueError("unsupported instruction")
 
+# ---- batch mode: run a program file or image on the machine-code core ----
+
+class TraceBuffer:                                     # last `size` instructions, oldest overwritten
+    def __init__(self, size):
+        self.size = size
+        self.pc = array("H", bytes(2 * size))          # preallocated: no per-step allocation
+        self.op = bytearray(size)
+        self.a = bytearray(size)
+        self.psw = bytearray(size)
+        self.count = 0                                 # instructions recorded in total
+
+    def entries(self):                                 # (pc, opcode, A, PSW), oldest first
+        n = min(self.count, self.size)
+        start = self.count - n
+        for k in range(start, self.count):
+            i = k % self.size
+            yield self.pc[i], self.op[i], self.a[i], self.psw[i]
+
+def load_program(path, cpu, hex_default=False):       # .asm (decimal unless hex_default, as asm8051) or image
+    if path.lower().endswith((".asm", ".a51", ".s")):
+        segments, symbols, _ = asm8051.assemble_file(path, hex_default)
+    else:
+        segments, symbols = cpu8051.read_image(path), {}
+    cpu.load_segments(segments)
+    return symbols
+
+def run_batch(cpu, steps, breakpoints=(), trace=None):
+    """
+    Run up to `steps` instructions, stopping before any breakpoint address
+    (the first instruction always runs) or when the program jumps to itself.
+    Return (instructions, reason) with reason "halt", "break" or "steps".
+    """
+    if not breakpoints and trace is None:
+        n = cpu.run(steps)                             # fast path: the core's own loop
+        return n, "halt" if cpu.halted else "steps"
+    code, sfr = cpu.code, cpu.sfr
+    stops = frozenset(breakpoints)
+    n = 0
+    while n < steps:
+        pc = cpu.pc
+        if n and pc in stops:
+            return n, "break"
+        if trace is not None:
+            i = trace.count % trace.size
+            trace.pc[i] = pc
+            trace.op[i] = code[pc]
+            trace.a[i] = sfr[cpu8051.ACC]
+            trace.psw[i] = cpu.psw
+            trace.count += 1
+        cpu.step()
+        n += 1
+        if cpu.halted:
+            return n, "halt"
+    return n, "steps"
+
+def parse_address(text, symbols, hex_default=False):   # label, 1234h, 0x1234 or decimal (hex_default: hex)
+    key = text.strip().upper()
+    if key in symbols:
+        return symbols[key]
+    return asm8051.parse_number(text, hex_default)
+
+def batch(argv):
+    ap = argparse.ArgumentParser(description="Run an 8051 program without the interactive prompt")
+    ap.add_argument("program", help=".asm source, Intel HEX or raw binary image")
+    ap.add_argument("-n", "--steps", type=int, default=1_000_000)
+    ap.add_argument("-b", "--break", dest="breaks", action="append", default=[],
+                    help="stop before this address or label (repeatable)")
+    ap.add_argument("--trace", type=int, default=0, metavar="N", help="keep the last N instructions")
+    ap.add_argument("--jit", action="store_true", help="use the basic-block JIT (no trace/breakpoints)")
+    ap.add_argument("--hex-default", action="store_true", help="plain numbers (sources, --break) are hex")
+    args = ap.parse_args(argv)
+    if args.jit and (args.trace or args.breaks):
+        ap.error("--jit cannot be combined with --trace or --break")
+    cpu = jit8051.JitCPU() if args.jit else cpu8051.CPU8051()
+    symbols = load_program(args.program, cpu, args.hex_default)
+    breakpoints = [parse_address(b, symbols, args.hex_default) for b in args.breaks]
+    trace = TraceBuffer(args.trace) if args.trace else None
+    t = time.perf_counter()
+    n, reason = run_batch(cpu, args.steps, breakpoints, trace)
+    elapsed = time.perf_counter() - t
+    if trace is not None:
+        for pc, op, a, psw in trace.entries():
+            text, _ = cpu8051.disassemble(cpu.code, pc)
+            print(f"{pc:04X}  {op:02X}  A={a:02X} PSW={psw:02X}  {text}")
+    print(cpu.state())
+    print(f"{reason}: {n} instructions, {cpu.cycles} cycles in {elapsed:.3f} s "
+          f"({n / elapsed if elapsed else 0:,.0f} instructions/s)")
+
 # interactive loop with retry on invalid input
-print("Compact 8051 simulator. Examples: MOV A,#BEh  ADD A,#C9h  MOV R7,A  EXIT")
-state()
-while True:
-    try:
-        line = input("> ").strip()
-        if not line: continue
-        if line.upper() in ("EXIT","QUIT"): break
+def interactive():
+    print("Compact 8051 simulator. Examples: MOV A,#BEh  ADD A,#C9h  MOV R7,A  SUBB A,R7  DA A  EXIT")
+    print("SNAP saves the state, RESTORE returns to it.")
+    state()
+    saved = machine.snapshot()
+    while True:
         try:
-            exec_line(line)
-        except Exception as e:
-            print("Invalid input:", e)    # report error
-            continue                      # loop again for correction
-        state()
-    except (EOFError, KeyboardInterrupt):
-        print(); break
+            line = input("> ").strip()
+            if not line: continue
+            if line.upper() in ("EXIT","QUIT"): break
+            if line.upper() == "SNAP":
+                saved = machine.snapshot(); continue
+            if line.upper() == "RESTORE":
+                machine.restore(saved); state(); continue
+            try:
+                exec_line(line)
+            except Exception as e:
+                print("Invalid input:", e)    # report error
+                continue                      # loop again for correction
+            state()
+        except (EOFError, KeyboardInterrupt):
+            print(); break
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        batch(sys.argv[1:])                   # python HEX_B.py prog.asm|.hex|.bin [-n N] [-b ADDR] [--trace N]
+    else:
+        interactive()
@@ -12,19 +12,30 @@ Features:
 
 Usage:
   python texas_holdem.py
+  python texas_holdem.py --verify    # check poker_eval against evaluate_7cards
 """
 
 import random
 import itertools
 import sys
 
+import poker_engine
+import poker_eval
+import poker_preflop
+
 # ---- Card and deck utilities ----
 
 RANKS = "23456789TJQKA"                       # rank order low->high
 SUITS = "CDHS"                                # clubs, diamonds, hearts, spades
 
-def make_deck():
-    """Return a new list of 52 card strings like 'Ah', 'TC', '5D' where rank+suit."""
+def make_deck(as_ints=False):
+    """
+    Return a new list of 52 card strings like 'Ah', 'TC', '5D' where rank+suit.
+    With as_ints=True return the compact form instead: an array('B') of card
+    ints 0..51 (rank_index * 4 + suit_index, see poker_eval).
+    """
+    if as_ints:
+        return poker_eval.make_int_deck()
     return [r + s for r in RANKS for s in SUITS]
 
 def shuffle_deck(deck):
@@ -33,6 +44,8 @@ def shuffle_deck(deck):
 
 def card_rank_value(card):
     """Return numeric rank index for sorting/comparison (0..12)."""
+    if isinstance(card, int):
+        return card >> 2
     return RANKS.index(card[0])
 
 # ---- Hand evaluator ----
@@ -97,6 +110,7 @@ def evaluate_7cards(cards):
     # Ensure card list length between 5 and 7
     if len(cards) < 5:
         raise ValueError("Need at least 5 cards to evaluate a hand")
+    cards = [poker_eval.card_to_str(c) for c in cards]   # accept int cards too
     ranks_group = group_by_rank(cards)
     counts = sorted(((len(v), RANKS.index(k), k) for k,v in ranks_group.items()), reverse=True)
     # counts sorted by (count, rank_index, rank_char)
@@ -188,11 +202,8 @@ def deal_community(deck):
     return flop + [turn, river]
 
 def pretty(card):
-    """Return human-friendly card representation, e.g., 'A♠'."""
-    suit_map = {'C':'♣','D':'♦','H':'♥','S':'♠'}
-    rank = card[0]
-    suit = suit_map.get(card[1], card[1])
-    return rank + suit
+    """Return human-friendly card representation, e.g., 'A♠' (int or string card)."""
+    return poker_eval.pretty(card)
 
 def show_table(hands, community, reveal_all=False):
     """Print current hands and community. If reveal_all False, only show CPU as 'XX' to hide hole cards when desired."""
@@ -204,7 +215,14 @@ def show_table(hands, community, reveal_all=False):
         print("Community: (not dealt)")
 
 def best_hand_for_player(hole, community):
-    """Return evaluation tuple and the best 5-card combination (as list of card strings)."""
+    """Return evaluation tuple and the best 5-card combination (cards as given, int or string)."""
+    all_cards = list(hole) + list(community)
+    # single table-driven pass instead of evaluating all 21 five-card combinations
+    score = poker_eval.evaluate(all_cards)
+    return poker_eval.score_to_tuple(score), poker_eval.best_five(all_cards, score)
+
+def best_hand_by_combinations(hole, community):
+    """Reference version of best_hand_for_player: evaluate every 5-card combination."""
     all_cards = hole + community
     best_eval = None
     best_combo = None
@@ -216,6 +234,44 @@ def best_hand_for_player(hole, community):
             best_combo = combo
     return best_eval, best_combo
 
+def verify_fast_evaluator(samples=20000, seed=0):
+    """
+    Check poker_eval against evaluate_7cards. Exhaustive over every 5-card hand,
+    every 7-card rank multiset and every flush suit mask, plus `samples` random
+    7-card hands whose best 5 cards are checked against the combinations search.
+    Raises AssertionError on the first mismatch.
+    """
+    def check(cards):
+        ev = evaluate_7cards(cards)
+        got = poker_eval.evaluate(cards)
+        assert poker_eval.score_to_tuple(got) == ev, (cards, ev, got)
+        return got, ev
+    deck = make_deck()
+    # every 5-card hand, and their scores must order exactly like the tuples
+    seen = {}
+    for combo in itertools.combinations(deck, 5):
+        got, ev = check(list(combo))
+        seen[got] = ev
+    ordered = sorted(seen)
+    for lo, hi in zip(ordered, ordered[1:]):
+        assert compare_hand_tuples(seen[lo], seen[hi]) == -1, (seen[lo], seen[hi])
+    # every 7-card rank multiset, suits dealt round-robin so no flush
+    for ranks in itertools.combinations_with_replacement(RANKS, 7):
+        if max(ranks.count(r) for r in ranks) <= 4:
+            check([r + SUITS[i % 4] for i, r in enumerate(ranks)])
+    # every suit mask of 5..7 ranks, filled up to 7 cards with off-suit cards
+    for n in (5, 6, 7):
+        for flush_ranks in itertools.combinations(RANKS, n):
+            fill = [r + SUITS[1 + i % 3] for i, r in enumerate(RANKS[:7 - n])]
+            check([r + "S" for r in flush_ranks] + fill)
+    # random full boards, including the chosen best 5 cards
+    rng = random.Random(seed)
+    for _ in range(samples):
+        cards = rng.sample(deck, 7)
+        assert best_hand_for_player(cards[:2], cards[2:]) == \
+            best_hand_by_combinations(cards[:2], cards[2:]), cards
+    return len(seen)
+
 def eval_name_from_rank(rank_num):
     """Get hand category name by rank number."""
     for k,v in HAND_RANKS.items():
@@ -223,33 +279,41 @@ def eval_name_from_rank(rank_num):
             return k
     return "Unknown"
 
-def play_round(num_players):
-    """Play one round: shuffle, deal, showdown, and print winner(s)."""
-    deck = make_deck()
-    shuffle_deck(deck)
-    hands = deal_hole_cards(deck, num_players)
-    community = deal_community(deck)
+# Preflop equity table (built with `python poker_preflop.py build`); None if not built
+PREFLOP_TABLE = poker_preflop.load_default()
+
+def print_round(result):
+    """Observer for poker_engine: print a round result the way the CLI shows it."""
+    hands = result["hole"]
+    community = result["community"]
     print("\n--- New round ---")
     for i, h in enumerate(hands, 1):
-        print(f"Player {i} hole: {pretty(h[0])} {pretty(h[1])}")
+        if PREFLOP_TABLE is not None:
+            # instant lookup, no simulation needed
+            eq = PREFLOP_TABLE.equity(h, min(len(hands) - 1, PREFLOP_TABLE.max_opponents))
+            print(f"Player {i} hole: {pretty(h[0])} {pretty(h[1])}  (preflop equity {eq:.1f}%)")
+        else:
+            print(f"Player {i} hole: {pretty(h[0])} {pretty(h[1])}")
     print("Community cards:", ' '.join(pretty(c) for c in community))
-    # Evaluate each player's best hand
-    evaluations = []
-    for i, h in enumerate(hands, 1):
-        ev, combo = best_hand_for_player(h, community)
-        evaluations.append((i, ev, combo))
+    for i, names in enumerate(result.get("streets", ()), 1):
+        # how each hand developed: category after the flop, turn and river
+        print(f"Player {i} by street: flop {names[0]}, turn {names[1]}, river {names[2]}")
+    for i, (score, combo) in enumerate(zip(result["scores"], result["best5"]), 1):
+        ev = poker_eval.score_to_tuple(score)
         catname = eval_name_from_rank(ev[0])
         print(f"Player {i}: {catname}, tiebreakers {ev[1]}, best 5: {' '.join(pretty(c) for c in combo)}")
-    # Determine winner(s)
-    # find best evaluation tuple
-    evaluations_sorted = sorted(evaluations, key=lambda x: (x[1][0], x[1][1]), reverse=True)
-    best_ev = evaluations_sorted[0][1]
-    winners = [t[0] for t in evaluations if compare_hand_tuples(t[1], best_ev) == 0]
+    winners = result["winners"]
     if len(winners) == 1:
         print(f"Winner: Player {winners[0]}")
     else:
         print("Tie between players:", ', '.join(str(w) for w in winners))
 
+def play_round(num_players):
+    """Play one round: shuffle, deal, showdown, and print winner(s)."""
+    # dealing, evaluation and winner selection run headless in poker_engine;
+    # printing is just an observer of the result
+    return poker_engine.play_round(num_players, observer=print_round, streets=True)
+
 # ---- Main interactive loop ----
 
 def ask_int(prompt, minv, maxv):
@@ -276,4 +340,8 @@ def main():
     print("Goodbye!")
 
 if __name__ == "__main__":
-    main()
+    if "--verify" in sys.argv[1:]:
+        # python "Texas Hold'em simulator.py" --verify : check the fast evaluator
+        print(f"Fast evaluator OK ({verify_fast_evaluator()} distinct 5-card scores)")
+    else:
+        main()
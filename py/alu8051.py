@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+alu8051.py
+Precomputed 8051 ALU tables shared by HEX_B, cpu8051 and jit8051.
+
+Every arithmetic result and its flags are looked up instead of computed:
+
+  PARITY[v]                          1 if v has an odd number of set bits
+  ALU[op | c << 16 | a << 8 | b]     flags << 8 | result for A op b with carry-in c,
+                                     op = ADD_OP (ADD/ADDC) or SUBB_OP
+  DA[(psw >> 6) << 8 | a]            flags << 8 | result of DA A with CY/AC from psw
+
+Flags are in PSW bit positions (CY 0x80, AC 0x40, OV 0x04), so an
+instruction updates PSW with  psw = (psw & PSW_KEEP) | entry >> 8.
+
+ALU is one 512 KB bytearray read through a 16-bit memoryview, so result
+and flags come from a single indexed load.
+"""
+
+from array import array
+
+CY, AC, OV = 0x80, 0x40, 0x04
+FLAG_MASK = CY | AC | OV            # flags written by ADD/ADDC/SUBB
+PSW_KEEP = ~FLAG_MASK & 0xFF        # PSW bits they leave alone (0x3B)
+
+ADD_OP = 0
+SUBB_OP = 1 << 17
+
+PARITY = bytes(bin(v).count("1") & 1 for v in range(256))
+
+def _add_entry(a, b, c):
+    r = a + b + c
+    flags = ((CY if r > 0xFF else 0) | (AC if (a & 0xF) + (b & 0xF) + c > 0xF else 0)
+             | (OV if (a ^ r) & (b ^ r) & 0x80 else 0))
+    return flags << 8 | (r & 0xFF)
+
+def _subb_entry(a, b, c):
+    r = a - b - c
+    flags = ((CY if r < 0 else 0) | (AC if (a & 0xF) - (b & 0xF) - c < 0 else 0)
+             | (OV if (a ^ b) & (a ^ r) & 0x80 else 0))
+    return flags << 8 | (r & 0xFF)
+
+def _build_alu():
+    entries = array("H", (entry(a, b, c)
+                          for entry in (_add_entry, _subb_entry)
+                          for c in (0, 1) for a in range(256) for b in range(256)))
+    table = bytearray(entries.tobytes())
+    return table, memoryview(table).cast("H")
+
+def _da_entry(a, cy, ac):
+    flags = CY if cy else 0
+    if (a & 0x0F) > 9 or ac:
+        a += 0x06
+        if a > 0xFF:
+            flags = CY
+        a &= 0xFF
+    if (a >> 4) > 9 or flags:
+        a += 0x60
+        if a > 0xFF:
+            flags = CY
+        a &= 0xFF
+    return flags << 8 | a
+
+ALU_BYTES, ALU = _build_alu()
+DA = array("H", (_da_entry(a, cy, ac) for cy in (0, 1) for ac in (0, 1) for a in range(256)))
+
+# ---- Convenience wrappers ----
+
+def add(a, b, c=0):
+    """(result, flags) of ADD/ADDC."""
+    e = ALU[c << 16 | a << 8 | b]
+    return e & 0xFF, e >> 8
+
+def subb(a, b, c=0):
+    """(result, flags) of SUBB."""
+    e = ALU[SUBB_OP | c << 16 | a << 8 | b]
+    return e & 0xFF, e >> 8
+
+def da(a, psw):
+    """(result, flags) of DA A; flags only ever sets CY."""
+    e = DA[(psw >> 6) << 8 | a]
+    return e & 0xFF, e >> 8
+
+if __name__ == "__main__":
+    # Test: flags against the direct formulas, and DA after ADD on every BCD pair
+    for a in range(256):
+        for b in range(256):
+            r, f = add(a, b)
+            assert r == (a + b) & 0xFF and bool(f & CY) == (a + b > 0xFF)
+            assert bool(f & AC) == ((a & 0xF) + (b & 0xF) > 0xF)
+            r, f = subb(a, b, 1)
+            assert r == (a - b - 1) & 0xFF and bool(f & CY) == (a < b + 1)
+    for x in range(100):
+        for y in range(100):
+            bx, by = x // 10 << 4 | x % 10, y // 10 << 4 | y % 10
+            r, f = add(bx, by)
+            d, cy = da(r, f)
+            assert (cy >> 7) * 100 + (d >> 4) * 10 + (d & 0xF) == x + y, (x, y)
+    print(f"ALU tables OK ({len(ALU_BYTES)} bytes)")
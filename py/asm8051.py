@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+asm8051.py
+Two-pass 8051 assembler producing images for the HEX_B simulator.
+
+Pass 1 sizes every line and records label and EQU values; pass 2 encodes
+instructions with all symbols known. The instruction set comes from
+cpu8051.OPCODES, so everything the core executes can be assembled.
+
+Source syntax:
+  label:  MNEMONIC operand, operand     ; comment
+  NAME    EQU expr
+          ORG expr
+          DB  expr, 'text', ...
+          DW  expr, ...
+          END
+Numbers: decimal 42, hex 2Ah / 0x2A (the forms HEX_B's parse_hex takes,
+so BEh works too), binary 101b, character 'A'; $ is the current address.
+Expressions combine those and symbols with + - * / ( ), plus HIGH(x) and
+LOW(x). Bits are named (ACC.7, PSW.3, 20h.1, OV, TR0, ...) or numbered.
+JMP and CALL with an address become LJMP and LCALL.
+With hex_default=True plain numbers are hex, as in HEX_B (MOV A,#3A).
+
+Usage:
+  python asm8051.py prog.asm [-o prog.hex|prog.bin] [--listing]
+"""
+
+import argparse
+import re
+
+import cpu8051
+
+BIT_NAMES = {
+    "CY": 0xD7, "AC": 0xD6, "F0": 0xD5, "RS1": 0xD4, "RS0": 0xD3, "OV": 0xD2, "P": 0xD0,
+    "TF1": 0x8F, "TR1": 0x8E, "TF0": 0x8D, "TR0": 0x8C, "IE1": 0x8B, "IT1": 0x8A, "IE0": 0x89, "IT0": 0x88,
+    "EA": 0xAF, "ES": 0xAC, "ET1": 0xAB, "EX1": 0xAA, "ET0": 0xA9, "EX0": 0xA8,
+    "SM0": 0x9F, "SM1": 0x9E, "SM2": 0x9D, "REN": 0x9C, "TB8": 0x9B, "RB8": 0x9A, "TI": 0x99, "RI": 0x98,
+}
+
+# Operands that are spelled literally (everything else is an expression)
+FIXED = {"A", "AB", "C", "DPTR", "@DPTR", "@A+DPTR", "@A+PC", "@R0", "@R1"} | {f"R{n}" for n in range(8)}
+
+def _instruction_forms():
+    """mnemonic -> list of (operand kinds, opcode) from cpu8051.OPCODES."""
+    forms = {}
+    for code, spec in enumerate(cpu8051.OPCODES):
+        if spec is None:
+            continue
+        mnemonic, operands, _, _ = spec
+        if mnemonic in ("AJMP", "ACALL") and code & 0xE0:
+            continue                            # one form; the page goes into the opcode
+        forms.setdefault(mnemonic, []).append((operands, code))
+    return forms
+
+FORMS = _instruction_forms()
+
+class AsmError(ValueError):
+    """Assembly error, with the source line number in the message."""
+
+# ---- Expressions ----
+
+_TOKEN = re.compile(r"\s*(?:((?:0[xX][0-9A-Fa-f]+|[0-9][0-9A-Za-z]*)(?:\.[0-7])?)"
+                    r"|('(?:[^'\\]|\\.)'|\"(?:[^\"\\]|\\.)\")"
+                    r"|([A-Za-z_?][\w?]*(?:\.[0-7])?|\$)"
+                    r"|([-+*/()]))")
+
+def parse_number(tok, hex_default=False):
+    """Value of a numeric literal: 42, 2Ah, BEh, 0x2A, 101b (hex_default: 2A)."""
+    t = tok.lower()
+    if t.startswith("0x"):
+        return int(t[2:], 16)
+    if t.endswith("h") and re.fullmatch(r"[0-9a-f]+h", t):
+        return int(t[:-1], 16)
+    if hex_default:
+        return int(t, 16)
+    if t.endswith("b") and re.fullmatch(r"[01]+b", t):
+        return int(t[:-1], 2)
+    return int(t, 10)
+
+class _Expr:
+    """Recursive-descent evaluator over one operand expression."""
+
+    def __init__(self, text, symbols, here, hex_default, immediate):
+        self.text = text
+        self.symbols = symbols
+        self.here = here
+        self.hex_default = hex_default
+        self.bare_hex = hex_default and immediate
+        self.tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if not m or m.end() == pos:
+                raise ValueError(f"bad expression {text!r}")
+            self.tokens.append(m.groups())
+            pos = m.end()
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][3] if self.pos < len(self.tokens) else None
+
+    def value(self):
+        v = self.sum()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"bad expression {self.text!r}")
+        return v
+
+    def sum(self):
+        v = self.product()
+        while self.peek() in ("+", "-"):
+            op = self.tokens[self.pos][3]
+            self.pos += 1
+            v = v + self.product() if op == "+" else v - self.product()
+        return v
+
+    def product(self):
+        v = self.unary()
+        while self.peek() in ("*", "/"):
+            op = self.tokens[self.pos][3]
+            self.pos += 1
+            v = v * self.unary() if op == "*" else v // self.unary()
+        return v
+
+    def unary(self):
+        if self.peek() == "-":
+            self.pos += 1
+            return -self.unary()
+        if self.peek() == "+":
+            self.pos += 1
+            return self.unary()
+        return self.atom()
+
+    def atom(self):
+        if self.pos >= len(self.tokens):
+            raise ValueError(f"bad expression {self.text!r}")
+        num, char, name, punct = self.tokens[self.pos]
+        self.pos += 1
+        if punct == "(":
+            v = self.sum()
+            if self.peek() != ")":
+                raise ValueError(f"missing ')' in {self.text!r}")
+            self.pos += 1
+            return v
+        if char is not None:
+            return ord(char[1:-1].encode().decode("unicode_escape"))
+        name = num if num is not None else name
+        if name is None:
+            raise ValueError(f"bad expression {self.text!r}")
+        if name == "$":
+            return self.here
+        upper = name.upper()
+        if upper in ("HIGH", "LOW") and self.peek() == "(":
+            v = self.atom()
+            return (v >> 8) & 0xFF if upper == "HIGH" else v & 0xFF
+        if "." in name:                         # bit of a byte: ACC.7, 20h.3, FLAGS.1
+            byte, bit = name.rsplit(".", 1)
+            b = self.resolve(byte)
+            if 0x20 <= b <= 0x2F:
+                return (b - 0x20) * 8 + int(bit)
+            if b >= 0x80 and b & 7 == 0:
+                return b + int(bit)
+            raise ValueError(f"{byte} is not bit addressable")
+        return self.resolve(name)
+
+    def resolve(self, name):
+        """Number, user symbol, SFR or bit name, in that order of preference."""
+        if name[0].isdigit():
+            try:
+                return parse_number(name, self.hex_default)
+            except ValueError:
+                raise ValueError(f"bad number {name!r}") from None
+        upper = name.upper()
+        if upper in self.symbols:
+            return self.symbols[upper]
+        # HEX_B style letter-led hex: BEh always, and #BE for data when plain numbers are hex
+        if re.fullmatch(r"[0-9A-F]+H", upper) or (self.bare_hex and re.fullmatch(r"[0-9A-F]+", upper)):
+            return parse_number(name, self.hex_default)
+        if upper in cpu8051.SFR_NAMES:
+            return cpu8051.SFR_NAMES[upper]
+        if upper in BIT_NAMES:
+            return BIT_NAMES[upper]
+        raise KeyError(name)
+
+def evaluate(text, symbols, here=0, hex_default=False, immediate=False):
+    """
+    Value of an expression; raises KeyError for an undefined symbol.
+    immediate marks data operands (#data, DB, DW), where with hex_default
+    a letter-led name like BE is read as hex when no symbol has that name.
+    """
+    return _Expr(text, symbols, here, hex_default, immediate).value()
+
+# ---- Source parsing ----
+
+def _split_operands(text):
+    """Split on commas outside quotes."""
+    out, cur, quote = [], "", None
+    for ch in text:
+        if quote:
+            cur += ch
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+            cur += ch
+        elif ch == ",":
+            out.append(cur.strip())
+            cur = ""
+        else:
+            cur += ch
+    if cur.strip():
+        out.append(cur.strip())
+    return out
+
+def _strip_comment(line):
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == ";":
+            return line[:i]
+    return line
+
+def parse_line(line):
+    """Return (label, mnemonic, operands) for one source line (any may be empty)."""
+    code = _strip_comment(line).strip()
+    label = ""
+    m = re.match(r"([A-Za-z_?][\w?]*)\s*:", code)
+    if m:
+        label, code = m.group(1), code[m.end():].strip()
+    if not code:
+        return label, "", []
+    m = re.match(r"([A-Za-z_?][\w?]*)\s+(?:EQU|SET)\s+(.+)$", code, re.IGNORECASE)
+    if m:
+        return m.group(1), "EQU", [m.group(2).strip()]
+    parts = code.split(None, 1)
+    return label, parts[0].upper(), _split_operands(parts[1]) if len(parts) > 1 else []
+
+def _classify(operand):
+    """Operand class used to pick an instruction form: a FIXED spelling, '#', '/' or 'expr'."""
+    o = operand.replace(" ", "").upper()
+    if o in FIXED:
+        return o
+    if o.startswith("#"):
+        return "#"
+    if o.startswith("/"):
+        return "/"
+    return "expr"
+
+_KIND_CLASS = {"#data": "#", "#data16": "#", "/bit": "/", "direct": "expr", "bit": "expr",
+               "rel": "expr", "addr11": "expr", "addr16": "expr"}
+
+def select_form(mnemonic, operands):
+    """Return (operand kinds, opcode) for a mnemonic and its operand strings."""
+    if mnemonic in ("JMP", "CALL") and operands and _classify(operands[0]) == "expr":
+        mnemonic = "LJMP" if mnemonic == "JMP" else "LCALL"
+    if mnemonic not in FORMS:
+        raise ValueError(f"unknown mnemonic {mnemonic}")
+    classes = [_classify(o) for o in operands]
+    for kinds, code in FORMS[mnemonic]:
+        if len(kinds) == len(classes) and all(
+                _KIND_CLASS.get(k, k) == c for k, c in zip(kinds, classes)):
+            return kinds, code
+    raise ValueError(f"unsupported operands for {mnemonic}: {', '.join(operands)}")
+
+def _db_items(operands, symbols, here, hex_default, resolve):
+    out = bytearray()
+    for o in operands:
+        if len(o) >= 2 and o[0] == o[-1] and o[0] in "'\"" and len(o) != 3:
+            out.extend(o[1:-1].encode("latin-1"))
+        elif resolve:
+            v = evaluate(o, symbols, here + len(out), hex_default, True)
+            if not -128 <= v <= 255:
+                raise ValueError(f"DB value out of range: {o}")
+            out.append(v & 0xFF)
+        else:
+            out.append(0)
+    return out
+
+# ---- Assembler ----
+
+def _encode(kinds, code, operands, symbols, addr, hex_default):
+    """Encode one instruction at addr; return its bytes."""
+    length = cpu8051.LENGTHS[code]
+    out = bytearray([code])
+    values = []
+    for kind, text in zip(kinds, operands):
+        if kind not in _KIND_CLASS:
+            continue
+        expr = text.strip()[1:] if kind in ("#data", "#data16", "/bit") else text
+        v = evaluate(expr, symbols, addr, hex_default, kind in ("#data", "#data16"))
+        if kind in ("direct", "bit", "/bit"):
+            if not 0 <= v <= 0xFF:
+                raise ValueError(f"{kind} address out of range: {text}")
+            values.append(v)
+        elif kind == "#data":
+            if not -128 <= v <= 0xFF:
+                raise ValueError(f"immediate out of range: {text}")
+            values.append(v & 0xFF)
+        elif kind in ("#data16", "addr16"):
+            if not -0x8000 <= v <= 0xFFFF:
+                raise ValueError(f"16-bit value out of range: {text}")
+            values += [(v >> 8) & 0xFF, v & 0xFF]
+        elif kind == "rel":
+            off = v - (addr + length)
+            if not -128 <= off <= 127:
+                raise ValueError(f"jump target out of range: {text}")
+            values.append(off & 0xFF)
+        elif kind == "addr11":
+            if (v & 0xF800) != ((addr + 2) & 0xF800):
+                raise ValueError(f"target not in the same 2K page: {text}")
+            out[0] = (v >> 8 & 7) << 5 | code
+            values.append(v & 0xFF)
+    if code == 0x85:                            # MOV direct,direct is encoded src, dst
+        values.reverse()
+    out.extend(values)
+    return out
+
+def assemble(source, hex_default=False):
+    """
+    Assemble source text. Return (segments, symbols, listing) where segments
+    is a list of (address, bytearray), symbols maps upper-case names to
+    values and listing is a list of (address, bytes, source line).
+    """
+    lines = source.splitlines()
+    symbols = {}
+    pending_equ = []
+
+    def define(name, value, lineno):
+        key = name.upper()
+        if key in symbols and symbols[key] != value:
+            raise AsmError(f"line {lineno}: {name} defined twice")
+        symbols[key] = value
+
+    # pass 1: addresses, sizes, labels, EQUs
+    parsed = []
+    addr = 0
+    for lineno, line in enumerate(lines, 1):
+        try:
+            label, mnemonic, operands = parse_line(line)
+            if mnemonic == "EQU":
+                try:
+                    define(label, evaluate(operands[0], symbols, addr, hex_default), lineno)
+                except KeyError:
+                    pending_equ.append((label, operands[0], addr, lineno))
+                continue
+            if label:
+                define(label, addr, lineno)
+            parsed.append((lineno, line, addr, mnemonic, operands))
+            if mnemonic == "END":
+                break
+            if mnemonic == "ORG":
+                addr = evaluate(operands[0], symbols, addr, hex_default)
+            elif mnemonic == "DB":
+                addr += len(_db_items(operands, symbols, addr, hex_default, False))
+            elif mnemonic == "DW":
+                addr += 2 * len(operands)
+            elif mnemonic == "DS":
+                addr += evaluate(operands[0], symbols, addr, hex_default)
+            elif mnemonic:
+                addr += cpu8051.LENGTHS[select_form(mnemonic, operands)[1]]
+            if addr > 0x10000:
+                raise ValueError("program runs past 64 KB")
+        except AsmError:
+            raise
+        except KeyError as e:
+            raise AsmError(f"line {lineno}: undefined symbol {e.args[0]} (must be defined before use here)") from None
+        except (ValueError, IndexError) as e:
+            raise AsmError(f"line {lineno}: {e}") from None
+    for label, text, here, lineno in pending_equ:
+        try:
+            define(label, evaluate(text, symbols, here, hex_default), lineno)
+        except KeyError as e:
+            raise AsmError(f"line {lineno}: undefined symbol {e.args[0]}") from None
+
+    # pass 2: encode
+    segments = []
+    listing = []
+    for lineno, line, addr, mnemonic, operands in parsed:
+        try:
+            if mnemonic in ("", "END", "ORG"):
+                data = b""
+            elif mnemonic == "DB":
+                data = _db_items(operands, symbols, addr, hex_default, True)
+            elif mnemonic == "DW":
+                data = bytearray()
+                for o in operands:
+                    v = evaluate(o, symbols, addr, hex_default, True) & 0xFFFF
+                    data += bytes([v >> 8, v & 0xFF])
+            elif mnemonic == "DS":
+                data = b""
+                listing.append((addr, b"", line))
+                continue
+            else:
+                kinds, code = select_form(mnemonic, operands)
+                data = _encode(kinds, code, operands, symbols, addr, hex_default)
+        except KeyError as e:
+            raise AsmError(f"line {lineno}: undefined symbol {e.args[0]}") from None
+        except (ValueError, IndexError) as e:
+            raise AsmError(f"line {lineno}: {e}") from None
+        listing.append((addr, bytes(data), line))
+        if data:
+            if segments and segments[-1][0] + len(segments[-1][1]) == addr:
+                segments[-1][1].extend(data)
+            else:
+                segments.append((addr, bytearray(data)))
+    return segments, symbols, listing
+
+def assemble_file(path, hex_default=False):
+    """Assemble a .asm file; same return value as assemble()."""
+    with open(path) as f:
+        return assemble(f.read(), hex_default)
+
+def to_binary(segments, fill=0xFF):
+    """Flat image from address 0 to the end of the last segment, gaps filled with `fill`."""
+    if not segments:
+        return bytes()
+    end = max(a + len(d) for a, d in segments)
+    image = bytearray([fill]) * end
+    for a, d in segments:
+        image[a:a + len(d)] = d
+    return bytes(image)
+
+def format_listing(listing):
+    """Listing text: address, encoded bytes, source line."""
+    out = []
+    for addr, data, line in listing:
+        out.append(f"{addr:04X}  {data.hex(' ').upper():<12} {line.rstrip()}")
+    return "\n".join(out)
+
+def main():
+    ap = argparse.ArgumentParser(description="Two-pass 8051 assembler")
+    ap.add_argument("source")
+    ap.add_argument("-o", "--output", help="output file (.hex/.ihx for Intel HEX, else binary)")
+    ap.add_argument("--listing", action="store_true", help="print an address/bytes listing")
+    ap.add_argument("--hex-default", action="store_true", help="plain numbers are hex, as in HEX_B")
+    args = ap.parse_args()
+    try:
+        segments, _, listing = assemble_file(args.source, args.hex_default)
+    except AsmError as e:
+        raise SystemExit(f"{args.source}: {e}")
+    if args.listing:
+        print(format_listing(listing))
+    out = args.output or args.source.rsplit(".", 1)[0] + ".hex"
+    if out.lower().endswith((".hex", ".ihx")):
+        with open(out, "w") as f:
+            f.write(cpu8051.write_ihex(segments))
+    else:
+        with open(out, "wb") as f:
+            f.write(to_binary(segments))
+    print(f"Wrote {out} ({sum(len(d) for _, d in segments)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,28 @@
-state = "q0"
+from dfa_engine import DFA
 
-while True:
-    symbol = input("Enter a binary: ").strip()
+# Accepts binary strings ending in '1': transitions[state][ch] as a compiled table
+transitions = {
+    "q0": {"1": "q1", "0": "q0"},
+    "q1": {"0": "q0", "1": "q1"},
+}
+ENDS1 = DFA(transitions, start="q0", accepting={"q1"})
 
-    if all (char in '01' for char in symbol):
-        print("Valid binary input!")
-        break
-    else:
-        print("Invalid input. Please enter only binary digits (0 or 1).")
+if __name__ == "__main__":
+    while True:
+        symbol = input("Enter a binary: ").strip()
+
+        if all (char in '01' for char in symbol):
+            print("Valid binary input!")
+            break
+        else:
+            print("Invalid input. Please enter only binary digits (0 or 1).")
 
-for ch in symbol:
-#   state = transitions[state][ch]
-    if state == "q0":
-        state = "q1" if ch == "1"  else "q0"
-    elif state == "q1":
-        state = "q0" if ch == "0" else "q1"
+    state = ENDS1.run(symbol)
 
-print (symbol)
-print(f"Final state: {state}")
+    print (symbol)
+    print(f"Final state: {state}")
 
-if state == "q1":
-    print("Accepted")
-else:
-    print("Rejected")
\ No newline at end of file
+    if state == "q1":
+        print("Accepted")
+    else:
+        print("Rejected")
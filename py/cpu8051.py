@@ -0,0 +1,1083 @@
+#!/usr/bin/env python3
+"""
+cpu8051.py
+Machine-code 8051 core for the HEX_B simulator.
+
+CPU8051 runs 8051 machine code instead of parsing assembly text:
+- 64 KB code memory, 256 bytes of internal RAM (four register banks,
+  bit-addressable area, stack), the SFR space and 64 KB of external RAM,
+  all held in bytearrays;
+- PSW with CY/AC/F0/RS1/RS0/OV/P (P always reflects A, computed on read);
+- a 256-entry opcode table of handlers built once per CPU as closures over
+  its memories, so dispatch is one list index per instruction;
+- ADD/ADDC/SUBB/DA results and flags looked up in the alu8051 tables;
+- a machine-cycle counter using the standard 1/2/4 cycle timings;
+- snapshot()/restore() of the whole machine state as one bytes object,
+  cheap enough to fork many short runs from one starting point.
+
+OPCODES describes every opcode as (mnemonic, operands, length, cycles);
+the assembler and the disassembler below share it. On-chip peripherals
+(timers, serial port, interrupts) are not modelled; RETI behaves like RET.
+
+Images are raw binaries (loaded at 0) or Intel HEX, e.g. from asm8051.py.
+
+Usage:
+  python cpu8051.py image.hex|image.bin [steps]
+"""
+
+import struct
+import sys
+
+from alu8051 import ALU, DA, PARITY, PSW_KEEP, SUBB_OP
+
+# ---- SFR addresses and PSW bits ----
+
+P0, SP, DPL, DPH, PCON = 0x80, 0x81, 0x82, 0x83, 0x87
+TCON, TMOD, TL0, TL1, TH0, TH1 = 0x88, 0x89, 0x8A, 0x8B, 0x8C, 0x8D
+P1, SCON, SBUF, P2, IE, P3, IP = 0x90, 0x98, 0x99, 0xA0, 0xA8, 0xB0, 0xB8
+PSW, ACC, B = 0xD0, 0xE0, 0xF0
+
+CY, AC, F0, RS1, RS0, OV, F1, P = 0x80, 0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01
+
+SFR_NAMES = {
+    "P0": P0, "SP": SP, "DPL": DPL, "DPH": DPH, "PCON": PCON, "TCON": TCON,
+    "TMOD": TMOD, "TL0": TL0, "TL1": TL1, "TH0": TH0, "TH1": TH1, "P1": P1,
+    "SCON": SCON, "SBUF": SBUF, "P2": P2, "IE": IE, "P3": P3, "IP": IP,
+    "PSW": PSW, "ACC": ACC, "B": B,
+}
+
+# ---- Lookup tables ----
+
+BIT_BYTE = bytes(0x20 + (b >> 3) if b < 0x80 else b & 0xF8 for b in range(256))  # bit address -> byte
+BIT_MASK = bytes(1 << (b & 7) for b in range(256))
+REL = tuple(v - 256 if v > 127 else v for v in range(256))                       # signed rel offsets
+
+_SNAP_HEADER = struct.Struct("<H?QQ")      # pc, halted, cycles, steps
+SNAPSHOT_SIZE = _SNAP_HEADER.size + 0x100 + 0x100 + 0x10000
+
+def _opcode_table():
+    """Return the 256-entry list of (mnemonic, operands, length, cycles); None for 0xA5."""
+    t = [None] * 256
+
+    def op(code, mnemonic, operands, length, cycles):
+        t[code] = (mnemonic, operands, length, cycles)
+
+    rn = [f"R{n}" for n in range(8)]
+    op(0x00, "NOP", (), 1, 1)
+    for page in range(8):
+        op(page << 5 | 0x01, "AJMP", ("addr11",), 2, 2)
+        op(page << 5 | 0x11, "ACALL", ("addr11",), 2, 2)
+    op(0x02, "LJMP", ("addr16",), 3, 2)
+    op(0x12, "LCALL", ("addr16",), 3, 2)
+    op(0x03, "RR", ("A",), 1, 1)
+    op(0x13, "RRC", ("A",), 1, 1)
+    op(0x23, "RL", ("A",), 1, 1)
+    op(0x33, "RLC", ("A",), 1, 1)
+    for base, mnemonic in ((0x00, "INC"), (0x10, "DEC")):
+        op(base + 4, mnemonic, ("A",), 1, 1)
+        op(base + 5, mnemonic, ("direct",), 2, 1)
+        op(base + 6, mnemonic, ("@R0",), 1, 1)
+        op(base + 7, mnemonic, ("@R1",), 1, 1)
+        for n in range(8):
+            op(base + 8 + n, mnemonic, (rn[n],), 1, 1)
+    op(0x10, "JBC", ("bit", "rel"), 3, 2)
+    op(0x20, "JB", ("bit", "rel"), 3, 2)
+    op(0x30, "JNB", ("bit", "rel"), 3, 2)
+    op(0x22, "RET", (), 1, 2)
+    op(0x32, "RETI", (), 1, 2)
+    for base, mnemonic in ((0x20, "ADD"), (0x30, "ADDC"), (0x40, "ORL"), (0x50, "ANL"),
+                           (0x60, "XRL"), (0x90, "SUBB")):
+        op(base + 4, mnemonic, ("A", "#data"), 2, 1)
+        op(base + 5, mnemonic, ("A", "direct"), 2, 1)
+        op(base + 6, mnemonic, ("A", "@R0"), 1, 1)
+        op(base + 7, mnemonic, ("A", "@R1"), 1, 1)
+        for n in range(8):
+            op(base + 8 + n, mnemonic, ("A", rn[n]), 1, 1)
+    for base, mnemonic in ((0x40, "ORL"), (0x50, "ANL"), (0x60, "XRL")):
+        op(base + 2, mnemonic, ("direct", "A"), 2, 1)
+        op(base + 3, mnemonic, ("direct", "#data"), 3, 2)
+    for code, mnemonic in ((0x40, "JC"), (0x50, "JNC"), (0x60, "JZ"), (0x70, "JNZ"), (0x80, "SJMP")):
+        op(code, mnemonic, ("rel",), 2, 2)
+    op(0x72, "ORL", ("C", "bit"), 2, 2)
+    op(0x82, "ANL", ("C", "bit"), 2, 2)
+    op(0xA0, "ORL", ("C", "/bit"), 2, 2)
+    op(0xB0, "ANL", ("C", "/bit"), 2, 2)
+    op(0x73, "JMP", ("@A+DPTR",), 1, 2)
+    op(0x74, "MOV", ("A", "#data"), 2, 1)
+    op(0x75, "MOV", ("direct", "#data"), 3, 2)
+    op(0x76, "MOV", ("@R0", "#data"), 2, 1)
+    op(0x77, "MOV", ("@R1", "#data"), 2, 1)
+    for n in range(8):
+        op(0x78 + n, "MOV", (rn[n], "#data"), 2, 1)
+    op(0x83, "MOVC", ("A", "@A+PC"), 1, 2)
+    op(0x84, "DIV", ("AB",), 1, 4)
+    op(0x85, "MOV", ("direct", "direct"), 3, 2)      # encoded as src, dst
+    op(0x86, "MOV", ("direct", "@R0"), 2, 2)
+    op(0x87, "MOV", ("direct", "@R1"), 2, 2)
+    for n in range(8):
+        op(0x88 + n, "MOV", ("direct", rn[n]), 2, 2)
+    op(0x90, "MOV", ("DPTR", "#data16"), 3, 2)
+    op(0x92, "MOV", ("bit", "C"), 2, 2)
+    op(0x93, "MOVC", ("A", "@A+DPTR"), 1, 2)
+    op(0xA2, "MOV", ("C", "bit"), 2, 1)
+    op(0xA3, "INC", ("DPTR",), 1, 2)
+    op(0xA4, "MUL", ("AB",), 1, 4)
+    op(0xA6, "MOV", ("@R0", "direct"), 2, 2)
+    op(0xA7, "MOV", ("@R1", "direct"), 2, 2)
+    for n in range(8):
+        op(0xA8 + n, "MOV", (rn[n], "direct"), 2, 2)
+    op(0xB2, "CPL", ("bit",), 2, 1)
+    op(0xB3, "CPL", ("C",), 1, 1)
+    op(0xC2, "CLR", ("bit",), 2, 1)
+    op(0xC3, "CLR", ("C",), 1, 1)
+    op(0xD2, "SETB", ("bit",), 2, 1)
+    op(0xD3, "SETB", ("C",), 1, 1)
+    op(0xB4, "CJNE", ("A", "#data", "rel"), 3, 2)
+    op(0xB5, "CJNE", ("A", "direct", "rel"), 3, 2)
+    op(0xB6, "CJNE", ("@R0", "#data", "rel"), 3, 2)
+    op(0xB7, "CJNE", ("@R1", "#data", "rel"), 3, 2)
+    for n in range(8):
+        op(0xB8 + n, "CJNE", (rn[n], "#data", "rel"), 3, 2)
+    op(0xC0, "PUSH", ("direct",), 2, 2)
+    op(0xD0, "POP", ("direct",), 2, 2)
+    op(0xC4, "SWAP", ("A",), 1, 1)
+    op(0xC5, "XCH", ("A", "direct"), 2, 1)
+    op(0xC6, "XCH", ("A", "@R0"), 1, 1)
+    op(0xC7, "XCH", ("A", "@R1"), 1, 1)
+    for n in range(8):
+        op(0xC8 + n, "XCH", ("A", rn[n]), 1, 1)
+    op(0xD4, "DA", ("A",), 1, 1)
+    op(0xD5, "DJNZ", ("direct", "rel"), 3, 2)
+    op(0xD6, "XCHD", ("A", "@R0"), 1, 1)
+    op(0xD7, "XCHD", ("A", "@R1"), 1, 1)
+    for n in range(8):
+        op(0xD8 + n, "DJNZ", (rn[n], "rel"), 2, 2)
+    op(0xE0, "MOVX", ("A", "@DPTR"), 1, 2)
+    op(0xE2, "MOVX", ("A", "@R0"), 1, 2)
+    op(0xE3, "MOVX", ("A", "@R1"), 1, 2)
+    op(0xE4, "CLR", ("A",), 1, 1)
+    op(0xE5, "MOV", ("A", "direct"), 2, 1)
+    op(0xE6, "MOV", ("A", "@R0"), 1, 1)
+    op(0xE7, "MOV", ("A", "@R1"), 1, 1)
+    for n in range(8):
+        op(0xE8 + n, "MOV", ("A", rn[n]), 1, 1)
+    op(0xF0, "MOVX", ("@DPTR", "A"), 1, 2)
+    op(0xF2, "MOVX", ("@R0", "A"), 1, 2)
+    op(0xF3, "MOVX", ("@R1", "A"), 1, 2)
+    op(0xF4, "CPL", ("A",), 1, 1)
+    op(0xF5, "MOV", ("direct", "A"), 2, 1)
+    op(0xF6, "MOV", ("@R0", "A"), 1, 1)
+    op(0xF7, "MOV", ("@R1", "A"), 1, 1)
+    for n in range(8):
+        op(0xF8 + n, "MOV", (rn[n], "A"), 1, 1)
+    return t
+
+OPCODES = _opcode_table()
+LENGTHS = bytes(o[2] if o else 1 for o in OPCODES)
+CYCLES = bytes(o[3] if o else 1 for o in OPCODES)
+# Opcodes whose jump to their own address means the program has stopped:
+# plain jumps, and conditional jumps whose condition nothing can change.
+# DJNZ and JBC alter state on every pass ('DJNZ R7,$' is a delay loop),
+# and calls/returns move SP, so those keep running.
+SELF_JUMP_HALTS = bytes(1 if o and o[0] in ("SJMP", "AJMP", "LJMP", "JMP", "JB", "JNB", "JC",
+                                            "JNC", "JZ", "JNZ", "CJNE") else 0
+                        for o in OPCODES)
+
+# ---- Opcode handlers ----
+#
+# Every handler takes the address just past the opcode byte and returns the
+# address of the next instruction.
+
+def _build_ops(cpu):
+    """Return the 256 handlers for one CPU, closed over its memories."""
+    iram, sfr, code, xram = cpu.iram, cpu.sfr, cpu.code, cpu.xram
+    ops = [None] * 256
+
+    def rd(a):                                  # direct address read
+        if a < 0x80:
+            return iram[a]
+        if a == PSW:
+            return (sfr[PSW] & 0xFE) | PARITY[sfr[ACC]]
+        return sfr[a]
+
+    def wr(a, v):                               # direct address write
+        if a < 0x80:
+            iram[a] = v
+        else:
+            sfr[a] = v
+
+    def rbit(b):
+        return rd(BIT_BYTE[b]) & BIT_MASK[b]
+
+    def wbit(b, v):
+        a = BIT_BYTE[b]
+        wr(a, rd(a) | BIT_MASK[b] if v else rd(a) & ~BIT_MASK[b] & 0xFF)
+
+    def push(v):
+        sp = (sfr[SP] + 1) & 0xFF
+        sfr[SP] = sp
+        iram[sp] = v
+
+    def pop():
+        sp = sfr[SP]
+        sfr[SP] = (sp - 1) & 0xFF
+        return iram[sp]
+
+    def add(b, c):                              # result and CY/AC/OV from alu8051.ALU
+        e = ALU[c << 16 | sfr[ACC] << 8 | b]
+        sfr[PSW] = (sfr[PSW] & PSW_KEEP) | e >> 8
+        sfr[ACC] = e & 0xFF
+
+    def subb(b):
+        e = ALU[SUBB_OP | (sfr[PSW] >> 7) << 16 | sfr[ACC] << 8 | b]
+        sfr[PSW] = (sfr[PSW] & PSW_KEEP) | e >> 8
+        sfr[ACC] = e & 0xFF
+
+    # --- operand source factories: return (reader, operand bytes) ---
+
+    def src_imm(pc):
+        return code[pc]
+
+    def src_dir(pc):
+        return rd(code[pc])
+
+    def src_ind(i):
+        return lambda pc: iram[iram[(sfr[PSW] & 0x18) | i]]
+
+    def src_reg(n):
+        return lambda pc: iram[(sfr[PSW] & 0x18) | n]
+
+    sources = [(4, src_imm, 1), (5, src_dir, 1), (6, src_ind(0), 0), (7, src_ind(1), 0)]
+    sources += [(8 + n, src_reg(n), 0) for n in range(8)]
+
+    # --- arithmetic and logic on A ---
+
+    def make_alu(kind, src, size):
+        if kind == "ADD":
+            def h(pc):
+                add(src(pc), 0)
+                return pc + size
+        elif kind == "ADDC":
+            def h(pc):
+                add(src(pc), 1 if sfr[PSW] & CY else 0)
+                return pc + size
+        elif kind == "SUBB":
+            def h(pc):
+                subb(src(pc))
+                return pc + size
+        elif kind == "ORL":
+            def h(pc):
+                sfr[ACC] |= src(pc)
+                return pc + size
+        elif kind == "ANL":
+            def h(pc):
+                sfr[ACC] &= src(pc)
+                return pc + size
+        elif kind == "XRL":
+            def h(pc):
+                sfr[ACC] ^= src(pc)
+                return pc + size
+        elif kind == "MOV":
+            def h(pc):
+                sfr[ACC] = src(pc)
+                return pc + size
+        return h
+
+    for base, kind in ((0x20, "ADD"), (0x30, "ADDC"), (0x90, "SUBB"), (0x40, "ORL"),
+                       (0x50, "ANL"), (0x60, "XRL")):
+        for off, src, size in sources:
+            ops[base + off] = make_alu(kind, src, size)
+    for off, src, size in sources[1:]:          # MOV A,direct/@Ri/Rn (0x74 is MOV A,#data)
+        ops[0xE0 + off] = make_alu("MOV", src, size)
+    ops[0x74] = make_alu("MOV", src_imm, 1)
+
+    def make_logic_dir(kind, imm):
+        if kind == "ORL":
+            def h(pc):
+                a = code[pc]
+                wr(a, rd(a) | (code[pc + 1] if imm else sfr[ACC]))
+                return pc + 1 + imm
+        elif kind == "ANL":
+            def h(pc):
+                a = code[pc]
+                wr(a, rd(a) & (code[pc + 1] if imm else sfr[ACC]))
+                return pc + 1 + imm
+        else:
+            def h(pc):
+                a = code[pc]
+                wr(a, rd(a) ^ (code[pc + 1] if imm else sfr[ACC]))
+                return pc + 1 + imm
+        return h
+
+    for base, kind in ((0x40, "ORL"), (0x50, "ANL"), (0x60, "XRL")):
+        ops[base + 2] = make_logic_dir(kind, 0)
+        ops[base + 3] = make_logic_dir(kind, 1)
+
+    # --- INC / DEC ---
+
+    def make_incdec(delta, target):
+        if target == "A":
+            def h(pc):
+                sfr[ACC] = (sfr[ACC] + delta) & 0xFF
+                return pc
+        elif target == "direct":
+            def h(pc):
+                a = code[pc]
+                wr(a, (rd(a) + delta) & 0xFF)
+                return pc + 1
+        elif target in (0, 1):
+            def h(pc, i=target):
+                a = iram[(sfr[PSW] & 0x18) | i]
+                iram[a] = (iram[a] + delta) & 0xFF
+                return pc
+        else:
+            def h(pc, n=target - 2):
+                a = (sfr[PSW] & 0x18) | n
+                iram[a] = (iram[a] + delta) & 0xFF
+                return pc
+        return h
+
+    for base, delta in ((0x00, 1), (0x10, -1)):
+        ops[base + 4] = make_incdec(delta, "A")
+        ops[base + 5] = make_incdec(delta, "direct")
+        ops[base + 6] = make_incdec(delta, 0)
+        ops[base + 7] = make_incdec(delta, 1)
+        for n in range(8):
+            ops[base + 8 + n] = make_incdec(delta, n + 2)
+
+    def inc_dptr(pc):
+        d = ((sfr[DPH] << 8 | sfr[DPL]) + 1) & 0xFFFF
+        sfr[DPH] = d >> 8
+        sfr[DPL] = d & 0xFF
+        return pc
+    ops[0xA3] = inc_dptr
+
+    # --- MOV family ---
+
+    def mov_dir_imm(pc):
+        wr(code[pc], code[pc + 1])
+        return pc + 2
+    ops[0x75] = mov_dir_imm
+
+    def mov_dir_dir(pc):
+        wr(code[pc + 1], rd(code[pc]))          # encoded src, dst
+        return pc + 2
+    ops[0x85] = mov_dir_dir
+
+    def mov_dir_a(pc):
+        wr(code[pc], sfr[ACC])
+        return pc + 1
+    ops[0xF5] = mov_dir_a
+
+    def mov_dptr(pc):
+        sfr[DPH] = code[pc]
+        sfr[DPL] = code[pc + 1]
+        return pc + 2
+    ops[0x90] = mov_dptr
+
+    for i in (0, 1):
+        def mov_ind_imm(pc, i=i):
+            iram[iram[(sfr[PSW] & 0x18) | i]] = code[pc]
+            return pc + 1
+
+        def mov_dir_ind(pc, i=i):
+            wr(code[pc], iram[iram[(sfr[PSW] & 0x18) | i]])
+            return pc + 1
+
+        def mov_ind_dir(pc, i=i):
+            iram[iram[(sfr[PSW] & 0x18) | i]] = rd(code[pc])
+            return pc + 1
+
+        def mov_ind_a(pc, i=i):
+            iram[iram[(sfr[PSW] & 0x18) | i]] = sfr[ACC]
+            return pc
+
+        ops[0x76 + i] = mov_ind_imm
+        ops[0x86 + i] = mov_dir_ind
+        ops[0xA6 + i] = mov_ind_dir
+        ops[0xF6 + i] = mov_ind_a
+
+    for n in range(8):
+        def mov_reg_imm(pc, n=n):
+            iram[(sfr[PSW] & 0x18) | n] = code[pc]
+            return pc + 1
+
+        def mov_dir_reg(pc, n=n):
+            wr(code[pc], iram[(sfr[PSW] & 0x18) | n])
+            return pc + 1
+
+        def mov_reg_dir(pc, n=n):
+            iram[(sfr[PSW] & 0x18) | n] = rd(code[pc])
+            return pc + 1
+
+        def mov_reg_a(pc, n=n):
+            iram[(sfr[PSW] & 0x18) | n] = sfr[ACC]
+            return pc
+
+        ops[0x78 + n] = mov_reg_imm
+        ops[0x88 + n] = mov_dir_reg
+        ops[0xA8 + n] = mov_reg_dir
+        ops[0xF8 + n] = mov_reg_a
+
+    def movc_pc(pc):
+        sfr[ACC] = code[(sfr[ACC] + pc) & 0xFFFF]
+        return pc
+    ops[0x83] = movc_pc
+
+    def movc_dptr(pc):
+        sfr[ACC] = code[(sfr[ACC] + (sfr[DPH] << 8 | sfr[DPL])) & 0xFFFF]
+        return pc
+    ops[0x93] = movc_dptr
+
+    def movx_a_dptr(pc):
+        sfr[ACC] = xram[sfr[DPH] << 8 | sfr[DPL]]
+        return pc
+    ops[0xE0] = movx_a_dptr
+
+    def movx_dptr_a(pc):
+        xram[sfr[DPH] << 8 | sfr[DPL]] = sfr[ACC]
+        return pc
+    ops[0xF0] = movx_dptr_a
+
+    for i in (0, 1):
+        def movx_a_ind(pc, i=i):                # @Ri with P2 as the high address byte
+            sfr[ACC] = xram[sfr[P2] << 8 | iram[(sfr[PSW] & 0x18) | i]]
+            return pc
+
+        def movx_ind_a(pc, i=i):
+            xram[sfr[P2] << 8 | iram[(sfr[PSW] & 0x18) | i]] = sfr[ACC]
+            return pc
+
+        ops[0xE2 + i] = movx_a_ind
+        ops[0xF2 + i] = movx_ind_a
+
+    # --- XCH / XCHD / SWAP / CLR / CPL / rotates / DA / MUL / DIV ---
+
+    def xch_dir(pc):
+        a = code[pc]
+        v = rd(a)
+        wr(a, sfr[ACC])
+        sfr[ACC] = v
+        return pc + 1
+    ops[0xC5] = xch_dir
+
+    for i in (0, 1):
+        def xch_ind(pc, i=i):
+            a = iram[(sfr[PSW] & 0x18) | i]
+            iram[a], sfr[ACC] = sfr[ACC], iram[a]
+            return pc
+
+        def xchd_ind(pc, i=i):
+            a = iram[(sfr[PSW] & 0x18) | i]
+            acc, m = sfr[ACC], iram[a]
+            sfr[ACC] = (acc & 0xF0) | (m & 0x0F)
+            iram[a] = (m & 0xF0) | (acc & 0x0F)
+            return pc
+
+        ops[0xC6 + i] = xch_ind
+        ops[0xD6 + i] = xchd_ind
+
+    for n in range(8):
+        def xch_reg(pc, n=n):
+            a = (sfr[PSW] & 0x18) | n
+            iram[a], sfr[ACC] = sfr[ACC], iram[a]
+            return pc
+        ops[0xC8 + n] = xch_reg
+
+    def swap(pc):
+        a = sfr[ACC]
+        sfr[ACC] = (a << 4 | a >> 4) & 0xFF
+        return pc
+    ops[0xC4] = swap
+
+    def clr_a(pc):
+        sfr[ACC] = 0
+        return pc
+    ops[0xE4] = clr_a
+
+    def cpl_a(pc):
+        sfr[ACC] ^= 0xFF
+        return pc
+    ops[0xF4] = cpl_a
+
+    def rr(pc):
+        a = sfr[ACC]
+        sfr[ACC] = (a >> 1 | a << 7) & 0xFF
+        return pc
+    ops[0x03] = rr
+
+    def rl(pc):
+        a = sfr[ACC]
+        sfr[ACC] = (a << 1 | a >> 7) & 0xFF
+        return pc
+    ops[0x23] = rl
+
+    def rrc(pc):
+        a = sfr[ACC]
+        psw = sfr[PSW]
+        sfr[ACC] = a >> 1 | (0x80 if psw & CY else 0)
+        sfr[PSW] = (psw & 0x7F) | (CY if a & 1 else 0)
+        return pc
+    ops[0x13] = rrc
+
+    def rlc(pc):
+        a = sfr[ACC]
+        psw = sfr[PSW]
+        sfr[ACC] = (a << 1 & 0xFF) | (1 if psw & CY else 0)
+        sfr[PSW] = (psw & 0x7F) | (CY if a & 0x80 else 0)
+        return pc
+    ops[0x33] = rlc
+
+    def da(pc):
+        psw = sfr[PSW]
+        e = DA[(psw >> 6) << 8 | sfr[ACC]]
+        sfr[ACC] = e & 0xFF
+        sfr[PSW] = psw | e >> 8
+        return pc
+    ops[0xD4] = da
+
+    def mul(pc):
+        r = sfr[ACC] * sfr[B]
+        sfr[ACC] = r & 0xFF
+        sfr[B] = r >> 8
+        sfr[PSW] = (sfr[PSW] & 0x7B) | (OV if r > 0xFF else 0)
+        return pc
+    ops[0xA4] = mul
+
+    def div(pc):
+        b = sfr[B]
+        if b == 0:
+            sfr[PSW] = (sfr[PSW] & 0x7B) | OV
+        else:
+            a = sfr[ACC]
+            sfr[ACC] = a // b
+            sfr[B] = a % b
+            sfr[PSW] &= 0x7B
+        return pc
+    ops[0x84] = div
+
+    # --- bit operations ---
+
+    def clr_c(pc):
+        sfr[PSW] &= 0x7F
+        return pc
+    ops[0xC3] = clr_c
+
+    def setb_c(pc):
+        sfr[PSW] |= CY
+        return pc
+    ops[0xD3] = setb_c
+
+    def cpl_c(pc):
+        sfr[PSW] ^= CY
+        return pc
+    ops[0xB3] = cpl_c
+
+    def clr_bit(pc):
+        wbit(code[pc], 0)
+        return pc + 1
+    ops[0xC2] = clr_bit
+
+    def setb_bit(pc):
+        wbit(code[pc], 1)
+        return pc + 1
+    ops[0xD2] = setb_bit
+
+    def cpl_bit(pc):
+        b = code[pc]
+        wbit(b, not rbit(b))
+        return pc + 1
+    ops[0xB2] = cpl_bit
+
+    def mov_c_bit(pc):
+        sfr[PSW] = (sfr[PSW] & 0x7F) | (CY if rbit(code[pc]) else 0)
+        return pc + 1
+    ops[0xA2] = mov_c_bit
+
+    def mov_bit_c(pc):
+        wbit(code[pc], sfr[PSW] & CY)
+        return pc + 1
+    ops[0x92] = mov_bit_c
+
+    def orl_c_bit(pc):
+        if rbit(code[pc]):
+            sfr[PSW] |= CY
+        return pc + 1
+    ops[0x72] = orl_c_bit
+
+    def anl_c_bit(pc):
+        if not rbit(code[pc]):
+            sfr[PSW] &= 0x7F
+        return pc + 1
+    ops[0x82] = anl_c_bit
+
+    def orl_c_nbit(pc):
+        if not rbit(code[pc]):
+            sfr[PSW] |= CY
+        return pc + 1
+    ops[0xA0] = orl_c_nbit
+
+    def anl_c_nbit(pc):
+        if rbit(code[pc]):
+            sfr[PSW] &= 0x7F
+        return pc + 1
+    ops[0xB0] = anl_c_nbit
+
+    # --- jumps, calls, returns ---
+
+    for page in range(8):
+        def ajmp(pc, page=page):
+            return ((pc + 1) & 0xF800) | page << 8 | code[pc]
+
+        def acall(pc, page=page):
+            ret = pc + 1
+            push(ret & 0xFF)
+            push(ret >> 8 & 0xFF)
+            return (ret & 0xF800) | page << 8 | code[pc]
+
+        ops[page << 5 | 0x01] = ajmp
+        ops[page << 5 | 0x11] = acall
+
+    def ljmp(pc):
+        return code[pc] << 8 | code[pc + 1]
+    ops[0x02] = ljmp
+
+    def lcall(pc):
+        ret = pc + 2
+        push(ret & 0xFF)
+        push(ret >> 8 & 0xFF)
+        return code[pc] << 8 | code[pc + 1]
+    ops[0x12] = lcall
+
+    def ret(pc):
+        hi = pop()
+        return hi << 8 | pop()
+    ops[0x22] = ret
+    ops[0x32] = ret
+
+    def sjmp(pc):
+        return pc + 1 + REL[code[pc]]
+    ops[0x80] = sjmp
+
+    def jmp_a_dptr(pc):
+        return (sfr[ACC] + (sfr[DPH] << 8 | sfr[DPL])) & 0xFFFF
+    ops[0x73] = jmp_a_dptr
+
+    def jc(pc):
+        return pc + 1 + REL[code[pc]] if sfr[PSW] & CY else pc + 1
+    ops[0x40] = jc
+
+    def jnc(pc):
+        return pc + 1 if sfr[PSW] & CY else pc + 1 + REL[code[pc]]
+    ops[0x50] = jnc
+
+    def jz(pc):
+        return pc + 1 if sfr[ACC] else pc + 1 + REL[code[pc]]
+    ops[0x60] = jz
+
+    def jnz(pc):
+        return pc + 1 + REL[code[pc]] if sfr[ACC] else pc + 1
+    ops[0x70] = jnz
+
+    def jb(pc):
+        return pc + 2 + REL[code[pc + 1]] if rbit(code[pc]) else pc + 2
+    ops[0x20] = jb
+
+    def jnb(pc):
+        return pc + 2 if rbit(code[pc]) else pc + 2 + REL[code[pc + 1]]
+    ops[0x30] = jnb
+
+    def jbc(pc):
+        b = code[pc]
+        if rbit(b):
+            wbit(b, 0)
+            return pc + 2 + REL[code[pc + 1]]
+        return pc + 2
+    ops[0x10] = jbc
+
+    def cjne_a_imm(pc):
+        a, v = sfr[ACC], code[pc]
+        sfr[PSW] = (sfr[PSW] & 0x7F) | (CY if a < v else 0)
+        return pc + 2 + REL[code[pc + 1]] if a != v else pc + 2
+    ops[0xB4] = cjne_a_imm
+
+    def cjne_a_dir(pc):
+        a, v = sfr[ACC], rd(code[pc])
+        sfr[PSW] = (sfr[PSW] & 0x7F) | (CY if a < v else 0)
+        return pc + 2 + REL[code[pc + 1]] if a != v else pc + 2
+    ops[0xB5] = cjne_a_dir
+
+    for i in (0, 1):
+        def cjne_ind(pc, i=i):
+            a, v = iram[iram[(sfr[PSW] & 0x18) | i]], code[pc]
+            sfr[PSW] = (sfr[PSW] & 0x7F) | (CY if a < v else 0)
+            return pc + 2 + REL[code[pc + 1]] if a != v else pc + 2
+        ops[0xB6 + i] = cjne_ind
+
+    for n in range(8):
+        def cjne_reg(pc, n=n):
+            a, v = iram[(sfr[PSW] & 0x18) | n], code[pc]
+            sfr[PSW] = (sfr[PSW] & 0x7F) | (CY if a < v else 0)
+            return pc + 2 + REL[code[pc + 1]] if a != v else pc + 2
+
+        def djnz_reg(pc, n=n):
+            a = (sfr[PSW] & 0x18) | n
+            v = (iram[a] - 1) & 0xFF
+            iram[a] = v
+            return pc + 1 + REL[code[pc]] if v else pc + 1
+
+        ops[0xB8 + n] = cjne_reg
+        ops[0xD8 + n] = djnz_reg
+
+    def djnz_dir(pc):
+        a = code[pc]
+        v = (rd(a) - 1) & 0xFF
+        wr(a, v)
+        return pc + 2 + REL[code[pc + 1]] if v else pc + 2
+    ops[0xD5] = djnz_dir
+
+    # --- stack and misc ---
+
+    def push_dir(pc):
+        push(rd(code[pc]))
+        return pc + 1
+    ops[0xC0] = push_dir
+
+    def pop_dir(pc):
+        wr(code[pc], pop())
+        return pc + 1
+    ops[0xD0] = pop_dir
+
+    def nop(pc):
+        return pc
+    ops[0x00] = nop
+
+    def undefined(pc):
+        raise ValueError(f"undefined opcode A5 at {pc - 1:04X}")
+    ops[0xA5] = undefined
+
+    assert all(ops), [hex(i) for i, h in enumerate(ops) if h is None]
+    return ops
+
+# ---- CPU ----
+
+class CPU8051:
+    """8051 machine state plus the opcode table that runs code memory."""
+
+    def __init__(self, image=None, origin=0):
+        self.code = bytearray(0x10000)
+        self.iram = bytearray(0x100)
+        self.sfr = bytearray(0x100)         # indexed by direct address 0x80..0xFF
+        self.xram = bytearray(0x10000)
+        self.pc = 0
+        self.cycles = 0
+        self.steps = 0
+        self.halted = False
+        self._ops = _build_ops(self)
+        self.reset()
+        if image is not None:
+            self.load(image, origin)
+
+    def reset(self):
+        """Power-on reset: SFRs to reset values, PC 0, counters cleared (memories kept)."""
+        self.sfr[:] = bytes(0x100)
+        self.sfr[SP] = 0x07
+        for port in (P0, P1, P2, P3):
+            self.sfr[port] = 0xFF
+        self.pc = 0
+        self.cycles = 0
+        self.steps = 0
+        self.halted = False
+
+    def load(self, image, origin=0):
+        """Copy a binary image into code memory at origin."""
+        if origin + len(image) > 0x10000:
+            raise ValueError("image does not fit in 64 KB of code memory")
+        self.code[origin:origin + len(image)] = image
+
+    def load_segments(self, segments):
+        """Load (address, bytes) segments, e.g. from read_ihex or the assembler."""
+        for origin, data in segments:
+            self.load(data, origin)
+
+    # --- register views ---
+
+    @property
+    def a(self):
+        return self.sfr[ACC]
+
+    @a.setter
+    def a(self, v):
+        self.sfr[ACC] = v & 0xFF
+
+    @property
+    def b(self):
+        return self.sfr[B]
+
+    @b.setter
+    def b(self, v):
+        self.sfr[B] = v & 0xFF
+
+    @property
+    def psw(self):
+        """PSW with the parity bit computed from A."""
+        return (self.sfr[PSW] & 0xFE) | PARITY[self.sfr[ACC]]
+
+    @psw.setter
+    def psw(self, v):
+        self.sfr[PSW] = v & 0xFF
+
+    @property
+    def sp(self):
+        return self.sfr[SP]
+
+    @sp.setter
+    def sp(self, v):
+        self.sfr[SP] = v & 0xFF
+
+    @property
+    def dptr(self):
+        return self.sfr[DPH] << 8 | self.sfr[DPL]
+
+    @dptr.setter
+    def dptr(self, v):
+        self.sfr[DPH] = v >> 8 & 0xFF
+        self.sfr[DPL] = v & 0xFF
+
+    def r(self, n):
+        """Register Rn of the bank selected by RS1/RS0."""
+        return self.iram[(self.sfr[PSW] & 0x18) | n]
+
+    def set_r(self, n, v):
+        self.iram[(self.sfr[PSW] & 0x18) | n] = v & 0xFF
+
+    def flag(self, bit):
+        """1 if PSW bit (CY, AC, OV, P, ...) is set."""
+        return 1 if self.psw & bit else 0
+
+    def read_direct(self, addr):
+        """Read a direct address (internal RAM below 0x80, SFR above)."""
+        if addr < 0x80:
+            return self.iram[addr]
+        return self.psw if addr == PSW else self.sfr[addr]
+
+    def write_direct(self, addr, v):
+        if addr < 0x80:
+            self.iram[addr] = v & 0xFF
+        else:
+            self.sfr[addr] = v & 0xFF
+
+    # --- execution ---
+
+    def step(self):
+        """Execute one instruction; return its machine cycles."""
+        pc = self.pc
+        op = self.code[pc]
+        nxt = self._ops[op](pc + 1) & 0xFFFF
+        self.halted = nxt == pc and bool(SELF_JUMP_HALTS[op])
+        self.pc = nxt
+        self.cycles += CYCLES[op]
+        self.steps += 1
+        return CYCLES[op]
+
+    def run(self, max_steps=1_000_000):
+        """
+        Execute up to max_steps instructions, stopping early when an
+        instruction jumps to itself without changing state (the usual
+        'SJMP $' end of program; see SELF_JUMP_HALTS).
+        Return the number of instructions executed.
+        """
+        ops = self._ops
+        code = self.code
+        cyc = CYCLES
+        halts = SELF_JUMP_HALTS
+        pc = self.pc
+        cycles = 0
+        n = 0
+        halted = False
+        while n < max_steps:
+            op = code[pc]
+            nxt = ops[op](pc + 1) & 0xFFFF
+            cycles += cyc[op]
+            n += 1
+            if nxt == pc and halts[op]:
+                halted = True
+                break
+            pc = nxt
+        self.pc = pc
+        self.cycles += cycles
+        self.steps += n
+        self.halted = halted
+        return n
+
+    def run_coverage(self, max_steps, bitmap, touched=None):
+        """
+        run() that also sets bit (pc & 7) of bitmap[pc >> 3] for every
+        executed instruction address (bitmap: bytearray of 8192 bytes).
+        With a touched list, the index of every bitmap byte that was zero
+        when first hit is appended, so a reused bitmap can be cleared cheaply.
+        """
+        ops = self._ops
+        code = self.code
+        cyc = CYCLES
+        halts = SELF_JUMP_HALTS
+        pc = self.pc
+        cycles = 0
+        n = 0
+        halted = False
+        while n < max_steps:
+            i = pc >> 3
+            b = bitmap[i]
+            if not b and touched is not None:
+                touched.append(i)
+            bitmap[i] = b | BIT_MASK[pc & 7]
+            op = code[pc]
+            nxt = ops[op](pc + 1) & 0xFFFF
+            cycles += cyc[op]
+            n += 1
+            if nxt == pc and halts[op]:
+                halted = True
+                break
+            pc = nxt
+        self.pc = pc
+        self.cycles += cycles
+        self.steps += n
+        self.halted = halted
+        return n
+
+    # --- snapshots ---
+
+    def snapshot(self):
+        """
+        Full machine state except code memory as one bytes object: counters,
+        then internal RAM, SFRs and external RAM.
+        """
+        return (_SNAP_HEADER.pack(self.pc, self.halted, self.cycles, self.steps)
+                + self.iram + self.sfr + self.xram)
+
+    def restore(self, snap):
+        """Return to a snapshot. Memories are overwritten in place, so handlers stay bound."""
+        if len(snap) != SNAPSHOT_SIZE:
+            raise ValueError("not a CPU8051 snapshot")
+        self.pc, halted, self.cycles, self.steps = _SNAP_HEADER.unpack_from(snap, 0)
+        self.halted = bool(halted)
+        view = memoryview(snap)
+        o = _SNAP_HEADER.size
+        self.iram[:] = view[o:o + 0x100]
+        self.sfr[:] = view[o + 0x100:o + 0x200]
+        self.xram[:] = view[o + 0x200:]
+
+    def __getstate__(self):                     # handlers are closures: pickle memories only
+        return {"code": bytes(self.code), "snapshot": self.snapshot()}
+
+    def __setstate__(self, st):
+        self.__init__()
+        self.code[:] = st["code"]
+        self.restore(st["snapshot"])
+
+    def state(self):
+        """One-line summary in the style of HEX_B's state()."""
+        return (f"PC=0x{self.pc:04X} A=0x{self.a:02X} B=0x{self.b:02X} R7=0x{self.r(7):02X} "
+                f"SP=0x{self.sp:02X} DPTR=0x{self.dptr:04X}  C={self.flag(CY)} AC={self.flag(AC)} "
+                f"OV={self.flag(OV)} P={self.flag(P)}  cycles={self.cycles}")
+
+# ---- Image files ----
+
+def read_ihex(text):
+    """Parse Intel HEX text; return a list of (address, bytearray) segments."""
+    segments = []
+    base = 0
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith(":"):
+            raise ValueError(f"line {lineno}: not an Intel HEX record")
+        try:
+            raw = bytes.fromhex(line[1:])
+        except ValueError:
+            raise ValueError(f"line {lineno}: bad hex digits") from None
+        if len(raw) < 5 or len(raw) != raw[0] + 5:
+            raise ValueError(f"line {lineno}: bad record length")
+        if sum(raw) & 0xFF:
+            raise ValueError(f"line {lineno}: checksum mismatch")
+        count, addr, rtype, data = raw[0], raw[1] << 8 | raw[2], raw[3], raw[4:-1]
+        if rtype == 0x00:
+            addr += base
+            if segments and segments[-1][0] + len(segments[-1][1]) == addr:
+                segments[-1][1].extend(data)
+            else:
+                segments.append((addr, bytearray(data)))
+        elif rtype == 0x01:
+            break
+        elif rtype == 0x02:
+            base = (data[0] << 8 | data[1]) << 4
+        elif rtype == 0x04:
+            base = (data[0] << 8 | data[1]) << 16
+        # start address records (03, 05) carry nothing to load
+    return segments
+
+def write_ihex(segments, record_size=16):
+    """Return Intel HEX text (data records plus EOF) for (address, bytes) segments."""
+    lines = []
+    for origin, data in segments:
+        for off in range(0, len(data), record_size):
+            chunk = bytes(data[off:off + record_size])
+            addr = origin + off
+            rec = bytes([len(chunk), addr >> 8 & 0xFF, addr & 0xFF, 0]) + chunk
+            lines.append(":" + (rec + bytes([-sum(rec) & 0xFF])).hex().upper())
+    lines.append(":00000001FF")
+    return "\n".join(lines) + "\n"
+
+def read_image(path):
+    """Read an image file: Intel HEX (.hex/.ihx) or raw binary loaded at 0. Return segments."""
+    if path.lower().endswith((".hex", ".ihx")):
+        with open(path) as f:
+            return read_ihex(f.read())
+    with open(path, "rb") as f:
+        return [(0, bytearray(f.read()))]
+
+# ---- Disassembly ----
+
+_DIRECT_NAMES = {v: k for k, v in SFR_NAMES.items()}
+
+def disassemble(code, addr):
+    """Return (text, length) of the instruction at addr in a code image."""
+    op = code[addr]
+    spec = OPCODES[op]
+    if spec is None:
+        return f"DB 0x{op:02X}", 1
+    mnemonic, operands, length, _ = spec
+    out = []
+    args = [code[(addr + i) & 0xFFFF] for i in range(1, length)]
+    if op == 0x85:                              # MOV direct,direct is encoded src, dst
+        args = args[::-1]
+    for kind in operands:
+        if kind in ("direct", "#data", "bit", "/bit", "rel"):
+            v = args.pop(0)
+            if kind == "direct":
+                out.append(_DIRECT_NAMES.get(v, f"0x{v:02X}"))
+            elif kind == "#data":
+                out.append(f"#0x{v:02X}")
+            elif kind == "rel":
+                out.append(f"0x{(addr + length + REL[v]) & 0xFFFF:04X}")
+            else:
+                out.append(("/" if kind == "/bit" else "") + f"0x{v:02X}")
+        elif kind == "#data16":
+            out.append(f"#0x{args[0] << 8 | args[1]:04X}")
+        elif kind == "addr16":
+            out.append(f"0x{args[0] << 8 | args[1]:04X}")
+        elif kind == "addr11":
+            out.append(f"0x{((addr + 2) & 0xF800) | (op >> 5) << 8 | args[0]:04X}")
+        else:
+            out.append(kind)
+    return (mnemonic + " " + ",".join(out)).strip(), length
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        raise SystemExit(1)
+    cpu = CPU8051()
+    cpu.load_segments(read_image(sys.argv[1]))
+    cpu.run(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    print(cpu.state())
@@ -1,27 +1,21 @@
+from dfa_engine import DFA
+
+# q0 start state, q2 accepting; any character other than '0' counts as '1'
+# in q0 and q2, and anything other than '1' keeps q1
+ENDSWITH01 = DFA({
+    0: {"0": 1, None: 0},
+    1: {"1": 2, None: 1},
+    2: {"0": 1, None: 0},
+}, start=0, accepting={2})
+
 def dfa_endswith01(input_string):
-    state = 0  # q0 start state
-    for char in input_string:
-        if state == 0:
-            if char == '0':
-                state = 1
-            else:
-                state = 0
-        elif state == 1:
-            if char == '1':
-                state = 2
-            else:
-                state = 1
-        elif state == 2:
-            if char == '0':
-                state = 1
-            else:
-                state = 0
-    return "Accepted" if state == 2 else "Rejected"
+    return "Accepted" if ENDSWITH01.accepts(input_string) else "Rejected"
 
-# User input
-user_input = input("Enter a binary string: ")
-print(f"{user_input} → {dfa_endswith01(user_input)}")
+if __name__ == "__main__":
+    # User input
+    user_input = input("Enter a binary string: ")
+    print(f"{user_input} → {dfa_endswith01(user_input)}")
 
-# Test
-for s in ["01", "101", "1101", "111", "000"]:
-    print(f"{s} → {dfa_endswith01(s)}")
+    # Test
+    for s in ["01", "101", "1101", "111", "000"]:
+        print(f"{s} → {dfa_endswith01(s)}")
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+dfa_engine.py
+Table-driven deterministic finite automata over bytes.
+
+A DFA is built from a transition spec
+
+  {"q0": {"0": "q1", "1": "q0"},       # one entry per state, first state listed first
+   "q1": {"0": "q1", "1": "q2"},       # keys are symbols; a key of several characters
+   "q2": {"0": "q1", None: "q0"}}      # means each of them, None means any other byte
+
+and compiled into
+- a byte-class map: bytes that behave the same in every state share a class,
+  so bytes.translate() turns the input into class numbers in one C call;
+- a dense table indexed by state * classes + class holding the next state
+  already multiplied by the number of classes, so the inner loop is
+  `s = delta[s + c]` with no string compares per character.
+
+A symbol with no transition (and no None default) is invalid: run() raises
+ValueError naming its position, the way TG.py always has. Bytes passed as
+`ignore` (e.g. b"\r\n") leave every state unchanged.
+
+Streaming: Runner carries the state across chunks, and scan()/run_stream()
+read a file object through readinto() into one reused buffer (or take any
+iterable of byte chunks), so memory stays constant however large the input.
+Match positions are the offsets just past each byte after which the machine
+is in an accepting state (for "ends with 01": one past every "01").
+
+Parallel: transition_map() runs a chunk from every state at once and returns
+the state -> state map it induces; run_parallel() computes the maps of
+fixed-size chunks on a ProcessPoolExecutor and composes them in order.
+Runs from different start states usually merge within a few bytes, after
+which only one run continues, so a map costs little more than one run.
+
+TG.py, dfa.py, fsm.py and automaton.py define their machines as DFA instances.
+
+Usage:
+  python dfa_engine.py TG:ENDS01 big.txt|- [--positions] [--ignore-newlines] [--workers N]
+"""
+
+import argparse
+import importlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 16
+PARALLEL_CHUNK = 1 << 22        # bytes per transition-map job
+MERGE_BLOCK = 256               # bytes run per distinct state before re-checking for merges
+
+class DFA:
+    """Compiled DFA; see the module docstring for the spec format."""
+
+    def __init__(self, transitions, start, accepting, ignore=b""):
+        self.spec = (transitions, start, frozenset(accepting))
+        names = list(transitions)
+        for row in transitions.values():
+            for target in row.values():
+                if target not in names:
+                    names.append(target)
+        if start not in names:
+            raise ValueError(f"Unknown start state {start!r}")
+        unknown = set(accepting) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown accepting states {sorted(unknown)!r}")
+        index = {name: i for i, name in enumerate(names)}
+        error = len(names)                      # invalid symbol: absorbing, never accepting
+
+        rows = []
+        for name in names:
+            row = transitions.get(name, {})
+            per_byte = {}
+            for key, target in row.items():
+                if key is None:
+                    continue
+                for ch in key:
+                    b = ord(ch)
+                    if b > 0xFF:
+                        raise ValueError(f"Symbol {ch!r} is not a byte")
+                    per_byte[b] = index[target]
+            default = index[row[None]] if None in row else error
+            rows.append([per_byte.get(b, default) for b in range(256)])
+        for i, row in enumerate(rows):
+            for b in ignore:
+                row[b] = i
+
+        # bytes with the same column of targets form one symbol class; ignored
+        # bytes get a class of their own even if a real symbol also maps every
+        # state to itself, so match positions can tell the two apart
+        column_class = {}
+        columns = []
+        classmap = bytearray(256)
+        ignored = set(ignore)
+        for b in range(256):
+            col = tuple(row[b] for row in rows)
+            key = (col, b in ignored)
+            if key not in column_class:
+                column_class[key] = len(columns)
+                columns.append(col)
+            classmap[b] = column_class[key]
+        k = len(columns)
+
+        self.names = names + ["<error>"]
+        self.index = index
+        self.start = index[start]
+        self.accepting = frozenset(index[a] for a in accepting)
+        self.error = error
+        self.num_states = len(names)
+        self.num_classes = k
+        self.classmap = bytes(classmap)
+        self.ignore = bytes(ignore)
+        self.ignore_class = classmap[ignore[0]] if ignore else -1
+        self.delta = [0] * ((error + 1) * k)    # premultiplied next states
+        for s in range(error + 1):
+            for c in range(k):
+                t = columns[c][s] if s < error else error
+                self.delta[s * k + c] = t * k
+        self.accept_table = bytes(1 if s // k in self.accepting else 0 for s in range((error + 1) * k))
+
+    # --- building blocks ---
+
+    def next_state(self, state, byte):
+        """Next state index from state index on one byte value."""
+        return self.delta[state * self.num_classes + self.classmap[byte]] // self.num_classes
+
+    def encode(self, data):
+        """Input as bytes: str is encoded Latin-1, other characters become '?'."""
+        if isinstance(data, str):
+            return data.encode("latin-1", "replace")
+        return data
+
+    def feed(self, s, data):
+        """
+        Advance premultiplied state s (state * num_classes) over a bytes-like
+        chunk and return the new premultiplied state.
+        """
+        delta = self.delta
+        for c in data.translate(self.classmap):
+            s = delta[s + c]
+        return s
+
+    def transition_map(self, data):
+        """
+        Tuple t where t[q] is the state index reached from state index q
+        (error state included) after reading bytes data.
+        """
+        k = self.num_classes
+        delta = self.delta
+        classes = data.translate(self.classmap)
+        err = self.error * k                                       # absorbing: never needs a run
+        origin = {q * k: q * k for q in range(self.error + 1)}    # start -> current
+        pos = 0
+        while pos < len(classes):
+            current = set(origin.values()) - {err}
+            if not current:
+                break
+            piece = classes[pos:pos + MERGE_BLOCK] if len(current) > 1 else classes[pos:]
+            moved = {err: err}
+            for start in current:
+                s = start
+                for c in piece:
+                    s = delta[s + c]
+                moved[start] = s
+            origin = {q: moved[v] for q, v in origin.items()}
+            pos += len(piece)
+        return tuple(origin[q * k] // k for q in range(self.error + 1))
+
+    def ignoring(self, ignore):
+        """The same machine with the bytes in `ignore` leaving every state unchanged."""
+        transitions, start, accepting = self.spec
+        return DFA(transitions, start, accepting, self.ignore + bytes(ignore))
+
+    def first_invalid(self, data, state=None):
+        """Offset of the first invalid symbol in bytes data read from state (default start), or None."""
+        k = self.num_classes
+        s = (self.start if state is None else state) * k
+        delta = self.delta
+        err = self.error * k
+        for i, c in enumerate(data.translate(self.classmap)):
+            s = delta[s + c]
+            if s == err:
+                return i
+        return None
+
+    # --- running ---
+
+    def run(self, data):
+        """Final state name after reading data (str or bytes-like)."""
+        raw = self.encode(data)
+        s = self.feed(self.start * self.num_classes, raw)
+        if s == self.error * self.num_classes:
+            pos = self.first_invalid(raw)
+            ch = data[pos] if isinstance(data, str) else chr(raw[pos])
+            raise ValueError(f"Invalid character at position {pos}: {ch}")
+        return self.names[s // self.num_classes]
+
+    def accepts(self, data):
+        """True if data drives the machine into an accepting state."""
+        return self.index[self.run(data)] in self.accepting
+
+    def runner(self):
+        """A Runner positioned at the start state."""
+        return Runner(self)
+
+    def scan(self, source, chunk_size=CHUNK_SIZE):
+        """Yield match positions (see the module docstring) of a stream, in order."""
+        r = Runner(self)
+        for chunk in read_chunks(source, chunk_size):
+            yield from r.feed(chunk, positions=True)
+
+    def run_stream(self, source, chunk_size=CHUNK_SIZE):
+        """Run over a whole stream. Return {"state", "accepted", "bytes"}."""
+        r = Runner(self)
+        for chunk in read_chunks(source, chunk_size):
+            r.feed(chunk)
+        return {"state": r.state, "accepted": r.accepted, "bytes": r.offset}
+
+    def __repr__(self):
+        return (f"DFA({self.num_states} states, {self.num_classes} symbol classes, "
+                f"start {self.names[self.start]!r})")
+
+# ---- Streaming ----
+
+def read_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Yield byte chunks of a binary file object, read with readinto() into one
+    reused buffer (each chunk is only valid until the next is requested), or
+    pass through the chunks of any other iterable.
+    """
+    if not hasattr(source, "readinto"):
+        yield from source
+        return
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = source.readinto(buf)
+        if not n:
+            return
+        yield buf if n == chunk_size else view[:n]
+
+class Runner:
+    """A DFA run that can be fed input chunk by chunk."""
+
+    def __init__(self, dfa):
+        self.dfa = dfa
+        self.s = dfa.start * dfa.num_classes    # premultiplied current state
+        self.offset = 0                         # bytes consumed so far
+
+    def feed(self, chunk, positions=False):
+        """
+        Consume one chunk. With positions=True return the absolute match
+        positions ending inside it; otherwise return an empty list.
+        """
+        d = self.dfa
+        data = chunk if hasattr(chunk, "translate") else bytes(chunk)
+        s = self.s
+        out = []
+        if positions:
+            delta, acc, ign = d.delta, d.accept_table, d.ignore_class
+            base = self.offset + 1
+            for i, c in enumerate(data.translate(d.classmap)):
+                s = delta[s + c]
+                if acc[s] and c != ign:
+                    out.append(base + i)
+        else:
+            s = d.feed(s, data)
+        if s == d.error * d.num_classes:
+            pos = d.first_invalid(data, self.s // d.num_classes)
+            raise ValueError(f"Invalid character at position {self.offset + pos}: {chr(data[pos])}")
+        self.s = s
+        self.offset += len(data)
+        return out
+
+    @property
+    def state(self):
+        return self.dfa.names[self.s // self.dfa.num_classes]
+
+    @property
+    def accepted(self):
+        return bool(self.dfa.accept_table[self.s])
+
+# ---- Parallel runs ----
+
+def compose(first, then):
+    """Map of reading the input of `first` followed by that of `then`."""
+    return tuple(then[q] for q in first)
+
+_worker_dfa = None
+
+def _init_worker(dfa):
+    global _worker_dfa
+    _worker_dfa = dfa
+
+def _read_span(path, offset, length):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+def _map_job(job):
+    """ProcessPoolExecutor entry point: transition map of one chunk (bytes or a file span)."""
+    data = _read_span(*job) if isinstance(job, tuple) else job
+    return _worker_dfa.transition_map(data)
+
+def run_parallel(dfa, source, workers=None, chunk_size=PARALLEL_CHUNK):
+    """
+    Run dfa over bytes or a file path by composing per-chunk transition maps
+    computed on a process pool. Return {"state", "accepted", "bytes"}; an
+    invalid character raises ValueError with its position, like run().
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        jobs = [(source, off, min(chunk_size, size - off)) for off in range(0, size, chunk_size)]
+    else:
+        size = len(source)
+        jobs = [source[off:off + chunk_size] for off in range(0, size, chunk_size)]
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(dfa)
+        maps = [_map_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dfa,)) as pool:
+            maps = list(pool.map(_map_job, jobs))
+    q = dfa.start
+    for i, m in enumerate(maps):              # reduce in order
+        if m[q] == dfa.error:
+            data = _read_span(*jobs[i]) if isinstance(jobs[i], tuple) else jobs[i]
+            pos = dfa.first_invalid(data, q)
+            raise ValueError(f"Invalid character at position {i * chunk_size + pos}: {chr(data[pos])}")
+        q = m[q]
+    return {"state": dfa.names[q], "accepted": q in dfa.accepting, "bytes": size}
+
+# ---- Command line ----
+
+def load_machine(spec):
+    """'module:NAME' -> the DFA instance NAME defined in module (e.g. TG:ENDS01)."""
+    module, _, name = spec.partition(":")
+    machine = getattr(importlib.import_module(module), name, None)
+    if not hasattr(machine, "run_stream"):       # DFA instance (also when run as __main__)
+        raise ValueError(f"{spec!r} is not a DFA")
+    return machine
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a DFA over a file or stdin in constant memory")
+    ap.add_argument("machine", help="module:NAME of a DFA instance, e.g. TG:ENDS01 or dfa:ENDSWITH01")
+    ap.add_argument("file", help="input file, or - for stdin")
+    ap.add_argument("--positions", action="store_true", help="print every match position")
+    ap.add_argument("--ignore-newlines", action="store_true")
+    ap.add_argument("--chunk-size", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None,
+                    help="compose per-chunk transition maps on this many processes (files only)")
+    args = ap.parse_args()
+    machine = load_machine(args.machine)
+    if args.ignore_newlines:
+        machine = machine.ignoring(b"\r\n")
+    if args.workers and (args.positions or args.file == "-"):
+        ap.error("--workers needs a file and cannot print positions")
+    if args.workers:
+        try:
+            res = run_parallel(machine, args.file, args.workers, args.chunk_size or PARALLEL_CHUNK)
+        except ValueError as err:
+            raise SystemExit(f"Error: {err}")
+        print(f"{res['bytes']} bytes, final state {res['state']}: "
+              f"{'Accepted' if res['accepted'] else 'Rejected'}")
+        return
+    chunk_size = args.chunk_size or CHUNK_SIZE
+    f = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        if args.positions:
+            r = machine.runner()
+            for chunk in read_chunks(f, chunk_size):
+                for pos in r.feed(chunk, positions=True):
+                    print(pos)
+            res = {"state": r.state, "accepted": r.accepted, "bytes": r.offset}
+        else:
+            res = machine.run_stream(f, chunk_size)
+    except ValueError as err:
+        raise SystemExit(f"Error: {err}")
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+    print(f"{res['bytes']} bytes, final state {res['state']}: "
+          f"{'Accepted' if res['accepted'] else 'Rejected'}")
+
+if __name__ == "__main__":
+    main()
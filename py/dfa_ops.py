@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+dfa_ops.py
+Minimisation, products and equivalence checks for dfa_engine.DFA machines.
+
+Every operation works on the complete machine over an alphabet of bytes
+(default: all 256), where the engine's error state is an ordinary
+rejecting sink. Results are new DFA instances built from transition specs
+whose symbol keys are the byte classes, so they run, stream and
+parallelise like any other machine. Transitions into a state that stands
+for "every input machine has hit an invalid symbol" are left out, so such
+input still raises ValueError instead of being silently rejected.
+
+  minimise(dfa)             Hopcroft partition refinement, unreachable states dropped
+  intersection(a, b)        accepts what both accept (one scan for two filters)
+  union(a, b)               accepts what either accepts
+  complement(dfa)           accepts what dfa rejects, over the alphabet
+  equivalent(a, b)          (True, None) or (False, shortest distinguishing input)
+
+Usage:
+  python dfa_ops.py         # compare the ends-with-01 machines of TG.py, dfa.py and fsm.py
+"""
+
+from collections import deque
+
+from dfa_engine import DFA
+
+# ---- Explicit tables ----
+
+def _classes(machines, alphabet):
+    """
+    Joint symbol classes of several machines over an alphabet: a list of
+    (tuple of per-machine classes, bytes belonging to the class).
+    """
+    groups = {}
+    for b in sorted(set(range(256) if alphabet is None else bytes(alphabet))):
+        groups.setdefault(tuple(m.classmap[b] for m in machines), bytearray()).append(b)
+    return [(key, bytes(members)) for key, members in groups.items()]
+
+def _step(m, q, c):
+    """Next state index of machine m from state index q on class c (error state included)."""
+    return m.delta[q * m.num_classes + c] // m.num_classes
+
+def _symbols(members):
+    return members.decode("latin-1")
+
+def _to_dfa(names, table, symbols, start, accepting, drop=None):
+    """DFA from explicit rows: table[i][j] is the target of state i on symbol class j."""
+    spec = {}
+    for i, row in enumerate(table):
+        if i != drop:
+            spec[names[i]] = {symbols[j]: names[t] for j, t in enumerate(row) if t != drop}
+    return DFA(spec, names[start], {names[i] for i in accepting})
+
+def _product_table(machines, alphabet, accept):
+    """
+    Reachable product of machines. Return (names, table, symbols, accepting,
+    dead) where state 0 is the start and dead is the all-error state or None.
+    """
+    classes = _classes(machines, alphabet)
+    start = tuple(m.start for m in machines)
+    index = {start: 0}
+    order = [start]
+    table = []
+    for tup in order:                           # order grows while we walk it (BFS)
+        row = []
+        for key, _ in classes:
+            nxt = tuple(_step(m, q, c) for m, q, c in zip(machines, tup, key))
+            if nxt not in index:
+                index[nxt] = len(order)
+                order.append(nxt)
+            row.append(index[nxt])
+        table.append(row)
+    accepting = {i for i, tup in enumerate(order)
+                 if accept([q in m.accepting for m, q in zip(machines, tup)])}
+    dead = index.get(tuple(m.error for m in machines))
+    if len(machines) == 1:
+        names = [machines[0].names[tup[0]] for tup in order]
+    else:
+        names = ["(" + ",".join(str(m.names[q]) for m, q in zip(machines, tup)) + ")" for tup in order]
+    return names, table, [_symbols(members) for _, members in classes], accepting, dead
+
+# ---- Minimisation ----
+
+def _hopcroft(n, k, table, accepting):
+    """Partition of states 0..n-1 into blocks of equivalent states."""
+    inverse = [[[] for _ in range(n)] for _ in range(k)]
+    for s in range(n):
+        for c in range(k):
+            inverse[c][table[s][c]].append(s)
+    final = set(accepting)
+    partition = [b for b in (final, set(range(n)) - final) if b]
+    work = list(partition)
+    while work:
+        splitter = work.pop()
+        for c in range(k):
+            x = set()
+            for q in splitter:
+                x.update(inverse[c][q])
+            if not x:
+                continue
+            refined = []
+            for y in partition:
+                inside = y & x
+                if inside and len(inside) < len(y):
+                    outside = y - inside
+                    refined += [inside, outside]
+                    if y in work:
+                        work.remove(y)
+                        work += [inside, outside]
+                    else:
+                        work.append(inside if len(inside) <= len(outside) else outside)
+                else:
+                    refined.append(y)
+            partition = refined
+    return partition
+
+def minimise(dfa, alphabet=None):
+    """The minimal DFA for the same language (reachable states only)."""
+    names, table, symbols, accepting, dead = _product_table([dfa], alphabet, lambda acc: acc[0])
+    blocks = sorted(_hopcroft(len(table), len(symbols), table, accepting), key=min)
+    block_of = {}
+    for i, block in enumerate(blocks):
+        for q in block:
+            block_of[q] = i
+    new_names = [names[min(b)] if len(b) == 1 else "{" + ",".join(str(names[q]) for q in sorted(b)) + "}"
+                 for b in blocks]
+    new_table = [[block_of[t] for t in table[min(b)]] for b in blocks]
+    new_accepting = {block_of[q] for q in accepting}
+    # only a block holding nothing but the error state is left out; if the
+    # error state merged with a reachable rejecting sink, the block is kept
+    # and invalid symbols are then rejected rather than raising
+    drop = None if dead is None or len(blocks[block_of[dead]]) != 1 else block_of[dead]
+    return _to_dfa(new_names, new_table, symbols, block_of[0], new_accepting, drop)
+
+# ---- Products and complement ----
+
+def product(machines, accept, alphabet=None):
+    """
+    Product of several machines accepting where accept(list of per-machine
+    acceptance flags) is true; every input is scanned once for all of them.
+    """
+    names, table, symbols, accepting, dead = _product_table(list(machines), alphabet, accept)
+    return _to_dfa(names, table, symbols, 0, accepting, dead)
+
+def intersection(a, b, alphabet=None):
+    return product([a, b], all, alphabet)
+
+def union(a, b, alphabet=None):
+    return product([a, b], any, alphabet)
+
+def complement(dfa, alphabet=None):
+    """Accepts exactly the inputs over the alphabet that dfa rejects (invalid input included)."""
+    names, table, symbols, accepting, _ = _product_table([dfa], alphabet, lambda acc: not acc[0])
+    return _to_dfa(names, table, symbols, 0, accepting)
+
+# ---- Equivalence ----
+
+def equivalent(a, b, alphabet=None):
+    """
+    Compare the languages of two machines over an alphabet. Return
+    (True, None), or (False, w) with w a shortest input (bytes) accepted by
+    exactly one of them.
+    """
+    classes = _classes([a, b], alphabet)
+    start = (a.start, b.start)
+    parent = {start: None}
+    queue = deque([start])
+    while queue:
+        pair = queue.popleft()
+        qa, qb = pair
+        if (qa in a.accepting) != (qb in b.accepting):
+            witness = bytearray()
+            while parent[pair] is not None:
+                pair, byte = parent[pair]
+                witness.append(byte)
+            return False, bytes(reversed(witness))
+        for (ca, cb), members in classes:
+            nxt = (_step(a, qa, ca), _step(b, qb, cb))
+            if nxt not in parent:
+                parent[nxt] = (pair, members[0])
+                queue.append(nxt)
+    return True, None
+
+if __name__ == "__main__":
+    import automaton
+    import dfa
+    import fsm
+    import TG
+    machines = {"TG.ENDS01": TG.ENDS01, "dfa.ENDSWITH01": dfa.ENDSWITH01, "fsm.MACHINE": fsm.MACHINE}
+    ref = TG.ENDS01
+    for name, m in machines.items():
+        small = minimise(m, b"01")
+        same, _ = equivalent(ref, m, b"01")
+        _, witness = equivalent(ref, m)
+        print(f"{name:>15}: {m.num_states} states, minimal {small.num_states}; "
+              f"same language as TG.ENDS01 over 0/1: {same}"
+              + ("" if witness is None else f"; over all bytes differs on {witness!r}"))
+    # "ends with 01" is a subset of "ends with 1": the product machines collapse accordingly
+    both = intersection(TG.ENDS01, automaton.ENDS1, b"01")
+    either = union(TG.ENDS01, automaton.ENDS1, b"01")
+    print(f"ENDS01 and ENDS1: {both.num_states} product states, minimal {minimise(both).num_states}, "
+          f"same as ENDS01: {equivalent(both, TG.ENDS01, b'01')[0]}")
+    print(f"ENDS01 or ENDS1: same as ENDS1: {equivalent(either, automaton.ENDS1, b'01')[0]}; "
+          f"complement of ENDS1 differs from ENDS1 on {equivalent(complement(automaton.ENDS1, b'01'), automaton.ENDS1)[1]!r}")
@@ -1,6 +1,29 @@
 # balanced_parens.py
 # Recursive parser for balanced parentheses and brackets based on grammar:
 # S -> ε | ( S ) S | [ S ] S
+#
+# parse_S follows the grammar directly and recurses once per nesting level.
+# BracketValidator recognises the same language iteratively with a bytearray
+# stack: O(n) time, O(depth) memory, any set of single-byte bracket pairs,
+# chunked input (files), and on failure the byte offset of the first error
+# together with the maximum depth reached. is_balanced() uses it.
+#
+# validate_parallel() splits large inputs into chunks. Each chunk reduces to
+# a summary, its unmatched closers followed by its unmatched openers, which
+# is computed on a process pool; the summaries are merged in order against
+# one stack. A chunk whose summary does not fit is rescanned from the
+# merged stack to report the exact error offset.
+#
+# Usage: python dyck.py [FILE|-] [--pairs "()[]{}"] [--ignore-other] [--workers N]
+#        (no arguments: interactive prompt and the examples below)
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 16
+PARALLEL_CHUNK = 1 << 24
 
 def parse_S(s: str, i: int) -> int:
     """
@@ -21,30 +44,256 @@ def parse_S(s: str, i: int) -> int:
         # Continue loop to parse any trailing S (adjacent bracketed expressions)
     return i  # Return the index after parsing S
 
+class BracketValidator:
+    """
+    Incremental bracket checker. pairs is a string of opener/closer
+    characters, e.g. "()[]{}"; with ignore_other, other bytes are skipped
+    instead of being an error (as they are for parse_S). Offsets are byte
+    offsets (str input is UTF-8 encoded).
+    """
+
+    def __init__(self, pairs="()[]", ignore_other=False):
+        raw = pairs.encode("ascii") if isinstance(pairs, str) else bytes(pairs)
+        if len(raw) % 2 or len(set(raw)) != len(raw):
+            raise ValueError(f"pairs must be distinct opener/closer characters: {pairs!r}")
+        closer = bytearray(256)                  # opener byte -> its closer (0: not an opener)
+        is_closer = bytearray(256)
+        for k in range(0, len(raw), 2):
+            closer[raw[k]] = raw[k + 1]
+            is_closer[raw[k + 1]] = 1
+        self.closer = bytes(closer)
+        self.is_closer = bytes(is_closer)
+        self.ignore_other = ignore_other
+        self.stack = bytearray()                 # expected closers of the open brackets
+        self.offset = 0                          # bytes consumed so far
+        self.max_depth = 0
+        self.error = None                        # byte offset of the first error
+        self.reason = None
+
+    def feed(self, chunk):
+        """Consume one chunk (bytes-like or str). Input after an error is ignored."""
+        if self.error is not None:
+            return
+        data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        closer, is_closer, other_ok = self.closer, self.is_closer, self.ignore_other
+        stack = self.stack
+        push, pop = stack.append, stack.pop
+        depth = len(stack)
+        max_depth = self.max_depth
+        for i, b in enumerate(data):
+            c = closer[b]
+            if c:
+                push(c)
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+            elif is_closer[b]:
+                if not depth:
+                    self._fail(i, f"unexpected {chr(b)!r} with nothing open")
+                    break
+                expected = pop()
+                depth -= 1
+                if expected != b:
+                    self._fail(i, f"expected {chr(expected)!r} but got {chr(b)!r}")
+                    break
+            elif not other_ok:
+                self._fail(i, f"unexpected character {chr(b)!r}")
+                break
+        self.max_depth = max_depth
+        self.offset += len(data)
+
+    def summarise(self, data):
+        """
+        Reduce one chunk on its own, without touching the validator state.
+        Return (closers, openers, rise, ok). closers holds the unmatched
+        closers in order and openers the closers still expected, innermost
+        last. rise is the peak depth relative to the chunk start. ok is
+        False if the chunk has an error of its own: a mismatched pair or,
+        unless ignored, an unexpected byte.
+        """
+        closer, is_closer, other_ok = self.closer, self.is_closer, self.ignore_other
+        stack = bytearray()
+        unmatched = bytearray()
+        push, pop = stack.append, stack.pop
+        depth = rise = 0
+        for b in data:
+            c = closer[b]
+            if c:
+                push(c)
+                depth += 1
+                if depth > rise:
+                    rise = depth
+            elif is_closer[b]:
+                depth -= 1
+                if not stack:
+                    unmatched.append(b)
+                elif pop() != b:
+                    return bytes(unmatched), bytes(stack), rise, False
+            elif not other_ok:
+                return bytes(unmatched), bytes(stack), rise, False
+        return bytes(unmatched), bytes(stack), rise, True
+
+    def _fail(self, i, reason):
+        self.error = self.offset + i
+        self.reason = reason
+
+    def result(self):
+        """
+        Outcome so far, treating the input as complete: {"balanced", "error"
+        (byte offset or None), "reason", "max_depth", "bytes" (bytes fed)}.
+        """
+        error, reason = self.error, self.reason
+        if error is None and self.stack:
+            error, reason = self.offset, f"end of input with {len(self.stack)} unclosed"
+        return {"balanced": error is None, "error": error, "reason": reason,
+                "max_depth": self.max_depth, "bytes": self.offset}
+
+def validate(source, pairs="()[]", ignore_other=False, chunk_size=CHUNK_SIZE):
+    """
+    Check a str, bytes, binary file object (read with readinto into one
+    reused buffer) or iterable of chunks. Return BracketValidator.result().
+    """
+    v = BracketValidator(pairs, ignore_other)
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        v.feed(source)
+    elif hasattr(source, "readinto"):
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while v.error is None:
+            n = source.readinto(buf)
+            if not n:
+                break
+            v.feed(buf if n == chunk_size else view[:n])
+    else:
+        for chunk in source:
+            v.feed(chunk)
+            if v.error is not None:
+                break
+    return v.result()
+
 def is_balanced(s: str) -> bool:
     """
     Returns True if the string s is a balanced sequence of () and [] brackets.
     """
-    i = parse_S(s, 0)  # Start parsing from index 0
-    return i == len(s)  # Balanced if all input is consumed
-
-# User input: check if a string is balanced
-user_input = input("Enter a string of parentheses and brackets: ")
-print(f"{user_input!r} -> {is_balanced(user_input)}")
-
-# Test cases for recognizer
-tests = [
-    "", "()", "(())", "()()", "(()())", "(()", ")(", "())(",
-    "[]", "[[]]", "[][]", "[()]", "([[]])", "([)]", "[(])", "([()[]])"
-]
-for t in tests:
-    print(f"{t!r:10} -> {is_balanced(t)}")
-
-# Demonstrate ambiguous and non-ambiguous parses
-print("\nAmbiguous parse example: '[()][]'")
-print("This string can be parsed as '[()]' then '[]', or as '[()[]]'.")
-# Explanation: '[()][]' can be split as '[()]' + '[]' (two S's), or as '[()[]]' (one S inside brackets).
-
-print("\nNon-ambiguous parse example: '([[]])'")
-print("This string can only be parsed as '(' '[' '[' ']' ']' ')'.")
-# Explanation: '([[]])' has only one valid parse tree due to strict nesting.
+    return validate(s)["balanced"]  # iterative: no recursion limit on nesting depth
+
+# ---- Parallel chunk summaries ----
+
+_worker_validator = None
+
+def _init_worker(validator):
+    global _worker_validator
+    _worker_validator = validator
+
+def _read_span(path, offset, length):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+def _summary_job(job):
+    """ProcessPoolExecutor entry point: summarise bytes or a (path, offset, length) span."""
+    data = _read_span(*job) if isinstance(job, tuple) else job
+    return _worker_validator.summarise(data)
+
+def validate_parallel(source, pairs="()[]", ignore_other=False, workers=None, chunk_size=PARALLEL_CHUNK):
+    """
+    validate() for bytes or a file path, with per-chunk summaries computed
+    on a process pool (workers read their own file spans). The result is
+    the same as validate() gives for the whole input as bytes: "bytes" is
+    always the input size.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    proto = BracketValidator(pairs, ignore_other)
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        jobs = [(source, off, min(chunk_size, size - off)) for off in range(0, size, chunk_size)]
+    else:
+        size = len(source)
+        jobs = [source[off:off + chunk_size] for off in range(0, size, chunk_size)]
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(proto)
+        summaries = [_summary_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(proto,)) as pool:
+            summaries = list(pool.map(_summary_job, jobs))
+    stack = bytearray()                         # expected closers, as in BracketValidator
+    max_depth = 0
+    for i, (closers, openers, rise, ok) in enumerate(summaries):    # merge in order
+        base = len(stack)
+        k = len(closers)
+        if not ok or k > base or stack[base - k:] != closers[::-1]:
+            v = BracketValidator(pairs, ignore_other)     # rescan this chunk for the exact error
+            v.stack, v.offset, v.max_depth = stack, i * chunk_size, max_depth
+            v.feed(_read_span(*jobs[i]) if isinstance(jobs[i], tuple) else jobs[i])
+            res = v.result()
+            res["bytes"] = size
+            return res
+        max_depth = max(max_depth, base + rise)
+        del stack[base - k:]
+        stack += openers
+    v = BracketValidator(pairs, ignore_other)
+    v.stack, v.offset, v.max_depth = stack, size, max_depth
+    return v.result()
+
+def is_balanced_parallel(s, workers=None, chunk_size=PARALLEL_CHUNK) -> bool:
+    """is_balanced() for long str or bytes inputs, summarised in parallel chunks."""
+    data = s.encode("utf-8") if isinstance(s, str) else s
+    return validate_parallel(data, workers=workers, chunk_size=chunk_size)["balanced"]
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Check bracket balance of a file or stdin")
+    ap.add_argument("file", help="input file, or - for stdin")
+    ap.add_argument("--pairs", default="()[]", help='opener/closer characters, e.g. "()[]{}"')
+    ap.add_argument("--ignore-other", action="store_true", help="skip bytes that are not brackets")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="summarise chunks on this many processes (files only)")
+    ap.add_argument("--chunk-size", type=int, default=PARALLEL_CHUNK)
+    args = ap.parse_args(argv)
+    if args.workers and args.file == "-":
+        ap.error("--workers needs a file")
+    if args.workers:
+        res = validate_parallel(args.file, args.pairs, args.ignore_other, args.workers, args.chunk_size)
+        return _report(res)
+    f = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        res = validate(f, args.pairs, args.ignore_other)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+    return _report(res)
+
+def _report(res):
+    if res["balanced"]:
+        print(f"balanced: {res['bytes']} bytes, max depth {res['max_depth']}")
+    else:
+        print(f"not balanced: {res['reason']} at offset {res['error']}, max depth {res['max_depth']}")
+    return 0 if res["balanced"] else 1
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        raise SystemExit(main(sys.argv[1:]))
+
+    # User input: check if a string is balanced
+    user_input = input("Enter a string of parentheses and brackets: ")
+    print(f"{user_input!r} -> {is_balanced(user_input)}")
+
+    # Test cases for recognizer
+    tests = [
+        "", "()", "(())", "()()", "(()())", "(()", ")(", "())(",
+        "[]", "[[]]", "[][]", "[()]", "([[]])", "([)]", "[(])", "([()[]])"
+    ]
+    for t in tests:
+        print(f"{t!r:10} -> {is_balanced(t)}")
+        assert is_balanced(t) == (parse_S(t, 0) == len(t))  # same language as the grammar
+        assert is_balanced_parallel(t, workers=2, chunk_size=3) == is_balanced(t)
+
+    # Demonstrate ambiguous and non-ambiguous parses
+    print("\nAmbiguous parse example: '[()][]'")
+    print("This string can be parsed as '[()]' then '[]', or as '[()[]]'.")
+    # Explanation: '[()][]' can be split as '[()]' + '[]' (two S's), or as '[()[]]' (one S inside brackets).
+
+    print("\nNon-ambiguous parse example: '([[]])'")
+    print("This string can only be parsed as '(' '[' '[' ']' ']' ')'.")
+    # Explanation: '([[]])' has only one valid parse tree due to strict nesting.
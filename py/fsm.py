@@ -1,41 +1,27 @@
-def automaton(input_string):
-    # Define the initial state (state 0)
-    state = 0  # Start state
+from dfa_engine import DFA
 
-    # Process each character in the input string
-    for char in input_string:
-        # Transition based on current state and input character
-        if state == 0:
-            # If in state 0 and input is '0', move to state 1
-            if char == '0':
-                state = 1
-            # If in state 0 and input is '1', stay in state 0
-            else:  # char == '1'
-                state = 0
-        elif state == 1:
-            # If in state 1 and input is '0', stay in state 1
-            if char == '0':
-                state = 1
-            # If in state 1 and input is '1', move to state 2 (accepting state)
-            else:  # char == '1'
-                state = 2
-        elif state == 2:
-            # If in state 2 and input is '0', move to state 1
-            if char == '0':
-                state = 1
-            # If in state 2 and input is '1', move back to state 0
-            else:
-                state = 0
+# State 0 is the start state, state 2 the accepting one:
+#   0 --'0'--> 1, anything else stays in 0
+#   1 --'0'--> 1 (still a trailing '0'), anything else moves to 2 (accepting)
+#   2 --'0'--> 1, anything else moves back to 0
+MACHINE = DFA({
+    0: {"0": 1, None: 0},
+    1: {"0": 1, None: 2},
+    2: {"0": 1, None: 0},
+}, start=0, accepting={2})
 
-    # After processing all characters, check if we're in the accepting state (state 2)
-    if state == 2:
+def automaton(input_string):
+    # Run the compiled machine over the whole string, then check whether
+    # we ended in the accepting state (state 2)
+    if MACHINE.accepts(input_string):
         return "Accepted"
     else:
         return "Rejected"
 
-# Get input from the user
-user_input = input("Enter a binary string: ")
-# Run the automaton with the user's input
-result = automaton(user_input)
-# Print the result
-print(f"Result: {result}")
+if __name__ == "__main__":
+    # Get input from the user
+    user_input = input("Enter a binary string: ")
+    # Run the automaton with the user's input
+    result = automaton(user_input)
+    # Print the result
+    print(f"Result: {result}")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+fuzz8051.py
+Snapshot-based fuzzing of 8051 firmware input handlers.
+
+The firmware runs from reset until it reaches the handler entry, and that
+machine state is taken as a CPU8051 snapshot. Every fuzz run restores the
+snapshot (a few microseconds), writes an input into internal or external
+RAM and executes up to `steps` instructions, marking every executed
+address in a 64 Kbit coverage bitmap.
+
+Runs are split into batches played on a ProcessPoolExecutor. Batch i uses
+the seed derived from (seed, i) and results are folded in index order, so
+a campaign is reproducible for a given seed no matter how many workers
+play it. Within a batch, inputs that reach new addresses are kept and
+mutated by later runs.
+
+A run ends as "halt" (jumped to itself), "timeout" (step budget used up),
+"error" (undefined opcode, or an operand fetched past FFFFh) or "crash"
+(reached one of the crash addresses).
+
+Usage:
+  python fuzz8051.py fw.asm|fw.hex|fw.bin --entry HANDLER --input xram:0000 --length 16
+                     [--runs 100000] [--steps 2000] [--crash LABEL] [--workers N] [--seed 0]
+"""
+
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import asm8051
+import cpu8051
+import HEX_B
+
+BITMAP_SIZE = 0x10000 // 8
+OUTCOMES = ("halt", "timeout", "error", "crash")
+MAX_CRASHES = 20            # crashing inputs kept per batch
+
+# ---- Targets ----
+
+def parse_target(text, hex_default=False):
+    """'xram:0' or 'iram:30h' -> (memory name, address); plain numbers decimal unless hex_default."""
+    space, _, addr = text.partition(":")
+    space = space.strip().lower()
+    if space not in ("iram", "xram") or not addr:
+        raise ValueError(f"Invalid input location {text!r} (use iram:ADDR or xram:ADDR)")
+    return space, asm8051.parse_number(addr.strip(), hex_default)
+
+def start_state(path, entry=None, max_steps=1_000_000, hex_default=False):
+    """
+    Load a program and run it from reset to `entry` (label or address).
+    hex_default makes plain numbers in the source and `entry` hex.
+    Return (cpu, snapshot, symbols).
+    """
+    cpu = cpu8051.CPU8051()
+    symbols = HEX_B.load_program(path, cpu, hex_default)
+    if entry is not None:
+        target = HEX_B.parse_address(entry, symbols, hex_default)
+        if cpu.pc != target:
+            _, reason = HEX_B.run_batch(cpu, max_steps, [target])
+            if reason != "break":
+                raise ValueError(f"program never reached {entry!r} ({reason})")
+    return cpu, cpu.snapshot(), symbols
+
+def covered(bitmap):
+    """Number of addresses set in a coverage bitmap."""
+    return int.from_bytes(bitmap, "little").bit_count()
+
+def covered_addresses(bitmap):
+    """Sorted executed addresses of a coverage bitmap."""
+    return [i for i in range(0x10000) if bitmap[i >> 3] >> (i & 7) & 1]
+
+# ---- Batches ----
+
+_worker_cpu = None
+
+def _init_worker(cpu):
+    global _worker_cpu
+    _worker_cpu = cpu
+
+def fuzz_batch(cpu, snapshot, target, length, runs, steps, crashes, seed):
+    """
+    Play `runs` inputs from a snapshot. Return a dict with the batch's
+    coverage bitmap, outcome counts, distinct crashing inputs and the inputs
+    that found new coverage, each as (input, ((bitmap index, bits), ...))
+    so a campaign can re-check them against its merged coverage.
+    """
+    rng = random.Random(seed)
+    mem = cpu.iram if target[0] == "iram" else cpu.xram
+    addr = target[1]
+    if addr + length > len(mem):
+        raise ValueError("input does not fit in the target memory")
+    crash_bits = [(a >> 3, 1 << (a & 7), a) for a in crashes]
+    total = bytearray(BITMAP_SIZE)
+    bitmap = bytearray(BITMAP_SIZE)             # reused; only touched bytes are cleared
+    touched = []
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    corpus, inputs, found = [], [], {}
+    for _ in range(runs):
+        if inputs and rng.random() < 0.5:
+            data = bytearray(rng.choice(inputs))
+            for _ in range(rng.randint(1, 4)):
+                data[rng.randrange(length)] = rng.getrandbits(8)
+        else:
+            data = rng.randbytes(length)
+        cpu.restore(snapshot)
+        mem[addr:addr + length] = data
+        try:
+            cpu.run_coverage(steps, bitmap, touched)
+            outcome = "halt" if cpu.halted else "timeout"
+        except (ValueError, IndexError):        # undefined opcode, fetch past the end of code
+            outcome = "error"
+        hit = next((a for i, bit, a in crash_bits if bitmap[i] & bit), None)
+        if hit is not None:
+            outcome = "crash"
+        outcomes[outcome] += 1
+        if outcome in ("error", "crash") and len(found) < MAX_CRASHES:
+            found.setdefault(bytes(data), outcome if hit is None else f"crash at {hit:04X}")
+        run = []
+        new = False
+        for i in touched:
+            b = bitmap[i]
+            run.append((i, b))
+            if b & ~total[i]:
+                total[i] |= b
+                new = True
+            bitmap[i] = 0
+        touched.clear()
+        if new:
+            inputs.append(bytes(data))
+            corpus.append((inputs[-1], tuple(run)))
+    return {"coverage": bytes(total), "outcomes": outcomes,
+            "crashes": list(found.items()), "corpus": corpus}
+
+def _run_batch(args):
+    """ProcessPoolExecutor entry point: play one batch on this worker's CPU."""
+    return fuzz_batch(_worker_cpu, *args)
+
+# ---- Campaign ----
+
+def fuzz(cpu, snapshot, target, length, runs=100000, steps=2000, crashes=(),
+         workers=None, seed=None, batch_size=2000):
+    """
+    Fuzz from a snapshot. Return {"runs", "coverage" (bitmap), "covered",
+    "outcomes", "crashes" [(input, reason)], "corpus" [inputs], "seed"}.
+    Batches are folded in order: crashes are listed once per distinct input
+    and the corpus keeps only inputs that add coverage to the merged bitmap.
+    """
+    if length < 1:
+        raise ValueError("input length must be at least 1")
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    sizes = [batch_size] * (runs // batch_size)
+    if runs % batch_size:
+        sizes.append(runs % batch_size)
+    jobs = [(snapshot, target, length, size, steps, tuple(crashes), f"{seed}:{i}")
+            for i, size in enumerate(sizes)]
+    if workers <= 1 or len(jobs) <= 1:
+        results = [fuzz_batch(cpu, *job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cpu,)) as pool:
+            results = list(pool.map(_run_batch, jobs))
+    bitmap = bytearray(BITMAP_SIZE)
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    found, corpus = {}, []
+    for res in results:                          # fold in batch order
+        for k, v in res["outcomes"].items():
+            outcomes[k] += v
+        for data, reason in res["crashes"]:
+            found.setdefault(data, reason)
+        for data, run in res["corpus"]:          # the batch coverage is the union of these runs
+            new = False
+            for i, b in run:
+                if b & ~bitmap[i]:
+                    bitmap[i] |= b
+                    new = True
+            if new:
+                corpus.append(data)
+    cpu.restore(snapshot)
+    return {"runs": runs, "coverage": bitmap, "covered": covered(bitmap), "outcomes": outcomes,
+            "crashes": list(found.items()), "corpus": corpus, "seed": seed}
+
+# ---- Command line ----
+
+def main():
+    ap = argparse.ArgumentParser(description="Fuzz an 8051 input handler from a snapshot")
+    ap.add_argument("program", help=".asm source, Intel HEX or raw binary image")
+    ap.add_argument("--entry", default=None, help="label or address where the handler starts")
+    ap.add_argument("--input", required=True, help="where inputs go: iram:ADDR or xram:ADDR")
+    ap.add_argument("--length", type=int, default=16)
+    ap.add_argument("--runs", type=int, default=100000)
+    ap.add_argument("--steps", type=int, default=2000, help="instruction budget per run")
+    ap.add_argument("--crash", action="append", default=[], help="label or address that must not be reached")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--coverage", default=None, help="write the coverage bitmap to this file")
+    ap.add_argument("--hex-default", action="store_true", help="plain numbers (source, --entry, --input, --crash) are hex")
+    args = ap.parse_args()
+    cpu, snap, symbols = start_state(args.program, args.entry, hex_default=args.hex_default)
+    crashes = [HEX_B.parse_address(c, symbols, args.hex_default) for c in args.crash]
+    res = fuzz(cpu, snap, parse_target(args.input, args.hex_default), args.length, args.runs, args.steps,
+               crashes, args.workers, args.seed)
+    print(f"{res['runs']} runs (seed {res['seed']}): {res['covered']} addresses covered, "
+          + ", ".join(f"{k} {v}" for k, v in res["outcomes"].items()))
+    print(f"{len(res['corpus'])} inputs found new coverage")
+    for data, reason in res["crashes"]:
+        print(f"  {reason}: {data.hex()}")
+    if args.coverage:
+        with open(args.coverage, "wb") as f:
+            f.write(res["coverage"])
+
+if __name__ == "__main__":
+    main()
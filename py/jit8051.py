@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+jit8051.py
+Basic-block translation cache for the 8051 core.
+
+JitCPU runs the same machine code as cpu8051.CPU8051, but instead of
+dispatching one instruction at a time it finds straight-line basic blocks
+(up to the first jump, call, return or conditional branch), generates
+Python source for each block, compiles it with compile() and caches the
+function by start address. A loop body then costs one Python call per
+iteration instead of a fetch/decode/dispatch per instruction.
+
+Common instructions (MOV/ADD/ADDC/SUBB/ORL/ANL/XRL/INC/DEC on A, Rn,
+immediates and low internal RAM, flag ops, SJMP/LJMP/AJMP, DJNZ Rn, CJNE
+A,#data, JZ/JNZ/JC/JNC) are emitted inline with their operands as
+constants, taking ADD/ADDC/SUBB results from alu8051.ALU; anything else
+calls the interpreter's own handler, so semantics always match the
+interpreter (ADD sets C, AC, OV and P exactly
+as HEX_B's exec_line does for C, AC and P).
+
+Blocks are invalidated when code memory is written through load() or
+write_code(); writing cpu.code directly bypasses the cache.
+
+Usage:
+  python jit8051.py            # differential check against the interpreter + timing
+"""
+
+import random
+import time
+
+from alu8051 import ALU, PSW_KEEP, SUBB_OP
+from cpu8051 import CPU8051, CYCLES, LENGTHS, OPCODES, REL, SELF_JUMP_HALTS
+
+MAX_BLOCK = 64          # instructions per block at most
+
+CONTROL = {"AJMP", "ACALL", "LJMP", "LCALL", "RET", "RETI", "SJMP", "JMP", "JC", "JNC",
+           "JZ", "JNZ", "JB", "JNB", "JBC", "CJNE", "DJNZ"}
+
+# ---- Code generation ----
+
+def _alu_lines(kind, src):
+    """Inline source for ADD/ADDC/SUBB/ORL/ANL/XRL A,<src expression>."""
+    if kind in ("ORL", "ANL", "XRL"):
+        sym = {"ORL": "|", "ANL": "&", "XRL": "^"}[kind]
+        return [f"sfr[224] {sym}= {src}"]
+    if kind == "ADD":
+        index = f"sfr[224] << 8 | {src}"
+    elif kind == "ADDC":
+        index = f"(sfr[208] >> 7) << 16 | sfr[224] << 8 | {src}"
+    else:
+        index = f"{SUBB_OP} | (sfr[208] >> 7) << 16 | sfr[224] << 8 | {src}"
+    return [f"e = ALU[{index}]", f"sfr[208] = (sfr[208] & {PSW_KEEP}) | e >> 8", "sfr[224] = e & 255"]
+
+_ALU_BASES = {0x20: "ADD", 0x30: "ADDC", 0x90: "SUBB", 0x40: "ORL", 0x50: "ANL", 0x60: "XRL"}
+
+def _emit(code, addr):
+    """
+    Return (lines, ends_block) for the instruction at addr. Lines run inside
+    the block function; an ending instruction's lines return the next PC.
+    """
+    op = code[addr]
+    nxt = addr + LENGTHS[op]
+    b1 = code[(addr + 1) & 0xFFFF]
+    b2 = code[(addr + 2) & 0xFFFF]
+    spec = OPCODES[op]
+    mnemonic = spec[0] if spec else None
+    hi, lo = op & 0xF0, op & 0x0F
+
+    # --- block enders ---
+    if op == 0x80:
+        return [f"return {(nxt + REL[b1]) & 0xFFFF}"], True
+    if op == 0x02:
+        return [f"return {b1 << 8 | b2}"], True
+    if lo == 0x01 and not op & 0x10:
+        return [f"return {(nxt & 0xF800) | (op >> 5) << 8 | b1}"], True
+    if hi == 0xD0 and lo >= 8:
+        n = lo - 8
+        return [f"v = (iram[b | {n}] - 1) & 255", f"iram[b | {n}] = v",
+                f"return {(nxt + REL[b1]) & 0xFFFF} if v else {nxt}"], True
+    if op in (0x40, 0x50, 0x60, 0x70):
+        cond = {0x40: "sfr[208] & 128", 0x50: "not sfr[208] & 128",
+                0x60: "not sfr[224]", 0x70: "sfr[224]"}[op]
+        return [f"return {(nxt + REL[b1]) & 0xFFFF} if {cond} else {nxt}"], True
+    if op == 0xB4:
+        return [f"a = sfr[224]", f"sfr[208] = (sfr[208] & 127) | (128 if a < {b1} else 0)",
+                f"return {(nxt + REL[b2]) & 0xFFFF} if a != {b1} else {nxt}"], True
+    if mnemonic in CONTROL or spec is None:
+        return [f"return ops[{op}]({addr + 1})"], True
+
+    # --- inline straight-line instructions ---
+    if op == 0x00:
+        return [], False
+    if op == 0x74:
+        return [f"sfr[224] = {b1}"], False
+    if 0x78 <= op <= 0x7F:
+        return [f"iram[b | {op - 0x78}] = {b1}"], False
+    if 0xE8 <= op <= 0xEF:
+        return [f"sfr[224] = iram[b | {op - 0xE8}]"], False
+    if 0xF8 <= op <= 0xFF:
+        return [f"iram[b | {op - 0xF8}] = sfr[224]"], False
+    if op == 0xE5 and b1 < 0x80:
+        return [f"sfr[224] = iram[{b1}]"], False
+    if op == 0xF5 and b1 < 0x80:
+        return [f"iram[{b1}] = sfr[224]"], False
+    if op == 0x75 and b1 < 0x80:
+        return [f"iram[{b1}] = {b2}"], False
+    if op == 0x04:
+        return ["sfr[224] = (sfr[224] + 1) & 255"], False
+    if op == 0x14:
+        return ["sfr[224] = (sfr[224] - 1) & 255"], False
+    if 0x08 <= op <= 0x0F:
+        return [f"iram[b | {op - 8}] = (iram[b | {op - 8}] + 1) & 255"], False
+    if 0x18 <= op <= 0x1F:
+        return [f"iram[b | {op - 0x18}] = (iram[b | {op - 0x18}] - 1) & 255"], False
+    if op == 0xE4:
+        return ["sfr[224] = 0"], False
+    if op == 0xF4:
+        return ["sfr[224] ^= 255"], False
+    if op == 0xC3:
+        return ["sfr[208] &= 127"], False
+    if op == 0xD3:
+        return ["sfr[208] |= 128"], False
+    if op == 0xB3:
+        return ["sfr[208] ^= 128"], False
+    if hi in _ALU_BASES and (lo == 4 or (lo == 5 and b1 < 0x80) or lo >= 8):
+        src = str(b1) if lo == 4 else f"iram[{b1}]" if lo == 5 else f"iram[b | {lo - 8}]"
+        return _alu_lines(_ALU_BASES[hi], src), False
+
+    # --- anything else: the interpreter's handler, then re-read the register bank ---
+    return [f"ops[{op}]({addr + 1})", "b = sfr[208] & 24"], False
+
+def translate(code, start):
+    """
+    Generate the source of the block starting at `start`.
+    Return (source, instructions, cycles, last instruction address).
+    """
+    body = ["b = sfr[208] & 24"]
+    addr = start
+    count = cycles = 0
+    last = start
+    while True:
+        op = code[addr]
+        lines, ends = _emit(code, addr)
+        body += lines
+        count += 1
+        cycles += CYCLES[op]
+        last = addr
+        addr += LENGTHS[op]
+        if ends:
+            break
+        if count == MAX_BLOCK or addr > 0xFFFF - 3:
+            body.append(f"return {addr & 0xFFFF}")
+            break
+    src = "def block():\n" + "\n".join("    " + line for line in body) + "\n"
+    return src, count, cycles, last
+
+# ---- JIT CPU ----
+
+class JitCPU(CPU8051):
+    """CPU8051 whose run() executes cached compiled basic blocks."""
+
+    def __init__(self, image=None, origin=0):
+        self._blocks = {}               # start -> (function, instructions, cycles, last, end)
+        self._pages = {}                # 256-byte page -> set of block starts touching it
+        super().__init__(image, origin)
+        self._namespace = {"iram": self.iram, "sfr": self.sfr, "code": self.code,
+                           "xram": self.xram, "ops": self._ops, "ALU": ALU}
+        self.compiled = 0
+
+    def load(self, image, origin=0):
+        super().load(image, origin)
+        self.invalidate(origin, origin + len(image))
+
+    def write_code(self, addr, data):
+        """Write bytes into code memory and drop the blocks they touch."""
+        self.load(data, addr)
+
+    def invalidate(self, start=0, end=0x10000):
+        """Drop every cached block overlapping [start, end)."""
+        if start == 0 and end >= 0x10000:
+            self._blocks.clear()
+            self._pages.clear()
+            return
+        stale = set()
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            for s in self._pages.get(page, ()):
+                if s < end and self._blocks[s][4] > start:
+                    stale.add(s)
+        for s in stale:                         # unindex from every page the block spans
+            blk_end = self._blocks.pop(s)[4]
+            for page in range(s >> 8, ((blk_end - 1) >> 8) + 1):
+                starts = self._pages[page]
+                starts.discard(s)
+                if not starts:
+                    del self._pages[page]
+
+    def _compile(self, start):
+        src, count, cycles, last = translate(self.code, start)
+        ns = dict(self._namespace)
+        exec(compile(src, f"<8051 block {start:04X}>", "exec"), ns)
+        end = last + LENGTHS[self.code[last]]
+        blk = (ns["block"], count, cycles, last, end)
+        self._blocks[start] = blk
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            self._pages.setdefault(page, set()).add(start)
+        self.compiled += 1
+        return blk
+
+    def run(self, max_steps=1_000_000):
+        """Same contract as CPU8051.run, executing whole blocks where possible."""
+        blocks = self._blocks
+        pc = self.pc
+        n = 0
+        cycles = 0
+        halted = False
+        while n < max_steps:
+            blk = blocks.get(pc)
+            if blk is None:
+                blk = self._compile(pc)
+            fn, count, cyc, last, _ = blk
+            if n + count > max_steps:
+                break                           # finish the remainder one instruction at a time
+            nxt = fn() & 0xFFFF
+            n += count
+            cycles += cyc
+            if nxt == last and SELF_JUMP_HALTS[self.code[last]]:
+                pc = nxt                        # the block's last instruction jumped to itself
+                halted = True
+                break
+            pc = nxt
+        self.pc = pc
+        self.cycles += cycles
+        self.steps += n
+        self.halted = halted
+        while not halted and n < max_steps:
+            self.step()
+            n += 1
+            halted = self.halted
+        return n
+
+# ---- Differential check ----
+
+def machine_state(cpu):
+    """Everything that must match between interpreter and JIT runs."""
+    return (cpu.pc, cpu.cycles, cpu.steps, cpu.halted, bytes(cpu.iram), bytes(cpu.sfr), bytes(cpu.xram))
+
+def differential_check(image, steps, origin=0, patches=()):
+    """
+    Run an image on the interpreter and the JIT; raise AssertionError if they
+    differ. Each (addr, data) patch is then written into code memory, the PC
+    reset to origin and the run repeated, exercising block invalidation.
+    """
+    ref = CPU8051(image, origin)
+    jit = JitCPU(image, origin)
+    for patch in (None,) + tuple(patches):
+        if patch is not None:
+            ref.load(patch[1], patch[0])
+            jit.write_code(*patch)
+            ref.pc = jit.pc = origin
+        ref.run(steps)
+        jit.run(steps)
+        assert machine_state(ref) == machine_state(jit), (patch, ref.state(), jit.state())
+    return ref, jit
+
+def random_program(rng, size=200):
+    """Random straight-line code plus loops and branches, avoiding the undefined opcode."""
+    out = bytearray()
+    while len(out) < size:
+        op = rng.randrange(256)
+        if op == 0xA5 or OPCODES[op][0] in ("LJMP", "LCALL", "RET", "RETI", "JMP", "AJMP", "ACALL"):
+            continue
+        out.append(op)
+        out.extend(rng.randrange(256) for _ in range(LENGTHS[op] - 1))
+    out += b"\x80\xFE"                          # SJMP $
+    return bytes(out)
+
+# Nested counting loop: 256 * 256 * (ADD/XRL/ADDC/MOV/DJNZ), then SJMP $
+LOOP_DEMO = bytes([0x7D, 0x00,              # MOV R5,#0
+                   0x7E, 0x00,              # L1: MOV R6,#0
+                   0x2E,                    # L2: ADD A,R6
+                   0x64, 0x5A,              #     XRL A,#5Ah
+                   0x35, 0x30,              #     ADDC A,30h
+                   0xF5, 0x30,              #     MOV 30h,A
+                   0xDE, 0xF7,              #     DJNZ R6,L2
+                   0xDD, 0xF3,              #     DJNZ R5,L1
+                   0x80, 0xFE])             # SJMP $
+
+# Self-modifying case: blocks at 0000 and 0010 are compiled, then code is
+# rewritten twice; the second write must still drop the block at 0010.
+PATCH_DEMO = (bytes([0x02, 0x00, 0x10]) + bytes(13)   # LJMP 0010h
+              + bytes([0x74, 0x02, 0x80, 0xFE]))       # MOV A,#2 / SJMP $
+# Delay loop: DJNZ jumps to itself nine times before falling through, so
+# only the final SJMP $ may count as a halt
+DELAY_DEMO = bytes([0x7F, 0x0A,             # MOV R7,#10
+                    0xDF, 0xFE,             # DJNZ R7,$
+                    0x74, 0x01,             # MOV A,#1
+                    0x80, 0xFE])            # SJMP $
+PATCHES = [(0x00, bytes([0x02, 0x00, 0x10])), (0x10, bytes([0x74, 0x07]))]
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    for _ in range(300):
+        differential_check(random_program(rng), 5000)
+    ref, jit = differential_check(DELAY_DEMO, 100)
+    assert (jit.steps, jit.r(7), jit.a, jit.pc, jit.halted) == (13, 0, 0x01, 6, True)
+    _, jit = differential_check(PATCH_DEMO, 100, patches=PATCHES)
+    assert jit.a == 0x07
+    for _ in range(100):                        # random rewrites of running programs
+        image = random_program(rng)
+        patches = []
+        for _ in range(3):
+            addr = rng.randrange(len(image) - 4)
+            patches.append((addr, random_program(rng, 4)[:rng.randrange(1, 4)]))
+        differential_check(image, 2000, patches=patches)
+    ref, jit = differential_check(LOOP_DEMO, 10 ** 7)
+    print(f"Differential check OK (300 random programs, delay loop, self-modifying code, loop demo, {jit.compiled} blocks compiled)")
+    t = time.perf_counter()
+    ref = CPU8051(LOOP_DEMO)
+    ref.run(10 ** 7)
+    t_ref = time.perf_counter() - t
+    t = time.perf_counter()
+    jit = JitCPU(LOOP_DEMO)
+    jit.run(10 ** 7)
+    t_jit = time.perf_counter() - t
+    print(f"interpreter {ref.steps / t_ref / 1e6:.2f} MIPS, jit {jit.steps / t_jit / 1e6:.2f} MIPS "
+          f"({t_ref / t_jit:.1f}x)")
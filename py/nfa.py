@@ -1,15 +1,18 @@
-import re
+import regex_nfa
 
-# Regex equivalent of NFA for "ab"
+# NFA for "ab": Thompson construction of the pattern, matched through a lazily
+# built DFA, so time is linear in the input length (no backtracking)
 pattern = r"(a|b)*ab(a|b)*"
+AB = regex_nfa.compile(pattern)
 
 def nfa_ab(input_string):
-    return "Accepted" if re.fullmatch(pattern, input_string) else "Rejected"
+    return "Accepted" if AB.fullmatch(input_string) else "Rejected"
 
-# User input
-user_input = input("Enter a string of a's and b's: ")
-print(f"{user_input} → {nfa_ab(user_input)}")
+if __name__ == "__main__":
+    # User input
+    user_input = input("Enter a string of a's and b's: ")
+    print(f"{user_input} → {nfa_ab(user_input)}")
 
-# Test
-for s in ["ab", "aab", "baba", "xyz", "aa"]:
-    print(f"{s} → {nfa_ab(s)}")
+    # Test
+    for s in ["ab", "aab", "baba", "xyz", "aa"]:
+        print(f"{s} → {nfa_ab(s)}")
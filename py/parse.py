@@ -1,10 +1,42 @@
 # expr_parser.py
+# Arithmetic expressions: E -> T (('+'|'-') T)*, T -> F (('*'|'/') F)*,
+# F -> number | name | '(' E ')'.
+# Parser evaluates directly; compile_expr() parses once into an AST, turns it
+# into a code object and keeps the result in an LRU cache keyed by the source,
+# so a template with variables is evaluated against many bindings cheaply.
+# Parser and ASTParser recurse once per '('; shunt() is the iterative
+# operator-precedence (shunting-yard) equivalent over a lazy token stream,
+# linear in the input and independent of nesting depth.
 import re
+from functools import lru_cache
+
+TOKEN = re.compile(r'\d+|[A-Za-z_]\w*|\+|\-|\*|\/|\(|\)')
+
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
 
 def tokenize(expr):
-    tokens = re.findall(r'\d+|\+|\-|\*|\/|\(|\)', expr)
+    tokens = TOKEN.findall(expr)
     return tokens
 
+def iter_tokens(source):
+    """
+    Yield the tokens of a str, or of an iterable of str chunks (e.g. a text
+    file), lazily. A number or name cut by a chunk boundary is carried over.
+    """
+    chunks = (source,) if isinstance(source, str) else source
+    carry = ''
+    for chunk in chunks:
+        text = carry + chunk
+        carry = ''
+        for m in TOKEN.finditer(text):
+            tok = m.group()
+            if m.end() == len(text) and (tok[0].isalnum() or tok[0] == '_'):
+                carry = tok                 # may continue in the next chunk
+            else:
+                yield tok
+    if carry:
+        yield carry
+
 class Parser:
     def __init__(self, tokens):
         self.tokens = tokens
@@ -43,18 +75,233 @@ class Parser:
             val = self.parse_E()
             self.eat(')')
             return val
+        elif tok is not None and (tok[0].isalpha() or tok[0] == '_'):
+            return self.variable(self.eat())
         else:
             return int(self.eat())  # number
 
-def evaluate(expr):
-    tokens = tokenize(expr)
-    p = Parser(tokens)
-    return p.parse_E()
+    def variable(self, name):
+        raise NameError(f"Unbound variable {name}")
+
+# ---- AST ----
+# Nodes are tuples: ('num', int), ('var', name), (op, left, right) for + - * /
+
+class ASTParser(Parser):
+    """Same grammar as Parser, building AST nodes instead of values."""
+
+    def parse_E(self):
+        node = self.parse_T()
+        while self.peek() in ('+', '-'):
+            op = self.eat()
+            node = (op, node, self.parse_T())
+        return node
+
+    def parse_T(self):
+        node = self.parse_F()
+        while self.peek() in ('*', '/'):
+            op = self.eat()
+            node = (op, node, self.parse_F())
+        return node
+
+    def parse_F(self):
+        tok = self.peek()
+        if tok == '(':
+            self.eat('(')
+            node = self.parse_E()
+            self.eat(')')
+            return node
+        elif tok is not None and (tok[0].isalpha() or tok[0] == '_'):
+            return ('var', self.eat())
+        else:
+            return ('num', int(self.eat()))  # number
+
+# ---- Iterative operator-precedence parser ----
+
+def _ast_leaf(tok):
+    return ('var', tok) if tok[0].isalpha() or tok[0] == '_' else ('num', int(tok))
+
+def _ast_apply(op, a, b):
+    return (op, a, b)
+
+def _value_apply(op, a, b):
+    return a + b if op == '+' else a - b if op == '-' else a * b if op == '*' else a / b
+
+def shunt(tokens, leaf, apply):
+    """
+    Parse a token stream with explicit operand and operator stacks (the
+    grammar of Parser, left-associative). leaf(token) makes an operand and
+    apply(op, left, right) combines two, so the same loop evaluates or
+    builds an AST. The whole input must be consumed.
+    """
+    vals, ops = [], []
+    prec = PRECEDENCE
+    operand = True                          # expecting a number, name or '('
+    for tok in tokens:
+        if operand:
+            if tok == '(':
+                ops.append(tok)
+            elif tok in prec or tok == ')':
+                raise SyntaxError(f"Unexpected {tok}")
+            else:
+                vals.append(leaf(tok))
+                operand = False
+        elif tok in prec:
+            p = prec[tok]
+            while ops and ops[-1] != '(' and prec[ops[-1]] >= p:
+                b = vals.pop()
+                vals.append(apply(ops.pop(), vals.pop(), b))
+            ops.append(tok)
+            operand = True
+        elif tok == ')':
+            while ops and ops[-1] != '(':
+                b = vals.pop()
+                vals.append(apply(ops.pop(), vals.pop(), b))
+            if not ops:
+                raise SyntaxError("Unexpected )")
+            ops.pop()
+        else:
+            raise SyntaxError(f"Unexpected {tok}")
+    if operand:
+        raise SyntaxError("Unexpected end of input")
+    while ops:
+        op = ops.pop()
+        if op == '(':
+            raise SyntaxError("Expected ) but got None")
+        b = vals.pop()
+        vals.append(apply(op, vals.pop(), b))
+    return vals[0]
+
+def parse(expr):
+    """AST of an expression (str or iterable of str chunks); the whole input must be consumed."""
+    return shunt(iter_tokens(expr), _ast_leaf, _ast_apply)
+
+def evaluate_stream(source, bindings=None, **kw):
+    """
+    Evaluate an expression (str or iterable of str chunks, e.g. an open
+    file) in one pass without building an AST; memory grows only with the
+    nesting depth.
+    """
+    env = dict(bindings, **kw) if bindings else kw
+
+    def leaf(tok):
+        if tok[0].isalpha() or tok[0] == '_':
+            if tok not in env:
+                raise NameError(f"Unbound variable {tok}")
+            return env[tok]
+        return int(tok)
+    return shunt(iter_tokens(source), leaf, _value_apply)
+
+def variables(node):
+    """Variable names of an AST in order of first appearance."""
+    names, stack = [], [node]
+    while stack:
+        n = stack.pop()
+        if n[0] == 'var':
+            if n[1] not in names:
+                names.append(n[1])
+        elif n[0] != 'num':
+            stack += [n[2], n[1]]
+    return names
+
+# ---- Compilation ----
+
+def to_source(node, slots):
+    """Python source of an AST; variables become the argument names in slots."""
+    out, stack = [], [(node, 0)]            # explicit stack: long chains do not recurse
+    while stack:
+        n, ctx = stack.pop()
+        if isinstance(n, str):
+            out.append(n)
+        elif n[0] == 'num':
+            out.append(repr(n[1]))
+        elif n[0] == 'var':
+            out.append(slots[n[1]])
+        else:
+            prec = PRECEDENCE[n[0]]
+            # parenthesise when the parent binds tighter (ctx > prec) or when a
+            # right operand of - or / has the same precedence (ctx == prec + 0.5)
+            wrap = ctx > prec
+            if wrap:
+                stack.append((')', 0))
+            stack += [(n[2], prec + 0.5), (f' {n[0]} ', 0), (n[1], prec)]
+            if wrap:
+                stack.append(('(', 0))
+    return ''.join(out)
+
+def postfix(node):
+    """AST as a postfix program: ('num', v) / ('var', name) / op strings."""
+    out, stack = [], [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, str):
+            out.append(n)
+        elif n[0] in ('num', 'var'):
+            out.append(n)
+        else:
+            stack += [n[0], n[2], n[1]]
+    return out
+
+def run_postfix(program, values):
+    """Evaluate a postfix program with variable values from a mapping."""
+    stack = []
+    push = stack.append
+    for item in program:
+        if isinstance(item, str):
+            b = stack.pop()
+            a = stack.pop()
+            push(a + b if item == '+' else a - b if item == '-' else a * b if item == '*' else a / b)
+        elif item[0] == 'num':
+            push(item[1])
+        else:
+            push(values[item[1]])
+    return stack[0]
+
+class CompiledExpr:
+    """
+    A parsed and compiled expression. Call it with a mapping and/or keyword
+    bindings; fn takes the values positionally in the order of `variables`.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.ast = parse(source)
+        self.variables = tuple(variables(self.ast))
+        slots = {name: f'v{i}' for i, name in enumerate(self.variables)}
+        try:
+            code = compile(f"lambda {', '.join(slots.values())}: {to_source(self.ast, slots)}",
+                           "<expr>", "eval")
+            self.fn = eval(code, {"__builtins__": {}})
+        except (RecursionError, MemoryError, SyntaxError):
+            # too deep for the Python compiler: run a postfix program instead
+            program = postfix(self.ast)
+            names = self.variables
+            self.fn = lambda *vals: run_postfix(program, dict(zip(names, vals)))
+
+    def __call__(self, bindings=None, **kw):
+        env = dict(bindings, **kw) if bindings else kw
+        try:
+            return self.fn(*[env[name] for name in self.variables])
+        except KeyError as err:
+            raise NameError(f"Unbound variable {err.args[0]}") from None
+
+    def __repr__(self):
+        return f"CompiledExpr({self.source!r}, variables={self.variables})"
+
+@lru_cache(maxsize=1024)
+def compile_expr(expr):
+    """Compiled form of an expression, cached by its source text."""
+    return CompiledExpr(expr)
+
+def evaluate(expr, bindings=None, **kw):
+    return compile_expr(expr)(bindings, **kw)
 
-# User input
-user_input = input("Enter an arithmetic expression: ")
-print(f"{user_input} = {evaluate(user_input)}")
+if __name__ == "__main__":
+    # User input
+    user_input = input("Enter an arithmetic expression: ")
+    print(f"{user_input} = {evaluate(user_input)}")
 
-# tests
-for e in ["2+3*4", "(1+2)*3", "10-2*3", "8/(4-2)"]:
-    print(f"{e:12} = {evaluate(e)}")
+    # tests
+    for e in ["2+3*4", "(1+2)*3", "10-2*3", "8/(4-2)"]:
+        print(f"{e:12} = {evaluate(e)}")
+        assert evaluate(e) == evaluate_stream(e) == Parser(tokenize(e)).parse_E()
+    print(f"{'x*(y+2)':12} = {evaluate('x*(y+2)', x=3, y=4)}  (x=3, y=4)")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+parse_vector.py
+Vectorised NumPy evaluation of parse.py expressions over columns.
+
+evaluate_columns(expr, columns) parses an expression once (parse.parse, the
+same E/T/F grammar) and runs its postfix program on whole NumPy arrays, so
+a formula over tens of millions of rows costs a handful of array
+operations instead of one evaluate() call per row.
+
+Semantics follow parse.py: + - * keep the column dtype (int64 columns
+wrap on overflow, unlike Python ints) and / is true division giving
+float64. Zero divisors are handled explicitly through on_zero:
+- "raise" (default): ZeroDivisionError naming the first offending row,
+  as evaluate() raises for a single row;
+- a number: rows whose divisor is zero get that value (e.g. np.nan, 0.0).
+
+Rows are processed chunk_rows at a time to bound temporary memory.
+
+Requires numpy.
+
+Usage:
+  python parse_vector.py [N]      # evaluate a formula over N random rows and check a sample
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import parse
+
+def _run(program, cols, on_zero, offset):
+    """Evaluate a postfix program on one chunk of columns."""
+    stack = []
+    for item in program:
+        if isinstance(item, str):
+            b = stack.pop()
+            a = stack.pop()
+            if item == '+':
+                stack.append(a + b)
+            elif item == '-':
+                stack.append(a - b)
+            elif item == '*':
+                stack.append(a * b)
+            else:
+                zero = np.asarray(b) == 0
+                if not zero.any():
+                    stack.append(np.true_divide(a, b))
+                elif on_zero == "raise":
+                    row = offset + int(np.argmax(zero)) if zero.ndim else None
+                    raise ZeroDivisionError("division by zero" + ("" if row is None else f" in row {row}"))
+                else:
+                    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b))
+                    out = np.full(a.shape, on_zero, dtype=np.float64)
+                    np.true_divide(a, b, out=out, where=~zero)
+                    stack.append(out)
+        elif item[0] == 'num':
+            stack.append(item[1])
+        else:
+            stack.append(cols[item[1]])
+    return stack[0]
+
+def evaluate_columns(expr, columns, on_zero="raise", chunk_rows=1 << 20):
+    """
+    Evaluate expr element-wise with variables taken from a mapping of
+    equal-length 1-D arrays. Return an array with one value per row
+    (a scalar if the expression uses no variables and no columns are given).
+    """
+    if on_zero != "raise" and not isinstance(on_zero, (int, float)):
+        raise ValueError("on_zero must be 'raise' or a number")
+    compiled = parse.compile_expr(expr)
+    missing = [name for name in compiled.variables if name not in columns]
+    if missing:
+        raise NameError(f"Unbound variable {missing[0]}")
+    arrays = {name: np.asarray(col) for name, col in columns.items()}
+    shapes = {a.shape for a in arrays.values()}
+    if len(shapes) > 1 or any(len(shape) != 1 for shape in shapes):
+        raise ValueError("columns must be 1-D arrays of the same length")
+    cols = {name: arrays[name] for name in compiled.variables}
+    program = parse.postfix(compiled.ast)
+    if not arrays:
+        return _run(program, {}, on_zero, 0)
+    n = shapes.pop()[0]
+    out = None
+    for start in range(0, n, chunk_rows):
+        part = _run(program, {k: v[start:start + chunk_rows] for k, v in cols.items()}, on_zero, start)
+        if out is None:
+            out = np.empty(n, dtype=np.result_type(part))
+        out[start:start + chunk_rows] = part
+    return out if out is not None else np.empty(0)
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    rng = np.random.default_rng(0)
+    cols = {"price": rng.integers(1, 1000, n), "qty": rng.integers(0, 50, n), "fee": rng.integers(0, 10, n)}
+    formula = "(price*qty - fee) / qty + 2*fee"
+    t = time.perf_counter()
+    res = evaluate_columns(formula, cols, on_zero=np.nan)
+    elapsed = time.perf_counter() - t
+    # Test: rows with a non-zero divisor match evaluate(), the rest are NaN
+    for i in rng.integers(0, n, 1000).tolist():
+        row = {k: int(v[i]) for k, v in cols.items()}
+        if row["qty"]:
+            assert res[i] == parse.evaluate(formula, row), i
+        else:
+            assert np.isnan(res[i]), i
+    print(f"{n} rows in {elapsed:.3f} s ({n / elapsed / 1e6:.1f} M rows/s), sample matches evaluate()")
+    try:
+        evaluate_columns(formula, cols)
+    except ZeroDivisionError as err:
+        print(f"on_zero='raise': {err}")
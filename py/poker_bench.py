@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+poker_bench.py
+Throughput benchmark for the headless Texas Hold'em engine.
+
+Plays rounds through poker_engine and reports rounds/sec overall and the
+time per round spent dealing, evaluating, selecting winners and picking
+the best five cards, so hot-path regressions show up as numbers.
+
+Usage:
+  python poker_bench.py [--rounds 20000] [--tables 1] [--players 6] [--seed 0]
+"""
+
+import argparse
+import time
+
+import poker_engine
+
+def bench(rounds, tables, players, seed=0):
+    """Run the engine with a StageTimer; return (rounds played, seconds, timer)."""
+    timer = poker_engine.StageTimer()
+    t = time.perf_counter()
+    poker_engine.run_tables(rounds, players, tables=tables, seed=seed, timer=timer)
+    return rounds * tables, time.perf_counter() - t, timer
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the headless Hold'em engine")
+    ap.add_argument("--rounds", type=int, default=20000, help="rounds per table")
+    ap.add_argument("--tables", type=int, default=1)
+    ap.add_argument("--players", type=int, nargs="+", default=[2, 4, 6],
+                    help="player counts to benchmark (2..6)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(f"{'players':>7} {'rounds':>8} {'rounds/s':>10} " +
+          " ".join(f"{s + ' us':>12}" for s in poker_engine.STAGES))
+    for n in args.players:
+        played, secs, timer = bench(args.rounds, args.tables, n, args.seed)
+        per_stage = timer.report()
+        print(f"{n:>7} {played:>8} {played / secs:>10,.0f} " +
+              " ".join(f"{per_stage[s][1]:>12.2f}" for s in poker_engine.STAGES))
+
+if __name__ == "__main__":
+    main()
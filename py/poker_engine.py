@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+poker_engine.py
+Headless Texas Hold'em round engine.
+
+Plays rounds without any input() or print(): deal hole cards and the
+board, score every player with poker_eval and pick the winner(s). Each round
+comes back as a dict:
+
+  {"table": t, "round": r, "hole": [[c, c], ...], "community": [c] * 5,
+   "scores": [...], "categories": ["Two Pair", ...], "best5": [(c, ...), ...],
+   "winners": [1-based player numbers]}
+
+with int cards (see poker_eval). With streets=True the dict also holds
+"streets": the category names each player held after the flop, turn and
+river (tracked incrementally with HandState).
+
+An optional observer is called with every result (the simulator's
+printing is one), and an optional StageTimer collects time spent dealing,
+evaluating, selecting winners and picking each player's best five cards.
+"""
+
+import random
+import time
+
+import poker_eval
+
+STAGES = ("deal", "evaluate", "winners", "best5")
+
+class StageTimer:
+    """Accumulate wall time per stage of the round loop."""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.rounds = 0
+
+    def report(self):
+        """Return {stage: (total seconds, microseconds per round)}."""
+        n = max(self.rounds, 1)
+        return {k: (v, 1e6 * v / n) for k, v in self.totals.items()}
+
+_DECK = range(52)
+
+def deal(num_players, rng=random):
+    """
+    Deal from a fresh int deck; return (hole cards per player, 5 community cards).
+    Only the 2 * num_players + 5 cards dealt are drawn, which is the same
+    distribution as shuffling all 52 and dealing off the top.
+    """
+    cards = rng.sample(_DECK, 2 * num_players + 5)
+    hole = [cards[i:i + 2] for i in range(0, 2 * num_players, 2)]
+    return hole, cards[2 * num_players:]
+
+def evaluate(hole, community):
+    """Return the poker_eval score of every player's best hand."""
+    return [poker_eval.evaluate(h + community) for h in hole]
+
+def select_winners(scores):
+    """Return the 1-based numbers of the players holding the best score."""
+    best = max(scores)
+    return [i for i, s in enumerate(scores, 1) if s == best]
+
+def street_categories(hole, community):
+    """Category names each player holds after the flop, turn and river."""
+    out = []
+    for h in hole:
+        state = poker_eval.HandState(h)
+        names = []
+        for street in (community[:3], community[3:4], community[4:5]):
+            state.extend(street)
+            names.append(state.category_name())
+        out.append(names)
+    return out
+
+def play_round(num_players, rng=random, observer=None, timer=None, table=0, round_no=0,
+               streets=False):
+    """Play one round headlessly and return its result dict (see module docstring)."""
+    if not 2 <= num_players <= 6:
+        raise ValueError("Number of players must be between 2 and 6")
+    if timer is None:
+        hole, community = deal(num_players, rng)
+        scores = evaluate(hole, community)
+        winners = select_winners(scores)
+        best5 = [poker_eval.best_five(h + community, s) for h, s in zip(hole, scores)]
+    else:
+        t0 = time.perf_counter()
+        hole, community = deal(num_players, rng)
+        t1 = time.perf_counter()
+        scores = evaluate(hole, community)
+        t2 = time.perf_counter()
+        winners = select_winners(scores)
+        t3 = time.perf_counter()
+        best5 = [poker_eval.best_five(h + community, s) for h, s in zip(hole, scores)]
+        t4 = time.perf_counter()
+        totals = timer.totals
+        totals["deal"] += t1 - t0
+        totals["evaluate"] += t2 - t1
+        totals["winners"] += t3 - t2
+        totals["best5"] += t4 - t3
+        timer.rounds += 1
+    result = {
+        "table": table,
+        "round": round_no,
+        "hole": hole,
+        "community": community,
+        "scores": scores,
+        "categories": [poker_eval.CATEGORY_NAMES[s >> 20] for s in scores],
+        "best5": best5,
+        "winners": winners,
+    }
+    if streets:
+        result["streets"] = street_categories(hole, community)
+    if observer is not None:
+        observer(result)
+    return result
+
+def run_tables(rounds, num_players, tables=1, seed=None, observer=None, timer=None, streets=False):
+    """
+    Play `rounds` rounds on each of `tables` tables. num_players is one count
+    (2..6) for every table or a list with one count per table.
+    Return a list with one list of round results per table.
+    """
+    rng = random.Random(seed)
+    counts = [num_players] * tables if isinstance(num_players, int) else list(num_players)
+    if len(counts) != tables:
+        raise ValueError("Need one player count per table")
+    results = []
+    for t, n in enumerate(counts):
+        results.append([play_round(n, rng, observer, timer, t, r, streets) for r in range(rounds)])
+    return results
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+poker_equity.py
+Monte Carlo all-in equity for the Texas Hold'em simulator.
+
+equity() deals the unknown cards (missing hole cards and the rest of the
+board) at random many times, scores every player with poker_eval and counts
+wins, ties and losses. Iterations are split into fixed-size batches that run
+on a ProcessPoolExecutor; batch i always uses the seed derived from
+(seed, i) and batches are folded in index order, so a run is reproducible
+for a given seed no matter how many workers play it. With ci_width set the
+run stops as soon as every player's equity confidence interval is narrower
+than that.
+
+exact_equity() instead enumerates every board completion once, which is
+exact and, heads-up from preflop, walks all 1,712,304 runouts.
+
+Usage:
+  python poker_equity.py AsAh KdKc [--board 2c7d9h] [--iterations 200000] [--workers 4]
+  python poker_equity.py AsAh KdKc --exact
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from statistics import NormalDist
+
+import poker_eval
+
+# ---- Input checks ----
+
+def prepare_cards(hole_cards_per_player, board=(), dead=()):
+    """
+    Convert hole cards, board and dead cards to int cards and check them.
+    Each player may list 0..2 hole cards (missing ones are dealt at random).
+    Return (holes, board, stub) where stub is the list of cards left to deal.
+    """
+    holes = [poker_eval.to_ints(h or ()) for h in hole_cards_per_player]
+    board = poker_eval.to_ints(board)
+    dead = poker_eval.to_ints(dead)
+    if len(holes) < 2:
+        raise ValueError("Need at least 2 players")
+    if any(len(h) > 2 for h in holes):
+        raise ValueError("A player has more than 2 hole cards")
+    if len(board) > 5:
+        raise ValueError("Board has more than 5 cards")
+    known = [c for h in holes for c in h] + board + dead
+    if len(set(known)) != len(known):
+        raise ValueError("Duplicate card in hole cards, board or dead cards")
+    used = poker_eval.cards_to_mask(known)
+    stub = [c for c in range(52) if not used >> c & 1]
+    if len(stub) < 2 * len(holes) - sum(len(h) for h in holes) + 5 - len(board):
+        raise ValueError("Not enough cards left to deal")
+    return holes, board, stub
+
+# ---- Sampling ----
+
+def batch_seed(seed, index):
+    """Seed for batch `index` of a run started with `seed` (stable across processes and runs)."""
+    return f"{seed}:{index}"
+
+def simulate_batch(holes, board, stub, iterations, seed):
+    """
+    Play `iterations` random runouts. Return (wins, ties, eq_sum, eq_sq) per
+    player lists, where eq is the share of the pot won in one runout
+    (1 for an outright win, 1/k for a k-way tie).
+    """
+    rng = random.Random(seed)
+    sample = rng.sample
+    evaluate = poker_eval.evaluate
+    n = len(holes)
+    board_need = 5 - len(board)
+    hole_need = [2 - len(h) for h in holes]
+    need = sum(hole_need) + board_need
+    wins = [0] * n
+    ties = [0] * n
+    eq_sum = [0.0] * n
+    eq_sq = [0.0] * n
+    players = range(n)
+    for _ in range(iterations):
+        drawn = sample(stub, need)
+        full_board = board + drawn[:board_need]
+        pos = board_need
+        scores = []
+        for i in players:
+            k = hole_need[i]
+            scores.append(evaluate(holes[i] + drawn[pos:pos + k] + full_board))
+            pos += k
+        best = max(scores)
+        winners = [i for i in players if scores[i] == best]
+        if len(winners) == 1:
+            i = winners[0]
+            wins[i] += 1
+            eq_sum[i] += 1.0
+            eq_sq[i] += 1.0
+        else:
+            share = 1.0 / len(winners)
+            for i in winners:
+                ties[i] += 1
+                eq_sum[i] += share
+                eq_sq[i] += share * share
+    return wins, ties, eq_sum, eq_sq
+
+def _run_batch(args):
+    """ProcessPoolExecutor entry point: unpack one batch job."""
+    return simulate_batch(*args)
+
+# ---- Equity ----
+
+def ci_half_width(eq_sum, eq_sq, n, confidence=0.95):
+    """Half width, in percentage points, of the normal-approximation confidence interval of a mean equity."""
+    if n < 2:
+        return math.inf
+    mean = eq_sum / n
+    var = max(eq_sq / n - mean * mean, 0.0) * n / (n - 1)
+    return 100.0 * NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(var / n)
+
+def equity(hole_cards_per_player, board=(), dead=(), iterations=100000, workers=None,
+           seed=None, ci_width=None, confidence=0.95, batch_size=5000, executor=None):
+    """
+    Estimate all-in equity by random runouts.
+
+    hole_cards_per_player: list of 0..2 known hole cards per player (int or 'AS' cards).
+    board: 0..5 known community cards; dead: cards known to be out of play.
+    iterations: maximum number of runouts. workers: processes (default all cores,
+    1 runs in this process). seed: makes the run reproducible. ci_width: stop
+    early once every player's equity confidence interval is narrower than this
+    many percentage points. executor: an open ProcessPoolExecutor to run the
+    batches on instead of starting a pool for this call (callers making many
+    estimates keep one pool); workers then only sizes the in-flight window.
+
+    Return {"players": [{"win", "tie", "loss", "equity"} percentages per player],
+            "iterations": runouts played, "seed": seed used}.
+    """
+    if iterations < 1:
+        raise ValueError("Need at least 1 iteration")
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    holes, board, stub = prepare_cards(hole_cards_per_player, board, dead)
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    n = len(holes)
+    sizes = [batch_size] * (iterations // batch_size)
+    if iterations % batch_size:
+        sizes.append(iterations % batch_size)
+    jobs = [(holes, board, stub, size, batch_seed(seed, i)) for i, size in enumerate(sizes)]
+
+    wins, ties, eq_sum, eq_sq = [0] * n, [0] * n, [0.0] * n, [0.0] * n
+    played = 0
+
+    def absorb(result, size):
+        nonlocal played
+        for total, part in zip((wins, ties, eq_sum, eq_sq), result):
+            for i in range(n):
+                total[i] += part[i]
+        played += size
+        if ci_width is None:
+            return False
+        return all(2 * ci_half_width(eq_sum[i], eq_sq[i], played, confidence) <= ci_width
+                   for i in range(n))
+
+    if executor is None and (workers <= 1 or len(jobs) <= 1):
+        for job in jobs:
+            if absorb(simulate_batch(*job), job[3]):
+                break
+    else:
+        with nullcontext(executor) if executor is not None else ProcessPoolExecutor(max_workers=workers) as pool:
+            # keep a bounded window of batches in flight and fold them in order
+            pending = [pool.submit(_run_batch, job) for job in jobs[:2 * workers]]
+            nxt = len(pending)
+            for i in range(len(jobs)):
+                result = pending[i].result()
+                if nxt < len(jobs):
+                    pending.append(pool.submit(_run_batch, jobs[nxt]))
+                    nxt += 1
+                if absorb(result, jobs[i][3]):
+                    for f in pending[i + 1:]:
+                        f.cancel()
+                    break
+
+    players = []
+    for i in range(n):
+        players.append({
+            "win": 100.0 * wins[i] / played,
+            "tie": 100.0 * ties[i] / played,
+            "loss": 100.0 * (played - wins[i] - ties[i]) / played,
+            "equity": 100.0 * eq_sum[i] / played,
+        })
+    return {"players": players, "iterations": played, "seed": seed}
+
+# ---- Exact enumeration ----
+
+@lru_cache(maxsize=1 << 16)
+def board_state(cards):
+    """
+    Accumulators (see poker_eval.partial_state) of a tuple of board cards,
+    built from the cached state of cards[:-1]. Runouts are walked in
+    itertools.combinations order, so consecutive boards share their prefixes.
+    """
+    if not cards:
+        return 1, 0, 0
+    key, suit_count, suit_bits = board_state(cards[:-1])
+    c = cards[-1]
+    return (key * poker_eval.CARD_PRIME[c], suit_count + poker_eval.CARD_SUIT_COUNT[c],
+            suit_bits | poker_eval.CARD_SUIT_BIT[c])
+
+def exact_equity(hole_cards_per_player, board=(), dead=()):
+    """
+    Exact all-in equity: enumerate every completion of the board from the
+    remaining deck. Every player needs both hole cards known.
+    Each runout scores every player once, from the player's precomputed hole
+    state combined with the board state (cached per board prefix, the last
+    card added inline).
+
+    Return {"players": [{"win", "tie", "loss", "equity"} percentages per player],
+            "runouts": number of boards enumerated}.
+    """
+    holes, board, stub = prepare_cards(hole_cards_per_player, board, dead)
+    if any(len(h) != 2 for h in holes):
+        raise ValueError("Exact enumeration needs both hole cards of every player")
+    n = len(holes)
+    players = range(n)
+    hole_states = [poker_eval.partial_state(h) for h in holes]
+    rank_table = poker_eval.RANK_TABLE
+    flush_table = poker_eval.FLUSH_TABLE
+    card_prime = poker_eval.CARD_PRIME
+    card_suit_count = poker_eval.CARD_SUIT_COUNT
+    card_suit_bit = poker_eval.CARD_SUIT_BIT
+    base = tuple(board)
+    need = 5 - len(board)
+    wins = [0] * n
+    ties = [0] * n
+    eq_sum = [0.0] * n
+    runouts = 0
+    if need == 0:
+        # complete board: a single runout, scored through the same loop
+        prefixes, base, stub = [()], base[:-1], [base[-1]]
+        need = 1
+    else:
+        prefixes = itertools.combinations(stub, need - 1)
+    position = {c: i for i, c in enumerate(stub)}
+    for prefix in prefixes:
+        pkey, pcount, pbits = board_state(base + prefix)
+        for c in stub[position[prefix[-1]] + 1 if prefix else 0:]:
+            bkey = pkey * card_prime[c]
+            bcount = pcount + card_suit_count[c]
+            bbits = pbits | card_suit_bit[c]
+            scores = []
+            for hkey, hcount, hbits in hole_states:
+                flush = (hcount + bcount + 0x3333) & 0x8888
+                if flush:
+                    suit = flush.bit_length() // 4 - 1
+                    scores.append(flush_table[((hbits | bbits) >> (16 * suit)) & 0x1FFF])
+                else:
+                    scores.append(rank_table[hkey * bkey])
+            runouts += 1
+            best = max(scores)
+            if scores.count(best) == 1:
+                i = scores.index(best)
+                wins[i] += 1
+                eq_sum[i] += 1.0
+            else:
+                winners = [i for i in players if scores[i] == best]
+                share = 1.0 / len(winners)
+                for i in winners:
+                    ties[i] += 1
+                    eq_sum[i] += share
+    out = []
+    for i in players:
+        out.append({
+            "win": 100.0 * wins[i] / runouts,
+            "tie": 100.0 * ties[i] / runouts,
+            "loss": 100.0 * (runouts - wins[i] - ties[i]) / runouts,
+            "equity": 100.0 * eq_sum[i] / runouts,
+        })
+    return {"players": out, "runouts": runouts}
+
+# ---- Command line ----
+
+def main():
+    ap = argparse.ArgumentParser(description="Monte Carlo Texas Hold'em equity")
+    ap.add_argument("hands", nargs="+", help="hole cards per player, e.g. AsAh KdKc ('-' for unknown)")
+    ap.add_argument("--board", default="", help="known community cards, e.g. 2c7d9h")
+    ap.add_argument("--dead", default="", help="cards out of play")
+    ap.add_argument("--iterations", type=int, default=200000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--ci", type=float, default=None, help="stop at this confidence interval width (%% points)")
+    ap.add_argument("--exact", action="store_true", help="enumerate every runout instead of sampling")
+    args = ap.parse_args()
+    hands = [[] if h == "-" else poker_eval.parse_cards(h) for h in args.hands]
+    if args.exact:
+        res = exact_equity(hands, poker_eval.parse_cards(args.board), poker_eval.parse_cards(args.dead))
+        print(f"{res['runouts']} runouts (exact)")
+        for h, p in zip(args.hands, res["players"]):
+            print(f"{h:>6}: win {p['win']:6.2f}%  tie {p['tie']:5.2f}%  loss {p['loss']:6.2f}%  equity {p['equity']:6.2f}%")
+        return
+    res = equity(hands, poker_eval.parse_cards(args.board), poker_eval.parse_cards(args.dead),
+                 iterations=args.iterations, workers=args.workers, seed=args.seed, ci_width=args.ci)
+    print(f"{res['iterations']} runouts (seed {res['seed']})")
+    for h, p in zip(args.hands, res["players"]):
+        print(f"{h:>6}: win {p['win']:6.2f}%  tie {p['tie']:5.2f}%  loss {p['loss']:6.2f}%  equity {p['equity']:6.2f}%")
+
+if __name__ == "__main__":
+    main()
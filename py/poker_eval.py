@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+poker_eval.py
+Table-driven hand evaluator for the Texas Hold'em simulator.
+
+Scores a 5..7 card hand in a single pass over the cards and returns one
+integer. Larger integers are better hands, and the ordering is exactly the
+one evaluate_7cards / compare_hand_tuples give for the (category,
+tiebreakers) tuples in "Texas Hold'em simulator.py".
+
+How it works:
+- Every rank gets a prime. The product of the primes of the cards identifies
+  the rank multiset (prime-product perfect hash), so one dict lookup scores
+  any hand that is not a flush.
+- Card counts per suit are kept in 4-bit fields of one int; adding 3 to each
+  field sets its top bit exactly when that suit holds 5+ cards.
+- Ranks seen per suit are kept as 13-bit masks in 16-bit fields of one int;
+  the flush suit's mask indexes an 8192-entry table for flushes and
+  straight flushes.
+
+Score layout: category << 20 | tiebreakers packed 4 bits each, left aligned.
+"""
+
+import itertools
+from array import array
+
+RANKS = "23456789TJQKA"                       # rank order low->high
+SUITS = "CDHS"                                # clubs, diamonds, hearts, spades
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# Category numbers match HAND_RANKS in the simulator
+STRAIGHT_FLUSH, FOUR_OF_A_KIND, FULL_HOUSE, FLUSH, STRAIGHT = 8, 7, 6, 5, 4
+THREE_OF_A_KIND, TWO_PAIR, ONE_PAIR, HIGH_CARD = 3, 2, 1, 0
+CATEGORY_NAMES = ("High Card", "One Pair", "Two Pair", "Three of a Kind", "Straight",
+                  "Flush", "Full House", "Four of a Kind", "Straight Flush")
+
+# Number of tiebreakers evaluate_7cards returns for each category
+TIEBREAK_LEN = (5, 4, 3, 3, 1, 5, 2, 2, 1)
+
+# ---- Score packing ----
+
+def pack_score(category, tiebreakers):
+    """Pack (category, tiebreakers) into one int; tiebreakers are left aligned in 4-bit fields."""
+    score = category
+    for i in range(5):
+        score = (score << 4) | (tiebreakers[i] if i < len(tiebreakers) else 0)
+    return score
+
+def score_to_tuple(score):
+    """Inverse of pack_score: return (category, tiebreaker_list) as evaluate_7cards would."""
+    category = score >> 20
+    tiebreakers = [(score >> (16 - 4 * i)) & 0xF for i in range(TIEBREAK_LEN[category])]
+    return category, tiebreakers
+
+def score_category(score):
+    """Return the category number (0..8) of a packed score."""
+    return score >> 20
+
+# ---- Table construction ----
+
+def _straight_high(mask):
+    """Return top rank index of the best straight in a 13-bit rank mask, or -1 if none."""
+    for high in range(12, 3, -1):
+        window = 0x1F << (high - 4)
+        if mask & window == window:
+            return high
+    if mask & 0x100F == 0x100F:               # wheel A-2-3-4-5, 5 is high
+        return 3
+    return -1
+
+def _top_ranks(mask, n):
+    """Return the n highest rank indices set in mask, high->low."""
+    out = []
+    for r in range(12, -1, -1):
+        if mask >> r & 1:
+            out.append(r)
+            if len(out) == n:
+                break
+    return out
+
+def _score_flush(mask):
+    """Score the best hand made from one suit's rank mask (5+ bits set)."""
+    high = _straight_high(mask)
+    if high >= 0:
+        return pack_score(STRAIGHT_FLUSH, [high])
+    return pack_score(FLUSH, _top_ranks(mask, 5))
+
+def _score_ranks(counts):
+    """Score a rank multiset (counts per rank index) ignoring suits."""
+    by_count = sorted(((n, r) for r, n in enumerate(counts) if n), reverse=True)
+    mask = 0
+    for n, r in by_count:
+        mask |= 1 << r
+    top_n, top_r = by_count[0]
+    if top_n == 4:
+        kicker = max(r for n, r in by_count if r != top_r)
+        return pack_score(FOUR_OF_A_KIND, [top_r, kicker])
+    if top_n == 3 and any(n >= 2 for n, r in by_count[1:]):
+        pair = max(r for n, r in by_count[1:] if n >= 2)
+        return pack_score(FULL_HOUSE, [top_r, pair])
+    high = _straight_high(mask)
+    if high >= 0:
+        return pack_score(STRAIGHT, [high])
+    if top_n == 3:
+        return pack_score(THREE_OF_A_KIND, [top_r] + _top_ranks(mask & ~(1 << top_r), 2))
+    pairs = [r for n, r in by_count if n == 2]
+    if len(pairs) >= 2:
+        top_two = pairs[:2]
+        kicker = max(r for n, r in by_count if r not in top_two)
+        return pack_score(TWO_PAIR, top_two + [kicker])
+    if pairs:
+        return pack_score(ONE_PAIR, [top_r] + _top_ranks(mask & ~(1 << top_r), 3))
+    return pack_score(HIGH_CARD, _top_ranks(mask, 5))
+
+def _build_rank_table():
+    """Map prime product -> score for every 5, 6 and 7 card rank multiset."""
+    table = {}
+    for k in (5, 6, 7):
+        for combo in itertools.combinations_with_replacement(range(13), k):
+            counts = [0] * 13
+            key = 1
+            for r in combo:
+                counts[r] += 1
+                key *= PRIMES[r]
+            if max(counts) <= 4:
+                table[key] = _score_ranks(counts)
+    return table
+
+def _build_flush_table():
+    """Score for every 13-bit suit mask holding at least five ranks (0 elsewhere)."""
+    return [_score_flush(m) if bin(m).count("1") >= 5 else 0 for m in range(1 << 13)]
+
+RANK_TABLE = _build_rank_table()
+FLUSH_TABLE = _build_flush_table()
+STRAIGHT_TABLE = [_straight_high(m) for m in range(1 << 13)]   # rank mask -> straight high or -1
+
+# ---- Card encoding ----
+#
+# A card is an int 0..51: rank_index * 4 + suit_index, the same order make_deck
+# produces strings in. A deck is an array('B') of those ints, a set of cards
+# can be a 52-bit mask, and PACKED_CARDS holds the bitfield form
+#   bits 0-5 prime, bits 8-11 rank, bits 12-15 suit bit, bits 16-28 rank bit.
+
+SUIT_SYMBOLS = {'C': '♣', 'D': '♦', 'H': '♥', 'S': '♠'}
+
+CARD_STRINGS = tuple(r + s for r in RANKS for s in SUITS)
+CARD_IDS = {c: i for i, c in enumerate(CARD_STRINGS)}
+
+def card_from_str(card):
+    """Return the int encoding of a card string such as 'AS' or 'tc'."""
+    try:
+        return CARD_IDS[card[0].upper() + card[1].upper()]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Invalid card: {card!r}") from None
+
+def card_to_str(card):
+    """Return the 'AS' style string of an int card (strings pass through)."""
+    return card if isinstance(card, str) else CARD_STRINGS[card]
+
+def parse_cards(text):
+    """Return int cards from text like 'AsKd', 'As Kd' or 'AS,KD'."""
+    t = text.replace(",", "").replace(" ", "")
+    if len(t) % 2:
+        raise ValueError(f"Invalid card list: {text!r}")
+    return [card_from_str(t[i:i + 2]) for i in range(0, len(t), 2)]
+
+def to_ints(cards):
+    """Return a list of int cards from any mix of int and string cards."""
+    return [c if isinstance(c, int) else card_from_str(c) for c in cards]
+
+def card_rank(card):
+    """Rank index 0..12 of an int card."""
+    return card >> 2
+
+def card_suit(card):
+    """Suit index 0..3 (into SUITS) of an int card."""
+    return card & 3
+
+def pretty(card):
+    """Return human-friendly card representation, e.g., 'A♠', for int or string cards."""
+    s = card_to_str(card)
+    return s[0] + SUIT_SYMBOLS.get(s[1], s[1])
+
+def pack_card(card):
+    """Return the rank/suit/prime bitfield of an int card."""
+    r, s = card >> 2, card & 3
+    return PRIMES[r] | r << 8 | (1 << s) << 12 | (1 << r) << 16
+
+PACKED_CARDS = tuple(pack_card(c) for c in range(52))
+
+def make_int_deck():
+    """Return a new ordered deck of the 52 int cards as an array('B')."""
+    return array('B', range(52))
+
+def cards_to_mask(cards):
+    """Return the 52-bit mask with the bit of every int card set."""
+    mask = 0
+    for c in cards:
+        mask |= 1 << c
+    return mask
+
+def mask_to_cards(mask):
+    """Return the int cards of a 52-bit mask, low->high."""
+    return [c for c in range(52) if mask >> c & 1]
+
+# Per-card lookups indexed by int card
+CARD_PRIME = tuple(PRIMES[c >> 2] for c in range(52))           # prime of its rank
+CARD_SUIT_COUNT = tuple(1 << (4 * (c & 3)) for c in range(52))  # 1 in its suit's 4-bit counter
+CARD_SUIT_BIT = tuple(1 << (16 * (c & 3) + (c >> 2)) for c in range(52))  # rank bit in its suit's mask
+
+# ---- Evaluation ----
+
+def evaluate(cards):
+    """
+    Score 5..7 cards (ints, or strings like 'AS') in one pass. Return an int;
+    a higher int is a better hand and equal ints are ties, exactly as
+    compare_hand_tuples orders the tuples returned by evaluate_7cards.
+    """
+    if not 5 <= len(cards) <= 7:
+        raise ValueError("Need 5 to 7 cards to evaluate a hand")
+    if isinstance(cards[0], str):
+        cards = to_ints(cards)
+    key = 1
+    suit_count = 0
+    suit_bits = 0
+    for c in cards:
+        key *= CARD_PRIME[c]
+        suit_count += CARD_SUIT_COUNT[c]
+        suit_bits |= CARD_SUIT_BIT[c]
+    flush = (suit_count + 0x3333) & 0x8888
+    if flush:
+        # at most one suit can hold 5 of 7 cards, and then no quads or full house is possible
+        suit = flush.bit_length() // 4 - 1
+        return FLUSH_TABLE[(suit_bits >> (16 * suit)) & 0x1FFF]
+    return RANK_TABLE[key]
+
+def partial_state(cards):
+    """
+    Return the (prime_product, suit_counts, suit_bits) accumulators for some
+    int cards. States of disjoint card sets combine by multiplying, adding
+    and or-ing the fields; score_state turns a 5..7 card state into a score.
+    """
+    key = 1
+    suit_count = 0
+    suit_bits = 0
+    for c in cards:
+        key *= CARD_PRIME[c]
+        suit_count += CARD_SUIT_COUNT[c]
+        suit_bits |= CARD_SUIT_BIT[c]
+    return key, suit_count, suit_bits
+
+def score_state(key, suit_count, suit_bits):
+    """Score the accumulators of 5..7 cards (see partial_state)."""
+    flush = (suit_count + 0x3333) & 0x8888
+    if flush:
+        suit = flush.bit_length() // 4 - 1
+        return FLUSH_TABLE[(suit_bits >> (16 * suit)) & 0x1FFF]
+    return RANK_TABLE[key]
+
+def best_five(cards, score):
+    """
+    Return the 5 cards (in input order) making up the hand scored `score`.
+    Where several copies of a rank would do, the earliest ones are used, which
+    is the combination itertools.combinations would reach first.
+    """
+    category, tb = score_to_tuple(score)
+    ids = to_ints(cards)
+    if category in (STRAIGHT_FLUSH, FLUSH):
+        suits = [0] * 4
+        for c in ids:
+            suits[c & 3] += 1
+        flush_suit = next(s for s in range(4) if suits[s] >= 5)
+    else:
+        flush_suit = None
+    if category in (STRAIGHT_FLUSH, STRAIGHT):
+        high = tb[0]
+        want = {r: 1 for r in ([12, 0, 1, 2, 3] if high == 3 else range(high - 4, high + 1))}
+    elif category == FULL_HOUSE:
+        want = {tb[0]: 3, tb[1]: 2}
+    elif category == FOUR_OF_A_KIND:
+        want = {tb[0]: 4, tb[1]: 1}
+    elif category == TWO_PAIR:
+        want = {tb[0]: 2, tb[1]: 2, tb[2]: 1}
+    elif category in (THREE_OF_A_KIND, ONE_PAIR):
+        want = {tb[0]: 3 if category == THREE_OF_A_KIND else 2}
+        want.update((r, 1) for r in tb[1:])
+    else:
+        want = {r: 1 for r in tb}
+    combo = []
+    for card, c in zip(cards, ids):
+        if flush_suit is not None and c & 3 != flush_suit:
+            continue
+        r = c >> 2
+        if want.get(r):
+            want[r] -= 1
+            combo.append(card)
+    return tuple(combo)
+
+# ---- Incremental evaluation ----
+
+STREET_NAMES = {0: "Empty", 2: "Preflop", 5: "Flop", 6: "Turn", 7: "River"}
+
+class HandState:
+    """
+    One player's hand built up a card at a time: hole cards, then flop, turn
+    and river. Every add() updates running rank counts, suit counts and rank
+    bitmasks, so category(), score() and straight_high() are O(1) lookups at
+    any street instead of a re-evaluation from scratch.
+    """
+
+    __slots__ = ("cards", "key", "suit_count", "suit_bits", "rank_mask", "rank_counts", "groups")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.key = 1                    # prime product of the ranks
+        self.suit_count = 0             # 4-bit card count per suit
+        self.suit_bits = 0              # 13-bit rank mask per suit, 16 bits apart
+        self.rank_mask = 0              # ranks held in any suit (straight bitmask)
+        self.rank_counts = [0] * 13
+        self.groups = [0] * 5           # groups[n] = number of ranks held exactly n times
+        for c in cards:
+            self.add(c)
+
+    def add(self, card):
+        """Absorb one card (int or string)."""
+        if isinstance(card, str):
+            card = card_from_str(card)
+        if len(self.cards) == 7:
+            raise ValueError("A hand holds at most 7 cards")
+        bit = CARD_SUIT_BIT[card]
+        if self.suit_bits & bit:
+            raise ValueError(f"Duplicate card: {card_to_str(card)}")
+        r = card >> 2
+        n = self.rank_counts[r]
+        self.rank_counts[r] = n + 1
+        if n:
+            self.groups[n] -= 1
+        self.groups[n + 1] += 1
+        self.cards.append(card)
+        self.key *= CARD_PRIME[card]
+        self.suit_count += CARD_SUIT_COUNT[card]
+        self.suit_bits |= bit
+        self.rank_mask |= 1 << r
+
+    def extend(self, cards):
+        """Absorb several cards, e.g. a whole street."""
+        for c in cards:
+            self.add(c)
+
+    def copy(self):
+        """Independent copy, for branching into different runouts."""
+        other = HandState.__new__(HandState)
+        other.cards = self.cards[:]
+        other.key = self.key
+        other.suit_count = self.suit_count
+        other.suit_bits = self.suit_bits
+        other.rank_mask = self.rank_mask
+        other.rank_counts = self.rank_counts[:]
+        other.groups = self.groups[:]
+        return other
+
+    def __len__(self):
+        return len(self.cards)
+
+    def street(self):
+        """Name of the street the hand has reached ('Preflop', 'Flop', 'Turn', 'River')."""
+        return STREET_NAMES.get(len(self.cards), f"{len(self.cards)} cards")
+
+    def score(self):
+        """Packed score (as evaluate) of the best 5 cards; needs 5..7 cards."""
+        if len(self.cards) < 5:
+            raise ValueError("Need 5 to 7 cards to evaluate a hand")
+        return score_state(self.key, self.suit_count, self.suit_bits)
+
+    def category(self):
+        """Best category made so far (0..8); below 5 cards only sets of ranks count."""
+        if len(self.cards) >= 5:
+            return score_state(self.key, self.suit_count, self.suit_bits) >> 20
+        groups = self.groups
+        if groups[4]:
+            return FOUR_OF_A_KIND
+        if groups[3]:
+            return THREE_OF_A_KIND
+        if groups[2] >= 2:
+            return TWO_PAIR
+        return ONE_PAIR if groups[2] else HIGH_CARD
+
+    def category_name(self):
+        return CATEGORY_NAMES[self.category()]
+
+    def straight_high(self):
+        """Top rank index of a straight held in any suits, or -1."""
+        return STRAIGHT_TABLE[self.rank_mask]
+
+    def suit_counts(self):
+        """Cards held per suit, in SUITS order (flush draws)."""
+        return [(self.suit_count >> (4 * s)) & 0xF for s in range(4)]
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+poker_preflop.py
+Precomputed preflop all-in equity for the 169 starting-hand classes.
+
+build_table() runs poker_equity for one representative of every class
+(pairs, suited and offsuit hands) against 1..5 random opponents and
+write_table() stores the results in a small binary file:
+
+  header  '<4sHHHHI'  magic b"PFEQ", version, classes (169), max opponents,
+                      reserved, iterations per entry
+  body    uint16 per (class, opponents), equity * 65535 / 100, class-major
+
+PreflopTable memory-maps that file, so opening it costs next to nothing and
+every lookup is one unpack at a computed offset.
+
+Usage:
+  python poker_preflop.py build [--iterations 20000] [--workers 4] [--out preflop_equity.bin]
+  python poker_preflop.py show AKs [--opponents 3]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import poker_eval
+import poker_equity
+
+MAGIC = b"PFEQ"
+VERSION = 1
+MAX_OPPONENTS = 5
+HEADER = struct.Struct("<4sHHHHI")
+ENTRY = struct.Struct("<H")
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+
+# ---- Hand classes ----
+#
+# Class index on the usual 13x13 grid: row = first rank, col = second rank.
+# Pairs sit on the diagonal, suited hands above it (row = high rank) and
+# offsuit hands below it (row = low rank).
+
+def class_index(hi, lo, suited):
+    """Grid index 0..168 of the class with rank indices hi >= lo."""
+    return hi * 13 + lo if suited or hi == lo else lo * 13 + hi
+
+def hand_class(hole):
+    """Grid index of a two-card hand (int or string cards)."""
+    a, b = poker_eval.to_ints(hole)
+    hi, lo = max(a >> 2, b >> 2), min(a >> 2, b >> 2)
+    return class_index(hi, lo, (a & 3) == (b & 3) and a != b)
+
+def class_name(index):
+    """Return 'AKs', 'T9o', '77' style name of a class index."""
+    row, col = divmod(index, 13)
+    ranks = poker_eval.RANKS
+    if row == col:
+        return ranks[row] * 2
+    if row > col:
+        return ranks[row] + ranks[col] + "s"
+    return ranks[col] + ranks[row] + "o"
+
+def class_from_name(name):
+    """Inverse of class_name ('AKs', 'ak', 'T9o', '77')."""
+    n = name.strip().upper()
+    try:
+        hi, lo = poker_eval.RANKS.index(n[0]), poker_eval.RANKS.index(n[1])
+    except (IndexError, ValueError):
+        raise ValueError(f"Invalid hand class: {name!r}") from None
+    if hi < lo:
+        hi, lo = lo, hi
+    if hi == lo:
+        if len(n) != 2:
+            raise ValueError(f"Invalid hand class: {name!r}")
+        return class_index(hi, lo, False)
+    if len(n) != 3 or n[2] not in "SO":
+        raise ValueError(f"Invalid hand class: {name!r}")
+    return class_index(hi, lo, n[2] == "S")
+
+def representative(index):
+    """Two int cards belonging to a class."""
+    row, col = divmod(index, 13)
+    if row == col:
+        return [row * 4, row * 4 + 1]
+    if row > col:
+        return [row * 4, col * 4]          # same suit
+    return [col * 4, row * 4 + 1]
+
+# ---- Build and write ----
+
+def build_table(iterations=20000, workers=None, seed=0, progress=None):
+    """
+    Return a list of 169 * MAX_OPPONENTS equities (percent), class-major.
+    One process pool serves every entry instead of one pool per equity() call.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    table = []
+    try:
+        for index in range(169):
+            hole = representative(index)
+            for opponents in range(1, MAX_OPPONENTS + 1):
+                res = poker_equity.equity([hole] + [[]] * opponents, iterations=iterations,
+                                          workers=workers, seed=f"{seed}:{index}:{opponents}",
+                                          executor=pool)
+                table.append(res["players"][0]["equity"])
+            if progress is not None:
+                progress(index, table[-MAX_OPPONENTS:])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return table
+
+def write_table(path, table, iterations):
+    """Write equities (percent) in the binary format described above."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 169, MAX_OPPONENTS, 0, iterations))
+        for eq in table:
+            f.write(ENTRY.pack(round(eq * 65535 / 100)))
+
+# ---- Memory-mapped lookups ----
+
+class PreflopTable:
+    """Read-only, memory-mapped view of a preflop equity file."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, classes, max_opps, _, self.iterations = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or classes != 169:
+            self._mm.close()
+            raise ValueError(f"{path} is not a preflop equity table")
+        if len(self._mm) != HEADER.size + 169 * max_opps * ENTRY.size:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+        self.max_opponents = max_opps
+
+    def class_equity(self, index, opponents):
+        """Equity (percent) of class `index` all-in against `opponents` random hands."""
+        if not 1 <= opponents <= self.max_opponents:
+            raise ValueError(f"opponents must be 1..{self.max_opponents}")
+        offset = HEADER.size + (index * self.max_opponents + opponents - 1) * ENTRY.size
+        return ENTRY.unpack_from(self._mm, offset)[0] * 100 / 65535
+
+    def equity(self, hole, opponents):
+        """Equity (percent) of two hole cards against `opponents` random hands."""
+        return self.class_equity(hand_class(hole), opponents)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_default():
+    """Open the table next to this module, or return None if it has not been built."""
+    try:
+        return PreflopTable(DEFAULT_PATH)
+    except (OSError, ValueError):
+        return None
+
+# ---- Command line ----
+
+def main():
+    ap = argparse.ArgumentParser(description="Preflop equity table")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="simulate every class and write the table")
+    b.add_argument("--iterations", type=int, default=20000)
+    b.add_argument("--workers", type=int, default=None)
+    b.add_argument("--seed", type=int, default=0)
+    b.add_argument("--out", default=DEFAULT_PATH)
+    s = sub.add_parser("show", help="look up classes in a built table")
+    s.add_argument("classes", nargs="+", help="e.g. AKs 72o TT")
+    s.add_argument("--opponents", type=int, default=None)
+    s.add_argument("--table", default=DEFAULT_PATH)
+    args = ap.parse_args()
+    if args.cmd == "build":
+        def progress(index, row):
+            print(f"{class_name(index):>4}: " + " ".join(f"{e:6.2f}" for e in row))
+        table = build_table(args.iterations, args.workers, args.seed, progress)
+        write_table(args.out, table, args.iterations)
+        print(f"Wrote {args.out}")
+    else:
+        with PreflopTable(args.table) as t:
+            opps = [args.opponents] if args.opponents else range(1, t.max_opponents + 1)
+            for name in args.classes:
+                idx = class_from_name(name)
+                print(f"{class_name(idx):>4}: " + " ".join(f"{t.class_equity(idx, o):6.2f}" for o in opps))
+
+if __name__ == "__main__":
+    main()
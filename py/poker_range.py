@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+poker_range.py
+Hand ranges and weighted range-vs-range equity.
+
+parse_range() expands standard range notation into weighted combos:
+
+  AA  AKs  AKo  AK          one class (AK = suited and offsuit)
+  TT+  A2s+  K9o+           pairs up to AA / kicker up to one below the top card
+  22-55  A2s-A5s  76s-54s   spans of pairs, kickers, or same-gap connectors
+  AsKd                      one exact combo
+  AKs:0.5                   any of the above with a weight (default 1)
+
+Combos touching known cards (board, dead, hero's cards) are dropped.
+
+range_equity() plays every pair of compatible combos against each other,
+using poker_equity.exact_equity once the flop is out and Monte Carlo
+preflop. Matchups are reduced to a canonical form under the 24 suit
+permutations before they are evaluated, so e.g. AsKs-QhQd and AhKh-QsQd
+are computed once, and results are kept in an LRU cache across calls.
+
+Usage:
+  python poker_range.py "AKs, TT+" "76s-54s, 22+" [--board AhKd2c] [--iterations 20000]
+"""
+
+import argparse
+import itertools
+from functools import lru_cache
+
+import poker_eval
+import poker_equity
+
+RANKS = poker_eval.RANKS
+
+# ---- Range parsing ----
+
+def _rank(ch, token):
+    i = RANKS.find(ch.upper())
+    if i < 0:
+        raise ValueError(f"Invalid rank in {token!r}")
+    return i
+
+def class_combos(hi, lo, kind):
+    """Int combos of one class: kind 's' suited, 'o' offsuit, '' both (pairs ignore kind)."""
+    if hi == lo:
+        return [(hi * 4 + a, hi * 4 + b) for a, b in itertools.combinations(range(4), 2)]
+    out = []
+    for a in range(4):
+        for b in range(4):
+            if (a == b and kind != "o") or (a != b and kind != "s"):
+                out.append((hi * 4 + a, lo * 4 + b))
+    return out
+
+def _parse_class(text, token):
+    """'AKs' -> (hi, lo, 's'); ranks are put in high-low order."""
+    if len(text) not in (2, 3) or (len(text) == 3 and text[2].lower() not in "so"):
+        raise ValueError(f"Invalid hand class {token!r}")
+    hi, lo = _rank(text[0], token), _rank(text[1], token)
+    if hi < lo:
+        hi, lo = lo, hi
+    kind = text[2].lower() if len(text) == 3 else ""
+    if hi == lo and kind:
+        raise ValueError(f"A pair cannot be suited or offsuit: {token!r}")
+    return hi, lo, kind
+
+def _expand_token(token):
+    """Yield (hi, lo, kind) classes, or one explicit combo as ('combo', c1, c2)."""
+    t = token.strip()
+    if len(t) == 4 and t[1].upper() in poker_eval.SUITS and t[3].upper() in poker_eval.SUITS:
+        a, b = poker_eval.parse_cards(t)
+        if a == b:
+            raise ValueError(f"Duplicate card in {token!r}")
+        yield ("combo", a, b)
+        return
+    if t.endswith("+"):
+        hi, lo, kind = _parse_class(t[:-1], token)
+        if hi == lo:
+            for r in range(lo, 13):
+                yield r, r, ""
+        else:
+            for r in range(lo, hi):
+                yield hi, r, kind
+        return
+    if "-" in t:
+        first, last = (p.strip() for p in t.split("-", 1))
+        h1, l1, k1 = _parse_class(first, token)
+        h2, l2, k2 = _parse_class(last, token)
+        if k1 != k2:
+            raise ValueError(f"Both ends of {token!r} must be the same kind")
+        if h1 == l1 and h2 == l2:
+            for r in range(min(h1, h2), max(h1, h2) + 1):
+                yield r, r, ""
+        elif h1 == h2:
+            for r in range(min(l1, l2), max(l1, l2) + 1):
+                yield h1, r, k1
+        elif h1 - l1 == h2 - l2:
+            for d in range(0, abs(h1 - h2) + 1):
+                base = min(h1, h2) + d
+                yield base, base - (h1 - l1), k1
+        else:
+            raise ValueError(f"Unsupported span {token!r}")
+        return
+    yield _parse_class(t, token)
+
+def parse_range(text, dead=()):
+    """
+    Expand range notation into a list of ((card, card), weight) with int
+    cards, dropping combos that use a dead card. A combo listed twice keeps
+    the weight given last.
+    """
+    dead_mask = poker_eval.cards_to_mask(poker_eval.to_ints(dead))
+    weights = {}
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        weight = 1.0
+        if ":" in part:
+            part, w = part.rsplit(":", 1)
+            try:
+                weight = float(w)
+            except ValueError:
+                raise ValueError(f"Invalid weight in {part!r}") from None
+            if weight < 0:
+                raise ValueError(f"Negative weight in {part!r}")
+        for item in _expand_token(part):
+            combos = [item[1:]] if item[0] == "combo" else class_combos(*item)
+            for a, b in combos:
+                weights[(max(a, b), min(a, b))] = weight
+    return [(c, w) for c, w in weights.items()
+            if w > 0 and not dead_mask & (1 << c[0] | 1 << c[1])]
+
+# ---- Suit isomorphism ----
+
+_SUIT_PERMS = list(itertools.permutations(range(4)))
+
+def canonical(hole1, hole2, board, dead=()):
+    """
+    Smallest relabelling of (hole1, hole2, board, dead) over all suit
+    permutations. Matchups with the same canonical form have the same equities.
+    """
+    best = None
+    for perm in _SUIT_PERMS:
+        key = (tuple(sorted((c & ~3) | perm[c & 3] for c in hole1)),
+               tuple(sorted((c & ~3) | perm[c & 3] for c in hole2)),
+               tuple(sorted((c & ~3) | perm[c & 3] for c in board)),
+               tuple(sorted((c & ~3) | perm[c & 3] for c in dead)))
+        if best is None or key < best:
+            best = key
+    return best
+
+@lru_cache(maxsize=1 << 16)
+def matchup_equity(hole1, hole2, board, dead, iterations, seed):
+    """
+    (win, tie, equity) percentages of hole1 against hole2 on a board with
+    dead cards out of the deck, for a canonical matchup. Exact from the flop
+    on; Monte Carlo preflop.
+    """
+    if len(board) >= 3:
+        res = poker_equity.exact_equity([hole1, hole2], board, dead)
+    else:
+        res = poker_equity.equity([hole1, hole2], board, dead, iterations=iterations,
+                                  workers=1, seed=f"{seed}:{hole1}:{hole2}:{board}:{dead}")
+    p = res["players"][0]
+    return p["win"], p["tie"], p["equity"]
+
+# ---- Range vs range ----
+
+def range_equity(range1, range2, board=(), dead=(), iterations=20000, seed=0):
+    """
+    Weighted equity of range1 against range2 (notation strings or parsed
+    combo lists). Every compatible pair of combos counts with the product of
+    their weights.
+
+    Return {"win", "tie", "equity"} percentages for range1, the same for
+    range2 as "opponent", and "matchups" / "evaluated" (distinct canonical
+    matchups actually computed this call, the rest came from symmetry or
+    the cache).
+    """
+    board = tuple(poker_eval.to_ints(board))
+    dead = tuple(poker_eval.to_ints(dead))
+    known = list(board) + list(dead)
+    if isinstance(range1, str):
+        range1 = parse_range(range1, known)
+    if isinstance(range2, str):
+        range2 = parse_range(range2, known)
+    total = win = tie = eq = 0.0
+    matchups = 0
+    misses_before = matchup_equity.cache_info().misses
+    for c1, w1 in range1:
+        m1 = 1 << c1[0] | 1 << c1[1]
+        for c2, w2 in range2:
+            if m1 & (1 << c2[0] | 1 << c2[1]):
+                continue
+            w = w1 * w2
+            h1, h2, b, d = canonical(c1, c2, board, dead)
+            mw, mt, me = matchup_equity(h1, h2, b, d, iterations, seed)
+            total += w
+            win += w * mw
+            tie += w * mt
+            eq += w * me
+            matchups += 1
+    if not total:
+        raise ValueError("The ranges have no compatible combos")
+    loss = 100.0 - win / total - tie / total
+    return {
+        "win": win / total, "tie": tie / total, "equity": eq / total,
+        "opponent": {"win": loss, "tie": tie / total, "equity": 100.0 - eq / total},
+        "matchups": matchups,
+        "evaluated": matchup_equity.cache_info().misses - misses_before,
+    }
+
+# ---- Command line ----
+
+def main():
+    ap = argparse.ArgumentParser(description="Range vs range Texas Hold'em equity")
+    ap.add_argument("range1")
+    ap.add_argument("range2")
+    ap.add_argument("--board", default="")
+    ap.add_argument("--dead", default="")
+    ap.add_argument("--iterations", type=int, default=20000, help="Monte Carlo runouts per preflop matchup")
+    args = ap.parse_args()
+    res = range_equity(args.range1, args.range2, poker_eval.parse_cards(args.board),
+                       poker_eval.parse_cards(args.dead), args.iterations)
+    print(f"{res['matchups']} combo matchups, {res['evaluated']} evaluated after suit reduction")
+    for name, p in ((args.range1, res), (args.range2, res["opponent"])):
+        print(f"{name:>20}: win {p['win']:6.2f}%  tie {p['tie']:5.2f}%  equity {p['equity']:6.2f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+regex_nfa.py
+Linear-time regular expressions: Thompson NFA plus a lazily built DFA.
+
+compile() parses a pattern in a subset of the re dialect
+
+  ab  a|b  a*  a+  a?  (...)  .  [abc]  [a-z]  [^0-9]
+  \\d \\w \\s \\D \\W \\S (ASCII classes)  \\n \\t \\r  \\x (x not a letter or digit)
+
+with re's meaning ('.' matches any byte except newline), and raises
+ValueError for anything else re would read differently: {m,n}, anchors,
+other backslash escapes. Patterns are always matched whole (fullmatch).
+
+The pattern becomes a Thompson NFA over bytes. The NFA can be simulated
+directly with state sets held as int bitsets (nfa_fullmatch), but
+fullmatch() builds a DFA on the fly instead: every new set of NFA states
+reached becomes a DFA state, and its transitions are filled in the first
+time each byte is seen, so later inputs hit a plain table lookup per byte.
+The number of cached DFA states is capped; when the cap is hit the cache
+is flushed and rebuilt from the current state, so memory stays bounded
+while time stays O(len(input)) for every pattern, unlike the backtracking
+re module.
+
+bytes patterns and inputs match byte by byte, as re does for bytes. str
+patterns must be ASCII (anything else raises ValueError) and match like
+re with re.ASCII: every non-ASCII character of a str input is one symbol,
+matched only by '.', negated classes and \\D \\W \\S.
+
+Usage:
+  python regex_nfa.py          # compare with re on random patterns, then an adversarial case
+"""
+
+# ---- Parsing ----
+
+ANY = (1 << 256) - 1
+
+def _mask(values):
+    m = 0
+    for v in values:
+        m |= 1 << v
+    return m
+
+DOT = ANY & ~(1 << ord("\n"))
+_DIGIT = _mask(b"0123456789")
+_WORD = _mask(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+_SPACE = _mask(b" \t\n\r\f\v")
+CLASS_ESCAPES = {ord("d"): _DIGIT, ord("w"): _WORD, ord("s"): _SPACE,
+                 ord("D"): ANY ^ _DIGIT, ord("W"): ANY ^ _WORD, ord("S"): ANY ^ _SPACE}
+CHAR_ESCAPES = {ord("n"): ord("\n"), ord("t"): ord("\t"), ord("r"): ord("\r")}
+
+class _Parser:
+    """
+    Recursive-descent parser producing ('lit', mask), ('cat', [items]),
+    ('alt', a, b), ('star'|'plus'|'opt', a) and ('empty',) nodes.
+    """
+
+    def __init__(self, pattern):
+        self.p = pattern
+        self.i = 0
+
+    def error(self, msg):
+        raise ValueError(f"{msg} at offset {self.i} of pattern {self.p!r}")
+
+    def peek(self):
+        return self.p[self.i] if self.i < len(self.p) else None
+
+    def parse(self):
+        node = self.alt()
+        if self.i != len(self.p):
+            self.error("Unbalanced ')'")
+        return node
+
+    def alt(self):
+        node = self.cat()
+        while self.peek() == ord("|"):
+            self.i += 1
+            node = ("alt", node, self.cat())
+        return node
+
+    def cat(self):
+        items = []
+        while self.peek() is not None and self.peek() not in b"|)":
+            items.append(self.repeat())
+        if not items:
+            return ("empty",)
+        return items[0] if len(items) == 1 else ("cat", items)
+
+    def repeat(self):
+        node = self.atom()
+        while self.peek() is not None and self.peek() in b"*+?":
+            op = {ord("*"): "star", ord("+"): "plus", ord("?"): "opt"}[self.peek()]
+            self.i += 1
+            node = (op, node)
+        return node
+
+    def atom(self):
+        c = self.peek()
+        self.i += 1
+        if c == ord("("):
+            node = self.alt()
+            if self.peek() != ord(")"):
+                self.error("Missing ')'")
+            self.i += 1
+            return node
+        if c == ord("["):
+            return ("lit", self.char_class())
+        if c == ord("."):
+            return ("lit", DOT)
+        if c == ord("\\"):
+            return ("lit", self.escape())
+        if c in b"*+?":
+            self.i -= 1
+            self.error("Nothing to repeat")
+        if c in b"{}^$":
+            self.i -= 1
+            self.error(f"Unsupported syntax {chr(c)!r}")
+        return ("lit", 1 << c)
+
+    def escape(self):
+        """Mask of the escape after a backslash (the backslash is consumed)."""
+        c = self.peek()
+        if c is None:
+            self.error("Trailing backslash")
+        self.i += 1
+        if c in CLASS_ESCAPES:
+            return CLASS_ESCAPES[c]
+        if c in CHAR_ESCAPES:
+            return 1 << CHAR_ESCAPES[c]
+        if chr(c).isalnum():
+            self.i -= 2
+            self.error(f"Unsupported escape '\\{chr(c)}'")
+        return 1 << c
+
+    def char_class(self):
+        negate = self.peek() == ord("^")
+        if negate:
+            self.i += 1
+        m = 0
+        first = True
+        while True:
+            c = self.peek()
+            if c is None:
+                self.error("Missing ']'")
+            if c == ord("]") and not first:
+                self.i += 1
+                break
+            first = False
+            self.i += 1
+            if c == ord("\\"):
+                esc = self.escape()
+                if esc & (esc - 1):                     # \d, \w, ...: no ranges
+                    m |= esc
+                    continue
+                c = esc.bit_length() - 1
+            if self.peek() == ord("-") and self.i + 1 < len(self.p) and self.p[self.i + 1] != ord("]"):
+                hi = self.p[self.i + 1]
+                self.i += 2
+                if hi < c:
+                    self.error("Bad range")
+                m |= _mask(range(c, hi + 1))
+            else:
+                m |= 1 << c
+        return ANY ^ m if negate else m
+
+# ---- Thompson construction ----
+
+class _NFA:
+    """States with a byte mask and one successor, or epsilon edges only."""
+
+    def __init__(self):
+        self.mask = []          # bytes accepted on the symbol edge (0: none)
+        self.next = []          # symbol-edge successor
+        self.eps = []           # epsilon successors
+
+    def state(self):
+        self.mask.append(0)
+        self.next.append(-1)
+        self.eps.append([])
+        return len(self.mask) - 1
+
+    def build(self, node):
+        """Return (start, end) states of the fragment for an AST node."""
+        kind = node[0]
+        if kind == "lit":
+            s, e = self.state(), self.state()
+            self.mask[s] = node[1]
+            self.next[s] = e
+            return s, e
+        if kind == "empty":
+            s = self.state()
+            return s, s
+        if kind == "cat":
+            start, end = self.build(node[1][0])
+            for item in node[1][1:]:
+                x0, x1 = self.build(item)
+                self.eps[end].append(x0)
+                end = x1
+            return start, end
+        if kind == "alt":
+            s, e = self.state(), self.state()
+            for sub in node[1:]:
+                x0, x1 = self.build(sub)
+                self.eps[s].append(x0)
+                self.eps[x1].append(e)
+            return s, e
+        a0, a1 = self.build(node[1])
+        s, e = self.state(), self.state()
+        self.eps[s].append(a0)
+        self.eps[a1].append(e)
+        if kind in ("star", "opt"):
+            self.eps[s].append(e)
+        if kind in ("star", "plus"):
+            self.eps[a1].append(a0)
+        return s, e
+
+# ---- Compiled pattern ----
+
+class Regex:
+    """A compiled pattern; see the module docstring."""
+
+    def __init__(self, pattern, max_states=4096):
+        if isinstance(pattern, str):
+            if not pattern.isascii():
+                i = next(i for i, ch in enumerate(pattern) if ord(ch) > 0x7F)
+                raise ValueError(f"Non-ASCII character {pattern[i]!r} at offset {i} of pattern "
+                                 f"{pattern!r} (use a bytes pattern)")
+            raw = pattern.encode("ascii")
+        else:
+            raw = bytes(pattern)
+        nfa = _NFA()
+        start, final = nfa.build(_Parser(raw).parse())
+        n = len(nfa.mask)
+        closure = [0] * n
+        for i in range(n):                      # epsilon closures as bitsets
+            seen = 1 << i
+            stack = [i]
+            while stack:
+                for j in nfa.eps[stack.pop()]:
+                    if not seen >> j & 1:
+                        seen |= 1 << j
+                        stack.append(j)
+            closure[i] = seen
+        self.pattern = pattern
+        self.num_nfa_states = n
+        self.max_states = max_states
+        self.flushes = 0
+        self._final = 1 << final
+        self._succ = [closure[nfa.next[i]] if nfa.mask[i] else 0 for i in range(n)]
+        self._on_byte = [_mask(i for i in range(n) if nfa.mask[i] >> b & 1) for b in range(256)]
+        self._start = closure[start]
+        self._ids = {}          # NFA state set -> DFA state id
+        self._sets = []         # DFA state id -> NFA state set
+        self._trans = []        # DFA state id -> 256 next ids (-1 unknown, -2 dead)
+        self._accept = []
+        self._start_id = self._add_state(self._start)
+
+    # --- NFA simulation ---
+
+    def _step(self, states, b):
+        """Set of NFA states after reading byte b from `states` (bitsets)."""
+        x = states & self._on_byte[b]
+        out = 0
+        succ = self._succ
+        while x:
+            low = x & -x
+            out |= succ[low.bit_length() - 1]
+            x ^= low
+        return out
+
+    def nfa_fullmatch(self, data):
+        """fullmatch by direct bitset simulation of the NFA (no DFA cache)."""
+        states = self._start
+        for b in self._encode(data):
+            states = self._step(states, b)
+            if not states:
+                return False
+        return bool(states & self._final)
+
+    # --- lazy DFA ---
+
+    def _add_state(self, states):
+        sid = len(self._sets)
+        self._ids[states] = sid
+        self._sets.append(states)
+        self._trans.append([-1] * 256)
+        self._accept.append(bool(states & self._final))
+        return sid
+
+    def _flush(self):
+        """Drop every cached DFA state (lists are cleared in place)."""
+        self.flushes += 1
+        self._ids.clear()
+        del self._sets[:]
+        del self._trans[:]
+        del self._accept[:]
+        self._start_id = self._add_state(self._start)
+
+    def _transition(self, sid, b):
+        """Compute, cache and return the DFA transition; -2 for the dead state."""
+        target = self._step(self._sets[sid], b)
+        if not target:
+            self._trans[sid][b] = -2
+            return -2
+        tid = self._ids.get(target)
+        if tid is None:
+            if len(self._sets) >= self.max_states:
+                self._flush()
+                tid = self._ids.get(target)
+                return self._add_state(target) if tid is None else tid
+            tid = self._add_state(target)
+        self._trans[sid][b] = tid
+        return tid
+
+    @staticmethod
+    def _encode(data):
+        """str input as bytes, every non-ASCII character becoming the single byte 80h."""
+        if not isinstance(data, str):
+            return data
+        if data.isascii():
+            return data.encode("ascii")
+        return bytes(c if c < 0x80 else 0x80 for c in map(ord, data))
+
+    def fullmatch(self, data):
+        """True if the whole of data (str or bytes-like) matches the pattern."""
+        trans = self._trans
+        s = self._start_id
+        for b in self._encode(data):
+            t = trans[s][b]
+            if t < 0:
+                if t == -2:
+                    return False
+                t = self._transition(s, b)
+                if t == -2:
+                    return False
+            s = t
+        return self._accept[s]
+
+    @property
+    def cache_size(self):
+        """DFA states currently cached."""
+        return len(self._sets)
+
+    def __repr__(self):
+        return f"Regex({self.pattern!r}, {self.num_nfa_states} NFA states, {self.cache_size} DFA states cached)"
+
+def compile(pattern, max_states=4096):
+    """Compile a pattern (str or bytes) into a Regex."""
+    return Regex(pattern, max_states)
+
+if __name__ == "__main__":
+    import random
+    import re
+    import time
+    rng = random.Random(3)
+
+    def random_pattern(depth=0):
+        r = rng.random()
+        if depth > 3 or r < 0.3:
+            return rng.choice(["a", "b", "c", ".", "[ab]", "[^a]", "\\n", "\\d", "\\W", "[\\s1]"])
+        if r < 0.5:
+            return random_pattern(depth + 1) + random_pattern(depth + 1)
+        if r < 0.65:
+            return f"({random_pattern(depth + 1)}|{random_pattern(depth + 1)})"
+        return f"({random_pattern(depth + 1)}){rng.choice('*+?')}"
+
+    for _ in range(300):
+        pat = random_pattern()
+        while re.search(r"[*+?]\)[*+?]", pat):    # directly nested repeats make re itself blow up
+            pat = random_pattern()
+        rx = compile(pat, max_states=8)
+        for _ in range(30):
+            s = "".join(rng.choice("abc\n1 é") for _ in range(rng.randrange(8)))
+            expected = re.fullmatch(pat, s, re.ASCII) is not None
+            assert rx.fullmatch(s) == expected == rx.nfa_fullmatch(s), (pat, s)
+    print("300 random patterns agree with re.fullmatch (re.ASCII)")
+    assert compile(".").fullmatch("é") and compile("[^a]*").fullmatch("éè€")
+    for bad in ("a{2}", "^a", "a$", "\\b", "[\\1]", "é*", "[é]"):
+        try:
+            compile(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} should be rejected")
+
+    pat, text = "(a|aa)*b", "a" * 30
+    t = time.perf_counter()
+    re.fullmatch(pat, text)
+    t_re = time.perf_counter() - t
+    t = time.perf_counter()
+    compile(pat).fullmatch(text)
+    t_dfa = time.perf_counter() - t
+    print(f"{pat!r} on {len(text)} a's: re {t_re:.3f} s, lazy DFA {t_dfa * 1e3:.3f} ms")